@@ -1,18 +1,70 @@
-from .coordinator import CoordinatorAgent
-from .researcher import ResearcherAgent
-from .writer import WriterAgent
-from .planner import PlannerAgent
-from .feedback import FeedbackAgent
-from .check import CheckAgent
-from .evaluator import TravelPlanEvaluator, evaluate_multiple_samples
-
-__all__ = [
-    "CoordinatorAgent", 
-    "ResearcherAgent", 
-    "WriterAgent", 
-    "PlannerAgent", 
-    "FeedbackAgent", 
-    "CheckAgent",
-    "TravelPlanEvaluator",
-    "evaluate_multiple_samples"
-]
\ No newline at end of file
+"""
+智能体包：导出的类和函数在首次访问时才导入所在子模块（PEP 562），
+导入 agents 或其中的轻量模块（如 agents.evaluator）时不会加载 autogen、pyomo 等重依赖
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    "CoordinatorAgent": "coordinator",
+    "ResearcherAgent": "researcher",
+    "WriterAgent": "writer",
+    "PlannerAgent": "planner",
+    "FeedbackAgent": "feedback",
+    "CheckAgent": "check",
+    "TravelPlanEvaluator": "evaluator",
+    "evaluate_multiple_samples": "evaluator",
+    "AgentPool": "pool",
+    "get_agent_pool": "pool",
+    "PlanRepairer": "repair",
+    "register_tools": "tools",
+    "PlanValidator": "validation",
+    "BatchPlanValidator": "batch_validation",
+    "PlanState": "plan_state",
+    "DayScheduler": "scheduler",
+    "AttractionRecord": "records",
+    "HotelRecord": "records",
+    "RestaurantRecord": "records",
+    "TrainRecord": "records",
+    "RecordTable": "records",
+    "SolverPool": "solver_pool",
+    "SolverPoolFull": "solver_pool",
+    "SolverTimeoutError": "solver_pool",
+    "SolverWorkerError": "solver_pool"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .coordinator import CoordinatorAgent
+    from .researcher import ResearcherAgent
+    from .writer import WriterAgent
+    from .planner import PlannerAgent
+    from .feedback import FeedbackAgent
+    from .check import CheckAgent
+    from .evaluator import TravelPlanEvaluator, evaluate_multiple_samples
+    from .pool import AgentPool, get_agent_pool
+    from .repair import PlanRepairer
+    from .tools import register_tools
+    from .validation import PlanValidator
+    from .batch_validation import BatchPlanValidator
+    from .plan_state import PlanState
+    from .scheduler import DayScheduler
+    from .records import AttractionRecord, HotelRecord, RestaurantRecord, TrainRecord, RecordTable
+    from .solver_pool import SolverPool, SolverPoolFull, SolverTimeoutError, SolverWorkerError
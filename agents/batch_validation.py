@@ -0,0 +1,201 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from agents.records import RecordTable
+from agents.validation import PlanValidator
+
+# 交通方式编码（modes 数组中的取值）
+MODES = ('taxi', 'bus')
+TAXI, BUS = 0, 1
+
+
+class BatchPlanValidator:
+    """
+    批量校验器：用 NumPy 一次评估 N 个以整数索引编码的候选方案
+
+    候选方案编码（D 为旅行天数）：
+        attractions: (N, D) 景点索引
+        restaurants: (N, D, 3) 餐厅索引
+        hotels:      (N,)   酒店索引（前 D-1 晚住同一家酒店）
+        modes:       (N, D) 交通方式，0 为出租车，1 为公交
+
+    规则与 PlanValidator 一致：每日活动时间（景点 + 餐饮含排队 + 酒店↔景点通勤，最后一天只有去程）
+    不超过 max_daily_time，总费用（住宿、门票、餐饮、市内交通、火车）不超过预算；
+    通勤数据缺失只作为警告。费用与 PlanValidator 的结果在浮点误差范围内一致
+    """
+
+    def __init__(self,
+                 attractions: List[Dict],
+                 restaurants: List[Dict],
+                 hotels: List[Dict],
+                 intra_city_trans: Dict,
+                 max_daily_time: float = 840,
+                 taxi_capacity: int = 4):
+        """
+        Args:
+            attractions: 景点列表（API 返回的数据、方案中的 {'id', 'data'} 条目或 RecordTable）
+            restaurants: 餐厅列表
+            hotels: 酒店列表
+            intra_city_trans: 市内交通数据
+            max_daily_time: 每日最大活动时间（分钟）
+            taxi_capacity: 出租车载客数
+        """
+        self.max_daily_time = max_daily_time
+        self.taxi_capacity = taxi_capacity
+
+        self.attraction_ids = [a['id'] for a in attractions]
+        self.restaurant_ids = [r['id'] for r in restaurants]
+        self.hotel_ids = [h['id'] for h in hotels]
+        self.attraction_index = {poi_id: i for i, poi_id in enumerate(self.attraction_ids)}
+        self.restaurant_index = {poi_id: i for i, poi_id in enumerate(self.restaurant_ids)}
+        self.hotel_index = {poi_id: i for i, poi_id in enumerate(self.hotel_ids)}
+
+        self.attraction_time = self._field(attractions, 'duration')
+        self.attraction_cost = self._field(attractions, 'cost')
+        self.restaurant_time = self._field(restaurants, 'duration') + self._field(restaurants, 'queue_time')
+        self.restaurant_cost = self._field(restaurants, 'cost')
+        self.hotel_cost = self._field(hotels, 'cost')
+
+        # 通勤矩阵 (模式, 酒店, 景点)：去程为酒店→景点，返程为景点→酒店
+        resolver = PlanValidator()
+        shape = (len(MODES), len(self.hotel_ids), len(self.attraction_ids))
+        self.out_time = np.zeros(shape)
+        self.out_cost = np.zeros(shape)
+        self.back_time = np.zeros(shape)
+        self.back_cost = np.zeros(shape)
+        self.out_exists = np.zeros(shape[1:], dtype=bool)
+        self.back_exists = np.zeros(shape[1:], dtype=bool)
+        for h, hotel_id in enumerate(self.hotel_ids):
+            for a, attr_id in enumerate(self.attraction_ids):
+                out = resolver.resolve_leg(intra_city_trans, hotel_id, attr_id)
+                back = resolver.resolve_leg(intra_city_trans, attr_id, hotel_id)
+                self.out_time[:, h, a] = (out.taxi_duration, out.bus_duration)
+                self.out_cost[:, h, a] = (out.taxi_cost, out.bus_cost)
+                self.back_time[:, h, a] = (back.taxi_duration, back.bus_duration)
+                self.back_cost[:, h, a] = (back.taxi_cost, back.bus_cost)
+                self.out_exists[h, a] = out.exists
+                self.back_exists[h, a] = back.exists
+
+    @classmethod
+    def from_poi_data(cls, poi_data: Dict, intra_city_trans: Dict, **kwargs) -> 'BatchPlanValidator':
+        """基于 PlannerAgent.fetch_data 返回的 poi_data 构建"""
+        return cls(poi_data['attractions'], poi_data['restaurants'], poi_data['accommodations'],
+                   intra_city_trans, **kwargs)
+
+    @staticmethod
+    def _field(pois: Sequence[Dict], field: str) -> np.ndarray:
+        if isinstance(pois, RecordTable):
+            return pois.column(field)
+        return np.array([float(p.get('data', p).get(field, 0)) for p in pois], dtype=float)
+
+    def encode(self, solutions: Sequence[Dict], travel_days: int) -> Dict[str, np.ndarray]:
+        """
+        将 planner 格式的方案编码为索引数组
+
+        Returns:
+            {'attractions', 'restaurants', 'hotels', 'modes'}
+        """
+        n = len(solutions)
+        attractions = np.zeros((n, travel_days), dtype=np.intp)
+        restaurants = np.zeros((n, travel_days, 3), dtype=np.intp)
+        hotels = np.zeros(n, dtype=np.intp)
+        modes = np.zeros((n, travel_days), dtype=np.intp)
+        for i, solution in enumerate(solutions):
+            hotels[i] = self.hotel_index[solution['accommodations'][0]['id']]
+            for day in range(1, travel_days + 1):
+                attractions[i, day - 1] = self.attraction_index[solution['attractions'][day]['id']]
+                restaurants[i, day - 1] = [self.restaurant_index[r['id']] for r in solution['restaurants'][day]]
+                modes[i, day - 1] = MODES.index(solution.get('transport_mode', {}).get(day, 'taxi'))
+        return {'attractions': attractions, 'restaurants': restaurants, 'hotels': hotels, 'modes': modes}
+
+    def validate(self,
+                 attractions: np.ndarray,
+                 restaurants: np.ndarray,
+                 hotels: np.ndarray,
+                 modes: np.ndarray,
+                 peoples: int = 1,
+                 budget: Optional[float] = None,
+                 train_cost: float = 0.0) -> Dict[str, np.ndarray]:
+        """
+        批量校验 N 个候选方案
+
+        Args:
+            attractions: (N, D) 景点索引
+            restaurants: (N, D, 3) 餐厅索引
+            hotels: (N,) 酒店索引
+            modes: (N, D) 交通方式（0 出租车，1 公交）
+            peoples: 人数
+            budget: 预算（可选）
+            train_cost: 往返火车的单人票价合计
+
+        Returns:
+            {
+                'daily_time': (N, D) 每日活动时间,
+                'daily_cost': (N, D) 每日门票、餐饮和市内交通费用,
+                'total_cost': (N,) 总费用,
+                'time_violation': (N, D) 每日活动时间超限,
+                'budget_violation': (N,) 超出预算,
+                'missing_transport': (N, D) 缺少通勤数据（警告）,
+                'violations': (N,) 错误数,
+                'valid': (N,) 是否通过全部约束
+            }
+        """
+        attractions = np.asarray(attractions, dtype=np.intp)
+        restaurants = np.asarray(restaurants, dtype=np.intp)
+        hotels = np.asarray(hotels, dtype=np.intp)
+        modes = np.asarray(modes, dtype=np.intp)
+        n, travel_days = attractions.shape
+
+        # 最后一天只有酒店→景点的去程
+        return_trip = np.ones(travel_days, dtype=bool)
+        return_trip[-1] = False
+
+        hotel_grid = hotels[:, None]
+        out_time = self.out_time[modes, hotel_grid, attractions]
+        back_time = self.back_time[modes, hotel_grid, attractions] * return_trip
+        out_cost = self.out_cost[modes, hotel_grid, attractions]
+        back_cost = self.back_cost[modes, hotel_grid, attractions] * return_trip
+
+        daily_time = (
+            self.attraction_time[attractions]
+            + self.restaurant_time[restaurants].sum(axis=2)
+            + out_time + back_time
+        )
+
+        taxi_trips = (peoples + self.taxi_capacity - 1) // self.taxi_capacity
+        riders = np.where(modes == TAXI, taxi_trips, peoples)
+        daily_cost = (
+            self.attraction_cost[attractions] * peoples
+            + self.restaurant_cost[restaurants].sum(axis=2) * peoples
+            + riders * (out_cost + back_cost)
+        )
+
+        rooms_needed = (peoples + 1) // 2
+        total_cost = (
+            self.hotel_cost[hotels] * (travel_days - 1) * rooms_needed
+            + daily_cost.sum(axis=1)
+            + train_cost * peoples
+        )
+
+        time_violation = daily_time > self.max_daily_time
+        if budget is None:
+            budget_violation = np.zeros(n, dtype=bool)
+        else:
+            budget_violation = total_cost > budget
+
+        out_exists = self.out_exists[hotel_grid, attractions]
+        back_exists = self.back_exists[hotel_grid, attractions]
+        missing_transport = np.where(return_trip, ~(out_exists & back_exists), ~(out_exists | back_exists))
+
+        violations = time_violation.sum(axis=1) + budget_violation
+        return {
+            'daily_time': daily_time,
+            'daily_cost': daily_cost,
+            'total_cost': total_cost,
+            'time_violation': time_violation,
+            'budget_violation': budget_violation,
+            'missing_transport': missing_transport,
+            'violations': violations,
+            'valid': violations == 0
+        }
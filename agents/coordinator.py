@@ -1,12 +1,12 @@
 import autogen
-from config import AGENT_CONFIG
+from config import agent_config
 
 
 class CoordinatorAgent:
     """协调器 Agent，负责统筹安排各个 agents 完成任务"""
     
-    def __init__(self):
-        self.agent = autogen.AssistantAgent(**AGENT_CONFIG["coordinator"])
+    def __init__(self, llm_config=None):
+        self.agent = autogen.AssistantAgent(**agent_config("coordinator", llm_config))
     
     def get_agent(self):
         return self.agent
@@ -7,15 +7,44 @@ import json
 import time
 import requests
 import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.http_client import RateLimiter, create_session, request_with_retry
+from utils.json_extract import find_json
+from utils.judgment_cache import JudgmentCache, judgment_key
+
 load_dotenv()
 
 SILICONFLOW_API_KEY = os.getenv("SILICONFLOW_API_KEY")
 SILICONFLOW_API_BASE_URL = os.getenv("SILICONFLOW_API_BASE_URL", "https://api.siliconflow.cn/v1")
 SILICONFLOW_MODEL = os.getenv("SILICONFLOW_MODEL", "Qwen/QwQ-32B")
 
+# 批量评估：并发数、每分钟请求上限（0 为不限）、失败重试次数和退避基数（秒）
+EVAL_MAX_WORKERS = int(os.getenv("EVAL_MAX_WORKERS", "4"))
+EVAL_REQUESTS_PER_MINUTE = float(os.getenv("EVAL_REQUESTS_PER_MINUTE", "60"))
+EVAL_MAX_RETRIES = int(os.getenv("EVAL_MAX_RETRIES", "3"))
+EVAL_RETRY_BACKOFF = float(os.getenv("EVAL_RETRY_BACKOFF", "2.0"))
+
+# AR 评判缓存（sqlite 文件路径，为空时不缓存）和单次请求评判的行程数（1 为逐个评判）
+EVAL_CACHE_PATH = os.getenv("EVAL_CACHE_PATH", "")
+EVAL_AR_BATCH_SIZE = int(os.getenv("EVAL_AR_BATCH_SIZE", "1"))
+
+# AR 评判提示词版本：修改 AR_RUBRIC 或对应的提示词模板后需要提升，使缓存的旧评分失效
+# 单个评判和批量评判的提示词不同、评分不等价，分别以各自的版本缓存
+AR_PROMPT_VERSION = "ar-v1"
+AR_BATCH_PROMPT_VERSION = "ar-v1-batch"
+
+AR_RUBRIC = """1. 预算合理性：计划是否在预算范围内，费用计算是否准确
+2. 时间合理性：每日活动时间是否合理，交通时间是否充足
+3. 路线可达性：景点、餐厅、酒店之间的交通路线是否可达
+4. 地点连贯性：地点安排是否连贯，是否避免不必要的往返"""
+
 # 注意：API base_url应该包含完整路径，但chat/completions endpoint需要完整URL
 if SILICONFLOW_API_BASE_URL.endswith("/v1"):
     # 已经是正确格式
@@ -41,10 +70,28 @@ class TravelPlanEvaluator:
     ]
     REQUIRED_PATH_FIELDS = ["ori_id", "des_id", "time", "cost"]
     
-    def __init__(self):
+    def __init__(self,
+                 session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 max_retries: int = EVAL_MAX_RETRIES,
+                 retry_backoff: float = EVAL_RETRY_BACKOFF,
+                 cache: Optional[JudgmentCache] = None):
+        """
+        Args:
+            session: 复用连接的 HTTP Session（多线程共用一个评估器时共用同一连接池）
+            rate_limiter: LLM 请求限流器（可选）
+            max_retries: LLM 请求遇到连接错误、超时或 429/5xx 时的重试次数
+            retry_backoff: 重试退避基数（秒），第 k 次重试前等待约 retry_backoff * 2^k 秒
+            cache: AR 评判缓存，默认按 EVAL_CACHE_PATH 打开（未配置时不缓存）
+        """
         self.api_key = SILICONFLOW_API_KEY
         self.api_base_url = SILICONFLOW_API_BASE_URL
         self.model = SILICONFLOW_MODEL
+        self.session = session or create_session()
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.cache = cache if cache is not None else (JudgmentCache(EVAL_CACHE_PATH) if EVAL_CACHE_PATH else None)
         
     def evaluate_executability(self, result: Any) -> Tuple[float, str]:
         """
@@ -107,12 +154,97 @@ class TravelPlanEvaluator:
         except Exception as e:
             return 0.0, f"评估可执行率时出错: {str(e)}"
     
+    def _chat_url(self) -> str:
+        # 确保URL格式正确
+        if self.api_base_url.endswith("/v1"):
+            return f"{self.api_base_url}/chat/completions"
+        return f"{self.api_base_url.rstrip('/')}/v1/chat/completions"
+    
+    def _chat(self, prompt: str) -> str:
+        """调用 LLM，返回回复文本（请求失败时抛出 requests.exceptions.RequestException）"""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        response = request_with_retry(
+            self.session, "POST", self._chat_url(),
+            max_retries=self.max_retries,
+            backoff=self.retry_backoff,
+            rate_limiter=self.rate_limiter,
+            json=payload, headers=headers, timeout=120
+        )
+        
+        result_data = response.json()
+        return result_data["choices"][0]["message"]["content"]
+    
+    @staticmethod
+    def _answer_plan(result: Any) -> Tuple[Optional[List], str]:
+        """取出结果中的行程，格式错误时返回 (None, 错误说明)"""
+        if isinstance(result, str):
+            data = json.loads(result)
+        elif isinstance(result, dict):
+            data = result
+        else:
+            return None, "结果格式错误"
+        
+        if "answer" not in data:
+            return None, "缺少answer字段"
+        
+        return data["answer"].get("plan", []), ""
+    
+    def _cache_key(self, question: str, plan: List, prompt_version: str = AR_PROMPT_VERSION) -> str:
+        return judgment_key(question, plan, self.model, prompt_version)
+    
+    def _cached_judgment(self, question: str, plan: List,
+                         prompt_version: str = AR_PROMPT_VERSION) -> Optional[Tuple[float, str]]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(question, plan, prompt_version))
+    
+    def _store_judgment(self, question: str, plan: List, ar_score: float, explanation: str,
+                        prompt_version: str = AR_PROMPT_VERSION) -> None:
+        """写入评判缓存；写入失败只影响缓存，不改变本次返回的评分"""
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(self._cache_key(question, plan, prompt_version), ar_score, explanation,
+                           self.model, prompt_version)
+        except sqlite3.Error as e:
+            print(f"写入 AR 评判缓存失败: {e}")
+    
+    @staticmethod
+    def _judgment(eval_result: Dict) -> Tuple[float, str]:
+        ar_score = float(eval_result.get("overall_score", 0.0))
+        explanation = eval_result.get("explanation")
+        if explanation is None:
+            explanation = "无详细说明"
+        elif not isinstance(explanation, str):
+            # LLM 可能返回对象或列表形式的说明，统一为文本（缓存与不缓存时返回相同的值）
+            explanation = json.dumps(explanation, ensure_ascii=False)
+        
+        # 确保分数在0-1范围内
+        return max(0.0, min(1.0, ar_score)), explanation
+    
     def evaluate_accuracy_rate(self, result: Any, question: str, ground_truth: Optional[Dict] = None) -> Tuple[float, str]:
         """
         评估求解准确率(AR)
         使用LLM评估规划在预算、时间、路线可达性、地点连贯性上的合理性
         取值范围: 0到1
         
+        配置了评判缓存时，相同的问题、行程、模型和提示词版本直接返回缓存的评分；
+        只缓存 LLM 正常返回 JSON 的评分
+        
         Args:
             result: 生成的旅行计划结果
             question: 原始问题
@@ -124,26 +256,17 @@ class TravelPlanEvaluator:
             explanation: 评估说明
         """
         try:
-            # 解析result
-            if isinstance(result, str):
-                data = json.loads(result)
-            elif isinstance(result, dict):
-                data = result
-            else:
-                return 0.0, "结果格式错误"
+            plan, error = self._answer_plan(result)
+            if plan is None:
+                return 0.0, error
             
-            if "answer" not in data:
-                return 0.0, "缺少answer字段"
-            
-            answer = data["answer"]
-            plan = answer.get("plan", [])
+            cached = self._cached_judgment(question, plan)
+            if cached is not None:
+                return cached
             
             # 构建评估提示词
             prompt = f"""你是一个旅行计划评估专家。请评估以下旅行计划的合理性，从以下维度进行评分（每个维度0-1分，最后取平均）：
-1. 预算合理性：计划是否在预算范围内，费用计算是否准确
-2. 时间合理性：每日活动时间是否合理，交通时间是否充足
-3. 路线可达性：景点、餐厅、酒店之间的交通路线是否可达
-4. 地点连贯性：地点安排是否连贯，是否避免不必要的往返
+{AR_RUBRIC}
 
 原始问题：{question}
 
@@ -169,31 +292,7 @@ class TravelPlanEvaluator:
 """
             
             # 调用LLM API
-            # 确保URL格式正确
-            if self.api_base_url.endswith("/v1"):
-                url = f"{self.api_base_url}/chat/completions"
-            else:
-                url = f"{self.api_base_url.rstrip('/')}/v1/chat/completions"
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3
-            }
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=120)
-            response.raise_for_status()
-            
-            result_data = response.json()
-            content = result_data["choices"][0]["message"]["content"]
+            content = self._chat(prompt)
             
             # 尝试解析LLM返回的JSON
             try:
@@ -207,12 +306,8 @@ class TravelPlanEvaluator:
                     json_end = content.find("```", json_start)
                     content = content[json_start:json_end].strip()
                 
-                eval_result = json.loads(content)
-                ar_score = float(eval_result.get("overall_score", 0.0))
-                explanation = eval_result.get("explanation", "无详细说明")
-                
-                # 确保分数在0-1范围内
-                ar_score = max(0.0, min(1.0, ar_score))
+                ar_score, explanation = self._judgment(json.loads(content))
+                self._store_judgment(question, plan, ar_score, explanation)
                 
                 return ar_score, explanation
                 
@@ -237,6 +332,109 @@ class TravelPlanEvaluator:
         except Exception as e:
             return 0.0, f"评估求解准确率时出错: {str(e)}"
     
+    def evaluate_accuracy_rate_batch(
+        self,
+        items: List[Tuple[Any, str]],
+        batch_size: int = 5
+    ) -> List[Tuple[float, str]]:
+        """
+        批量评估求解准确率(AR)：每次 LLM 请求评判最多 batch_size 个行程，按编号返回各自的评分
+        
+        评分标准与 evaluate_accuracy_rate 相同。批量提示词的评分以 AR_BATCH_PROMPT_VERSION 缓存，
+        不会被 evaluate_accuracy_rate 当作单个评判的结果；某个行程在批量回复中缺失或无法解析时，
+        单独调用 evaluate_accuracy_rate 评判（按单个评判缓存），因此查找缓存时先查批量评分再查单个评分，
+        已缓存的行程不再发送
+        
+        Args:
+            items: [(生成结果, 原始问题), ...]
+            batch_size: 单次请求评判的行程数
+        
+        Returns:
+            与 items 顺序对应的 [(AR_score, explanation), ...]
+        """
+        judgments: List[Optional[Tuple[float, str]]] = [None] * len(items)
+        pending = []
+        for i, (result, question) in enumerate(items):
+            try:
+                plan, error = self._answer_plan(result)
+            except Exception as e:
+                judgments[i] = (0.0, f"评估求解准确率时出错: {str(e)}")
+                continue
+            if plan is None:
+                judgments[i] = (0.0, error)
+                continue
+            judgments[i] = (self._cached_judgment(question, plan, AR_BATCH_PROMPT_VERSION)
+                            or self._cached_judgment(question, plan))
+            if judgments[i] is None:
+                pending.append((i, question, plan))
+        
+        batch_size = max(1, batch_size)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            for i, judgment in self._judge_batch(batch).items():
+                judgments[i] = judgment
+        
+        # 批量回复中缺失的行程逐个评判
+        for i, judgment in enumerate(judgments):
+            if judgment is None:
+                judgments[i] = self.evaluate_accuracy_rate(*items[i])
+        return judgments
+    
+    def _judge_batch(self, batch: List[Tuple[int, str, List]]) -> Dict[int, Tuple[float, str]]:
+        """一次请求评判一批行程，返回 {items 下标: (评分, 说明)}，只包含成功解析的行程"""
+        if len(batch) == 1:
+            # 单个行程使用 evaluate_accuracy_rate 的提示词
+            return {}
+        
+        sections = "\n\n".join(
+            f"### 行程 P{k}\n原始问题：{question}\n旅行计划：\n{json.dumps(plan, ensure_ascii=False)}"
+            for k, (_, question, plan) in enumerate(batch, 1)
+        )
+        prompt = f"""你是一个旅行计划评估专家。请分别评估以下 {len(batch)} 个旅行计划的合理性，每个计划独立评分，从以下维度进行评分（每个维度0-1分，最后取平均）：
+{AR_RUBRIC}
+
+{sections}
+
+请以JSON格式返回，results 中每个计划一项，id 与上面的编号一致，格式如下：
+{{
+    "results": [
+        {{
+            "id": "P1",
+            "overall_score": 0.85,
+            "dimension_scores": {{
+                "budget": 0.9,
+                "time": 0.8,
+                "route_accessibility": 0.85,
+                "location_coherence": 0.85
+            }},
+            "explanation": "详细说明..."
+        }}
+    ]
+}}
+"""
+        try:
+            content = self._chat(prompt)
+        except requests.exceptions.RequestException:
+            return {}
+        
+        response = find_json([content], required_keys=("results",))
+        if response is None or not isinstance(response["results"], list):
+            return {}
+        
+        judgments = {}
+        for entry in response["results"]:
+            try:
+                k = int(str(entry.get("id", "")).lstrip("Pp")) - 1
+                if not 0 <= k < len(batch) or "overall_score" not in entry:
+                    continue
+                ar_score, explanation = self._judgment(entry)
+            except (AttributeError, TypeError, ValueError):
+                continue
+            i, question, plan = batch[k]
+            judgments[i] = (ar_score, explanation)
+            self._store_judgment(question, plan, ar_score, explanation, AR_BATCH_PROMPT_VERSION)
+        return judgments
+    
     def evaluate_entity_coverage_rate(
         self, 
         result: Any, 
@@ -389,7 +587,8 @@ class TravelPlanEvaluator:
         result: Any,
         question: str,
         correct_entities: Optional[Dict[str, List[str]]] = None,
-        inference_time_seconds: Optional[float] = None
+        inference_time_seconds: Optional[float] = None,
+        ar_judgment: Optional[Tuple[float, str]] = None
     ) -> Dict[str, Any]:
         """
         综合评估：执行所有评估指标并返回完整结果
@@ -399,6 +598,7 @@ class TravelPlanEvaluator:
             question: 原始问题
             correct_entities: 正确的实体字典（用于ECR计算）
             inference_time_seconds: 推理时间（秒），如果提供则计算ART*
+            ar_judgment: 已得到的 AR 评判 (评分, 说明)（如批量评判的结果），提供时不再调用 LLM
         
         Returns:
             包含所有评估指标的字典
@@ -417,7 +617,7 @@ class TravelPlanEvaluator:
         
         # 2. 评估求解准确率(AR)
         if er_score > 0:  # 只有可执行时才评估AR
-            ar_score, ar_explanation = self.evaluate_accuracy_rate(result, question)
+            ar_score, ar_explanation = ar_judgment or self.evaluate_accuracy_rate(result, question)
             evaluation_result["ar"] = {
                 "score": ar_score,
                 "explanation": ar_explanation
@@ -469,37 +669,78 @@ def evaluate_multiple_samples(
     results: List[Any],
     questions: List[str],
     correct_entities_list: Optional[List[Dict[str, List[str]]]] = None,
-    inference_times: Optional[List[float]] = None
+    inference_times: Optional[List[float]] = None,
+    max_workers: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    evaluator: Optional[TravelPlanEvaluator] = None,
+    ar_batch_size: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     批量评估多个样本
     
+    各样本的 AR 评分（LLM 请求）在线程池中并发进行，共用一个连接池和限流器；
+    结果按输入顺序汇总，与逐个评估的结果和平均分相同
+    
     Args:
         results: 多个生成结果的列表
         questions: 对应的问题列表
         correct_entities_list: 对应的正确实体列表（可选）
         inference_times: 对应的推理时间列表（可选）
+        max_workers: 并发评估的线程数，默认 EVAL_MAX_WORKERS，为 1 时逐个评估
+        requests_per_minute: 每分钟 LLM 请求上限，默认 EVAL_REQUESTS_PER_MINUTE，0 为不限
+        evaluator: 使用的评估器（可选，提供时忽略 requests_per_minute）
+        ar_batch_size: 单次 LLM 请求评判的行程数，默认 EVAL_AR_BATCH_SIZE；大于 1 时先按批评判所有
+            可执行样本的 AR（各批并发），评分来自批量提示词，与逐个评判的评分不保证相同
     
     Returns:
         包含平均分数和每个样本详细结果的字典
     """
-    evaluator = TravelPlanEvaluator()
+    max_workers = max(1, EVAL_MAX_WORKERS if max_workers is None else max_workers)
+    if evaluator is None:
+        rpm = EVAL_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        evaluator = TravelPlanEvaluator(
+            session=create_session(max_workers),
+            rate_limiter=RateLimiter.per_minute(rpm, burst=max_workers)
+        )
+    
+    samples = list(zip(results, questions))
+    ar_batch_size = max(1, EVAL_AR_BATCH_SIZE if ar_batch_size is None else ar_batch_size)
+    
+    def run(fn, count: int) -> List[Any]:
+        if max_workers == 1 or count <= 1:
+            return [fn(i) for i in range(count)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, count), thread_name_prefix="evaluator") as executor:
+            return list(executor.map(fn, range(count)))
+    
+    # 批量评判：只评判可执行（ER > 0）的样本，与 comprehensive_evaluate 的逻辑一致
+    ar_judgments: Dict[int, Tuple[float, str]] = {}
+    if ar_batch_size > 1:
+        executable = [i for i, (result, _) in enumerate(samples) if evaluator.evaluate_executability(result)[0] > 0]
+        chunks = [executable[k:k + ar_batch_size] for k in range(0, len(executable), ar_batch_size)]
+        
+        def judge(c: int) -> List[Tuple[float, str]]:
+            return evaluator.evaluate_accuracy_rate_batch([samples[i] for i in chunks[c]], ar_batch_size)
+        
+        for chunk, judgments in zip(chunks, run(judge, len(chunks))):
+            ar_judgments.update(zip(chunk, judgments))
+    
+    def evaluate(i: int) -> Dict[str, Any]:
+        result, question = samples[i]
+        correct_entities = correct_entities_list[i] if correct_entities_list else None
+        inference_time = inference_times[i] if inference_times else None
+        return evaluator.comprehensive_evaluate(
+            result, question, correct_entities, inference_time, ar_judgments.get(i)
+        )
+    
+    evaluations = run(evaluate, len(samples))
     
-    evaluations = []
     total_er = 0.0
     total_ar = 0.0
     total_ecr = 0.0
     total_art_seconds = 0.0
     
-    for i, (result, question) in enumerate(zip(results, questions)):
-        correct_entities = correct_entities_list[i] if correct_entities_list else None
+    for i, eval_result in enumerate(evaluations):
         inference_time = inference_times[i] if inference_times else None
-        
-        eval_result = evaluator.comprehensive_evaluate(
-            result, question, correct_entities, inference_time
-        )
-        evaluations.append(eval_result)
-        
         total_er += eval_result["er"]["score"]
         total_ar += eval_result["ar"]["score"]
         total_ecr += eval_result["ecr"]["score"]
@@ -0,0 +1,188 @@
+from typing import Dict, Optional
+
+from agents.validation import PlanValidator
+
+
+class PlanState:
+    """
+    行程的增量状态：维护每日活动时间、每日费用和总费用
+
+    替换一家餐厅、一个景点或一天的交通方式时只重新计算当天受影响的部分（O(1)），
+    并给出时间、费用和违规数的变化量，供局部搜索和修复使用。
+    初始值由 PlanValidator.build_table 计算，与 FeedbackAgent 的检查口径一致；
+    多次增量更新后浮点累计误差可用 refresh() 消除
+    """
+
+    def __init__(self,
+                 solution: Dict,
+                 travel_days: int,
+                 peoples: int = 1,
+                 budget: Optional[float] = None,
+                 intra_city_trans: Optional[Dict] = None,
+                 validator: Optional[PlanValidator] = None):
+        """
+        Args:
+            solution: planner 格式的行程方案（apply 时原地修改）
+            travel_days: 旅行天数
+            peoples: 人数
+            budget: 预算（可选）
+            intra_city_trans: 市内交通数据
+            validator: 提供约束常量和通勤段缓存的 PlanValidator（可选）
+        """
+        self.solution = solution
+        self.travel_days = travel_days
+        self.peoples = peoples
+        self.budget = budget
+        self.intra_city_trans = intra_city_trans if intra_city_trans is not None else {}
+        self.validator = validator or PlanValidator()
+        self.refresh()
+
+    @property
+    def max_daily_time(self) -> float:
+        return self.validator.max_daily_time
+
+    def refresh(self):
+        """根据当前方案重新计算全部状态"""
+        table = self.validator.build_table(self.solution, self.travel_days, self.peoples, self.intra_city_trans)
+        accommodations = self.solution.get('accommodations', [])
+        self.hotel_id = table['hotel_id']
+        self.has_hotel = table['has_hotel']
+        self.taxi_trips = (self.peoples + self.validator.taxi_capacity - 1) // self.validator.taxi_capacity
+
+        self.daily_time = {}
+        self.daily_cost = {}
+        for entry in table['days']:
+            day = entry['day']
+            self.daily_time[day] = entry['activity_time']
+            self.daily_cost[day] = entry['attraction_cost'] + sum(entry['restaurant_costs']) + entry['transport_cost']
+
+        self.fixed_cost = 0.0
+        if accommodations:
+            self.fixed_cost += table['hotel_cost'] * (self.travel_days - 1) * ((self.peoples + 1) // 2)
+        for key in ('train_departure', 'train_back'):
+            if self.solution.get(key):
+                self.fixed_cost += float(self.solution[key].get('data', {}).get('cost', 0)) * self.peoples
+
+        self.total_cost = self.fixed_cost + sum(self.daily_cost.values())
+        self.time_violations = sum(1 for t in self.daily_time.values() if t > self.max_daily_time)
+
+    # ---- 状态查询 ----
+
+    def day_excess(self, day: int) -> float:
+        """某天超出时间上限的分钟数（未超时为 0）"""
+        return max(self.daily_time.get(day, 0.0) - self.max_daily_time, 0.0)
+
+    def budget_excess(self) -> float:
+        """超出预算的金额（无预算或未超出为 0）"""
+        if self.budget is None:
+            return 0.0
+        return max(self.total_cost - self.budget, 0.0)
+
+    def violations(self) -> int:
+        """当前违反的时间/预算约束数"""
+        return self.time_violations + (1 if self.budget_excess() > 0 else 0)
+
+    def is_feasible(self) -> bool:
+        return self.violations() == 0
+
+    # ---- 单项替换的变化量 ----
+
+    @staticmethod
+    def _item_data(item: Dict) -> Dict:
+        return item.get('data', item)
+
+    def _item_time(self, item: Optional[Dict]) -> float:
+        if item is None:
+            return 0.0
+        data = self._item_data(item)
+        return float(data.get('duration', 0)) + float(data.get('queue_time', 0))
+
+    def _item_cost(self, item: Optional[Dict]) -> float:
+        if item is None:
+            return 0.0
+        return float(self._item_data(item).get('cost', 0)) * self.peoples
+
+    def _transport(self, day: int, attraction: Optional[Dict], mode: str):
+        """某天酒店↔景点通勤的 (时间, 费用)，与 PlanValidator.build_table 的计算方式一致"""
+        if not self.has_hotel or attraction is None:
+            return 0.0, 0.0
+        attr_id = attraction.get('id')
+        out = self.validator.resolve_leg(self.intra_city_trans, self.hotel_id, attr_id)
+        back = self.validator.resolve_leg(self.intra_city_trans, attr_id, self.hotel_id)
+        last = day == self.travel_days
+        if mode == 'taxi':
+            duration = out.taxi_duration if last else out.taxi_duration + back.taxi_duration
+            cost = self.taxi_trips * (out.taxi_cost if last else out.taxi_cost + back.taxi_cost)
+        else:
+            duration = out.bus_duration if last else out.bus_duration + back.bus_duration
+            cost = self.peoples * (out.bus_cost if last else out.bus_cost + back.bus_cost)
+        return (duration if self.hotel_id else 0.0), cost
+
+    def _make_delta(self, kind: str, day: int, value, time_delta: float, cost_delta: float, index=None) -> Dict:
+        day_time = self.daily_time[day] + time_delta
+        total_cost = self.total_cost + cost_delta
+        over_before = self.daily_time[day] > self.max_daily_time
+        over_after = day_time > self.max_daily_time
+        violation_delta = int(over_after) - int(over_before)
+        if self.budget is not None:
+            violation_delta += int(total_cost > self.budget) - int(self.total_cost > self.budget)
+        return {
+            'kind': kind,
+            'day': day,
+            'index': index,
+            'value': value,
+            'time_delta': time_delta,
+            'cost_delta': cost_delta,
+            'day_time': day_time,
+            'total_cost': total_cost,
+            'violation_delta': violation_delta
+        }
+
+    def restaurant_delta(self, day: int, index: int, restaurant: Dict) -> Dict:
+        """把第 day 天第 index 家餐厅换成 restaurant 的变化量（不修改状态）"""
+        old = self.solution['restaurants'][day][index]
+        return self._make_delta(
+            'restaurant', day, restaurant,
+            self._item_time(restaurant) - self._item_time(old),
+            self._item_cost(restaurant) - self._item_cost(old),
+            index=index
+        )
+
+    def attraction_delta(self, day: int, attraction: Dict) -> Dict:
+        """把第 day 天的景点换成 attraction 的变化量（含通勤变化，不修改状态）"""
+        old = self.solution.get('attractions', {}).get(day)
+        mode = self.solution.get('transport_mode', {}).get(day, 'taxi')
+        old_time, old_cost = self._transport(day, old, mode)
+        new_time, new_cost = self._transport(day, attraction, mode)
+        old_item_time = float(self._item_data(old).get('duration', 0)) if old is not None else 0.0
+        new_item_time = float(self._item_data(attraction).get('duration', 0))
+        return self._make_delta(
+            'attraction', day, attraction,
+            (new_item_time + new_time) - (old_item_time + old_time),
+            (self._item_cost(attraction) + new_cost) - (self._item_cost(old) + old_cost)
+        )
+
+    def mode_delta(self, day: int, mode: str) -> Dict:
+        """把第 day 天的交通方式改为 mode 的变化量（不修改状态）"""
+        attraction = self.solution.get('attractions', {}).get(day)
+        old_mode = self.solution.get('transport_mode', {}).get(day, 'taxi')
+        old_time, old_cost = self._transport(day, attraction, old_mode)
+        new_time, new_cost = self._transport(day, attraction, mode)
+        return self._make_delta('mode', day, mode, new_time - old_time, new_cost - old_cost)
+
+    def apply(self, delta: Dict) -> Dict:
+        """应用变化量：更新方案和状态，返回该变化量"""
+        day = delta['day']
+        if delta['kind'] == 'restaurant':
+            self.solution['restaurants'][day][delta['index']] = delta['value']
+        elif delta['kind'] == 'attraction':
+            self.solution.setdefault('attractions', {})[day] = delta['value']
+        else:
+            self.solution.setdefault('transport_mode', {})[day] = delta['value']
+
+        over_before = self.daily_time[day] > self.max_daily_time
+        self.daily_time[day] = delta['day_time']
+        self.daily_cost[day] += delta['cost_delta']
+        self.total_cost = delta['total_cost']
+        self.time_violations += int(delta['day_time'] > self.max_daily_time) - int(over_before)
+        return delta
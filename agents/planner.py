@@ -1,16 +1,23 @@
 import autogen
 import sys
 import os
-from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
-import pyomo.environ as pyo
-from pyomo.opt import SolverStatus, TerminationCondition
+from typing import Annotated, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 # 添加父目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import AGENT_CONFIG, TRAVEL_API_BASE_URL, TRAVEL_API_TIMEOUT
+from config import TRAVEL_API_BASE_URL, TRAVEL_API_TIMEOUT, agent_config
+from agents.tools import compact_plan_result
+from agents.records import AttractionRecord, HotelRecord, RestaurantRecord, TrainRecord, RecordTable
+from utils.lazy import lazy_module
+from utils.tracing import span, traced
+
+# pyomo 在第一次建模/求解时才导入；类型注解写成字符串，避免定义时触发导入
+pyo = lazy_module("pyomo.environ")
+pyo_opt = lazy_module("pyomo.opt")
 
 if TYPE_CHECKING:
+    import pyomo.environ
     from agents.researcher import ResearcherAgent
 
 
@@ -19,8 +26,19 @@ class PlannerAgent:
     行程规划 Agent，负责基于约束条件进行符号化建模并生成初步行程方案
     """
     
-    def __init__(self):
-        self.agent = autogen.AssistantAgent(**AGENT_CONFIG["planner"])
+    def __init__(self, llm_config=None):
+        self.agent = autogen.AssistantAgent(**agent_config("planner", llm_config))
+        self._init_settings()
+    
+    @classmethod
+    def without_agent(cls) -> 'PlannerAgent':
+        """构建不含 LLM Agent 的实例，只用于建模和求解（如求解进程中）"""
+        planner = cls.__new__(cls)
+        planner.agent = None
+        planner._init_settings()
+        return planner
+    
+    def _init_settings(self):
         self.api_timeout = TRAVEL_API_TIMEOUT
         
         # 约束条件常量
@@ -29,10 +47,73 @@ class PlannerAgent:
         self.ATTRACTIONS_PER_DAY = 1  # 每日景点数量
         self.TAXI_CAPACITY = 4  # 出租车载客数
         self.ROOM_TYPE = "双人间"  # 房型
+        self.NEARBY_RESTAURANTS = 0  # 每个景点附近保留的候选餐厅数（0 表示使用城市全部餐厅）
+        
+        # 求解执行器（可选）：设置后求解在该执行器中进行，调用方线程等待结果
+        self.solver_executor = None
+        # 求解进程池（可选，agents.solver_pool.SolverPool）：设置后建模和求解都在求解进程中进行
+        self.solver_pool = None
+        
+        # 最近一次规划的状态（供修复模式复用已获取的数据和已构建的模型）
+        self.last_result = None
+        self.last_model = None
+        self.last_data = None
+        self.last_data_handle = None
     
     def get_agent(self):
         return self.agent
     
+    def clear_state(self):
+        """清空最近一次规划的状态"""
+        self.last_result = None
+        self.last_model = None
+        self.last_data = None
+        self.last_data_handle = None
+    
+    def get_tools(self, researcher) -> Dict:
+        """
+        获取可注册为 autogen 工具的规划函数
+        
+        Args:
+            researcher: ResearcherAgent 实例（规划时用于获取数据）
+            
+        Returns:
+            {工具名: (函数, 描述)}
+        """
+        def plan_trip(
+            origin_city: Annotated[str, "出发城市，如 深圳市"],
+            destination_city: Annotated[str, "目的地城市，如 上海市"],
+            travel_days: Annotated[int, "旅行天数"],
+            peoples: Annotated[int, "出行人数"] = 1,
+            budget: Annotated[float, "总预算（元），0 表示不限制"] = 0.0,
+            start_date: Annotated[str, "出发日期，如 2025年6月10日"] = "",
+            hotel_min_rating: Annotated[float, "酒店最低评分，0 表示不限制"] = 0.0,
+            hotel_max_price: Annotated[float, "酒店每晚最高价格，0 表示不限制"] = 0.0,
+            hotel_keyword: Annotated[str, "酒店特色关键词，如 连锁、亲子，空表示不限制"] = ""
+        ) -> str:
+            hotel_filters = {}
+            if hotel_min_rating > 0:
+                hotel_filters['min_rating'] = hotel_min_rating
+            if hotel_max_price > 0:
+                hotel_filters['max_cost'] = hotel_max_price
+            if hotel_keyword:
+                hotel_filters['feature'] = hotel_keyword
+            result = self.plan_trip(
+                researcher,
+                origin_city,
+                destination_city,
+                travel_days,
+                peoples,
+                budget if budget and budget > 0 else None,
+                start_date=start_date,
+                poi_filters={'accommodations': hotel_filters} if hotel_filters else None
+            )
+            return compact_plan_result(result)
+        
+        return {
+            'plan_trip': (plan_trip, "获取数据并用 SCIP 求解最优行程，返回紧凑的行程方案（每日景点、餐厅、交通方式、酒店和火车的 id|名称）"),
+        }
+    
     def _get_transport_params(self, intra_city_trans: Dict, origin_id: str, destination_id: str, param_type: str) -> float:
         """获取两点间交通参数"""
         for key in [f"{origin_id},{destination_id}", f"{destination_id},{origin_id}"]:
@@ -42,7 +123,9 @@ class PlannerAgent:
                 return value if value > 0 else 0.0
         return 0.0
     
-    def fetch_data(self, researcher, origin_city: str, destination_city: str) -> Tuple[Dict, Dict, Dict, Dict]:
+    @traced("planner.fetch_data")
+    def fetch_data(self, researcher, origin_city: str, destination_city: str,
+                   poi_filters: Optional[Dict[str, Dict]] = None) -> Tuple[Dict, Dict, Dict, Dict]:
         """
         从 API 获取所需数据
         
@@ -50,20 +133,33 @@ class PlannerAgent:
             researcher: ResearcherAgent 实例（通过参数传入）
             origin_city: 出发城市
             destination_city: 目的地城市
+            poi_filters: 按类别的服务端筛选条件（可选），如 {'accommodations': {'min_rating': 4.5, 'max_cost': 800}}
         """
+        poi_filters = poi_filters or {}
         cross_city_train_departure = researcher.get_cross_city_transport(origin_city, destination_city) or []
         cross_city_train_back = researcher.get_cross_city_transport(destination_city, origin_city) or []
         
+        attractions = researcher.get_attractions(destination_city, **poi_filters.get('attractions', {})) or []
+        
+        # 只保留各景点附近的餐厅，缩小候选集和模型规模；近邻查询失败时退回全部餐厅
+        restaurants = None
+        if self.NEARBY_RESTAURANTS > 0 and attractions:
+            restaurants = researcher.get_nearby(
+                [a['id'] for a in attractions], 'restaurants', k=self.NEARBY_RESTAURANTS,
+                **poi_filters.get('restaurants', {})
+            )
+        
         poi_data = {
-            'attractions': researcher.get_attractions(destination_city) or [],
-            'accommodations': researcher.get_accommodations(destination_city) or [],
-            'restaurants': researcher.get_restaurants(destination_city) or []
+            'attractions': attractions,
+            'accommodations': researcher.get_accommodations(destination_city, **poi_filters.get('accommodations', {})) or [],
+            'restaurants': restaurants or researcher.get_restaurants(destination_city, **poi_filters.get('restaurants', {})) or []
         }
         
         intra_city_trans = researcher.get_intra_city_transport(destination_city) or {}
         
         return cross_city_train_departure, cross_city_train_back, poi_data, intra_city_trans
     
+    @traced("planner.build_model")
     def build_model(
         self,
         cross_city_train_departure: List[Dict],
@@ -74,7 +170,7 @@ class PlannerAgent:
         peoples: int = 1,
         budget: Optional[float] = None,
         prefer_taxi: bool = True
-    ) -> pyo.ConcreteModel:
+    ) -> 'pyomo.environ.ConcreteModel':
         """
         构建优化模型
         
@@ -101,81 +197,28 @@ class PlannerAgent:
         # 最后一天索引
         last_day = travel_days
         
-        # 构建数据字典
-        attraction_dict = {a['id']: a for a in poi_data['attractions']}
-        hotel_dict = {h['id']: h for h in poi_data['accommodations']}
-        restaurant_dict = {r['id']: r for r in poi_data['restaurants']}
-        train_departure_dict = {t['train_number']: t for t in cross_city_train_departure}
-        train_back_dict = {t['train_number']: t for t in cross_city_train_back}
+        # 构建记录表（按 id / 车次去重，记录为紧凑的只读对象，提取解时直接共享）
+        attraction_table = RecordTable.from_api(AttractionRecord, poi_data['attractions'])
+        hotel_table = RecordTable.from_api(HotelRecord, poi_data['accommodations'])
+        restaurant_table = RecordTable.from_api(RestaurantRecord, poi_data['restaurants'])
+        train_departure_table = RecordTable.from_api(TrainRecord, cross_city_train_departure, key='train_number')
+        train_back_table = RecordTable.from_api(TrainRecord, cross_city_train_back, key='train_number')
         
-        model.attractions = pyo.Set(initialize=attraction_dict.keys())
-        model.accommodations = pyo.Set(initialize=hotel_dict.keys())
-        model.restaurants = pyo.Set(initialize=restaurant_dict.keys())
-        model.train_departure = pyo.Set(initialize=train_departure_dict.keys())
-        model.train_back = pyo.Set(initialize=train_back_dict.keys())
+        model.attractions = pyo.Set(initialize=attraction_table.ids)
+        model.accommodations = pyo.Set(initialize=hotel_table.ids)
+        model.restaurants = pyo.Set(initialize=restaurant_table.ids)
+        model.train_departure = pyo.Set(initialize=train_departure_table.ids)
+        model.train_back = pyo.Set(initialize=train_back_table.ids)
         
         # 定义参数
-        model.attr_data = pyo.Param(
-            model.attractions,
-            initialize=lambda m, a: {
-                'id': attraction_dict[a]['id'],
-                'name': attraction_dict[a]['name'],
-                'cost': float(attraction_dict[a].get('cost', 0)),
-                'type': attraction_dict[a].get('type', ''),
-                'rating': float(attraction_dict[a].get('rating', 0)),
-                'duration': float(attraction_dict[a].get('duration', 0))
-            }
-        )
-        
-        model.hotel_data = pyo.Param(
-            model.accommodations,
-            initialize=lambda m, h: {
-                'id': hotel_dict[h]['id'],
-                'name': hotel_dict[h]['name'],
-                'cost': float(hotel_dict[h].get('cost', 0)),
-                'type': hotel_dict[h].get('type', ''),
-                'rating': float(hotel_dict[h].get('rating', 0)),
-                'feature': hotel_dict[h].get('feature', '')
-            }
-        )
-        
-        model.rest_data = pyo.Param(
-            model.restaurants,
-            initialize=lambda m, r: {
-                'id': restaurant_dict[r]['id'],
-                'name': restaurant_dict[r]['name'],
-                'cost': float(restaurant_dict[r].get('cost', 0)),
-                'type': restaurant_dict[r].get('type', ''),
-                'rating': float(restaurant_dict[r].get('rating', 0)),
-                'queue_time': float(restaurant_dict[r].get('queue_time', 0)),
-                'duration': float(restaurant_dict[r].get('duration', 0))
-            }
-        )
-        
+        model.attr_data = pyo.Param(model.attractions, initialize=lambda m, a: attraction_table[a], within=pyo.Any)
+        model.hotel_data = pyo.Param(model.accommodations, initialize=lambda m, h: hotel_table[h], within=pyo.Any)
+        model.rest_data = pyo.Param(model.restaurants, initialize=lambda m, r: restaurant_table[r], within=pyo.Any)
         model.train_departure_data = pyo.Param(
-            model.train_departure,
-            initialize=lambda m, t: {
-                'train_number': train_departure_dict[t]['train_number'],
-                'cost': float(train_departure_dict[t].get('cost', 0)),
-                'duration': float(train_departure_dict[t].get('duration', 0)),
-                'origin_id': train_departure_dict[t].get('origin_id', ''),
-                'origin_station': train_departure_dict[t].get('origin_station', ''),
-                'destination_id': train_departure_dict[t].get('destination_id', ''),
-                'destination_station': train_departure_dict[t].get('destination_station', '')
-            }
+            model.train_departure, initialize=lambda m, t: train_departure_table[t], within=pyo.Any
         )
-        
         model.train_back_data = pyo.Param(
-            model.train_back,
-            initialize=lambda m, t: {
-                'train_number': train_back_dict[t]['train_number'],
-                'cost': float(train_back_dict[t].get('cost', 0)),
-                'duration': float(train_back_dict[t].get('duration', 0)),
-                'origin_id': train_back_dict[t].get('origin_id', ''),
-                'origin_station': train_back_dict[t].get('origin_station', ''),
-                'destination_id': train_back_dict[t].get('destination_id', ''),
-                'destination_station': train_back_dict[t].get('destination_station', '')
-            }
+            model.train_back, initialize=lambda m, t: train_back_table[t], within=pyo.Any
         )
         
         # 定义变量
@@ -433,11 +476,15 @@ class PlannerAgent:
         
         return model
     
-    def solve_model(self, model: pyo.ConcreteModel) -> Tuple[Dict, bool]:
+    def solve_model(self, model: 'pyomo.environ.ConcreteModel', warmstart: bool = False) -> Tuple[Dict, bool]:
         """
         求解模型
         
         约束条件12: 求解器限制为scip求解器
+        
+        Args:
+            model: 优化模型
+            warmstart: 是否将变量当前值作为初始解传给求解器（仅在求解器支持时生效）
         """
         solver = pyo.SolverFactory('scip')
         
@@ -447,13 +494,22 @@ class PlannerAgent:
             'limits/gap': 0.01,  # 相对最优性 gap
         }
         
+        solve_kwargs = {}
+        if warmstart and solver.warm_start_capable():
+            solve_kwargs['warmstart'] = True
+        
         try:
-            results = solver.solve(model, tee=False)
+            with span("planner.solve", solver="scip", warmstart=bool(solve_kwargs)) as solve_span:
+                if self.solver_executor is not None:
+                    results = self.solver_executor.submit(solver.solve, model, tee=False, **solve_kwargs).result()
+                else:
+                    results = solver.solve(model, tee=False, **solve_kwargs)
+                solve_span.set(termination=str(results.solver.termination_condition))
             
-            if (results.solver.status == SolverStatus.ok and 
-                results.solver.termination_condition == TerminationCondition.optimal):
+            if (results.solver.status == pyo_opt.SolverStatus.ok and 
+                results.solver.termination_condition == pyo_opt.TerminationCondition.optimal):
                 return self._extract_solution(model), True
-            elif results.solver.termination_condition == TerminationCondition.feasible:
+            elif results.solver.termination_condition == pyo_opt.TerminationCondition.feasible:
                 # 找到可行解但不一定最优
                 return self._extract_solution(model), True
             else:
@@ -462,8 +518,34 @@ class PlannerAgent:
             print(f"求解器错误: {e}")
             return {}, False
     
-    def _extract_solution(self, model: pyo.ConcreteModel) -> Dict:
-        """提取解"""
+    def solve_in_pool(self, travel_days: int, peoples: int = 1, budget: Optional[float] = None,
+                      prefer_taxi: bool = True, warm_start: Optional[Dict] = None) -> Tuple[Dict, bool]:
+        """
+        在求解进程池中对最近一次获取的数据建模并求解（超时、取消或求解进程出错时视为无解）
+        
+        Args:
+            warm_start: apply_warm_start 的参数（solution、free_days 等），为空时不设初始解
+        """
+        with span("planner.pool_solve", warmstart=bool(warm_start)) as current:
+            try:
+                solution, success = self.solver_pool.solve(
+                    self.last_data_handle, travel_days, peoples, budget, prefer_taxi, warm_start
+                )
+            except Exception as e:
+                print(f"求解器错误: {e}")
+                current.set(error=type(e).__name__)
+                return {}, False
+            current.set(success=success)
+        return solution, success
+    
+    @traced("planner.extract_solution")
+    def _extract_solution(self, model: 'pyomo.environ.ConcreteModel') -> Dict:
+        """
+        提取解
+        
+        方案中的景点、酒店、餐厅和火车条目直接使用模型中的记录（agents.records），
+        记录本身支持 entry['id']、entry.get('data') 等条目访问方式，多个方案共享同一份数据
+        """
         solution = {
             'attractions': {},
             'accommodations': [],
@@ -477,47 +559,29 @@ class PlannerAgent:
         for d in model.days:
             for a in model.attractions:
                 if pyo.value(model.select_attr[d, a]) > 0.9:
-                    solution['attractions'][d] = {
-                        'id': model.attr_data[a]['id'],
-                        'name': model.attr_data[a]['name'],
-                        'data': dict(model.attr_data[a])
-                    }
+                    solution['attractions'][d] = model.attr_data[a]
         
         # 提取住宿
         for h in model.accommodations:
             if pyo.value(model.select_hotel[h]) > 0.9:
-                solution['accommodations'].append({
-                    'id': model.hotel_data[h]['id'],
-                    'name': model.hotel_data[h]['name'],
-                    'data': dict(model.hotel_data[h])
-                })
+                solution['accommodations'].append(model.hotel_data[h])
         
         # 提取餐厅
         for d in model.days:
             solution['restaurants'][d] = []
             for r in model.restaurants:
                 if pyo.value(model.select_rest[d, r]) > 0.9:
-                    solution['restaurants'][d].append({
-                        'id': model.rest_data[r]['id'],
-                        'name': model.rest_data[r]['name'],
-                        'data': dict(model.rest_data[r])
-                    })
+                    solution['restaurants'][d].append(model.rest_data[r])
         
         # 提取出发火车
         for t in model.train_departure:
             if pyo.value(model.select_train_departure[t]) > 0.9:
-                solution['train_departure'] = {
-                    'train_number': model.train_departure_data[t]['train_number'],
-                    'data': dict(model.train_departure_data[t])
-                }
+                solution['train_departure'] = model.train_departure_data[t]
         
         # 提取返程火车
         for t in model.train_back:
             if pyo.value(model.select_train_back[t]) > 0.9:
-                solution['train_back'] = {
-                    'train_number': model.train_back_data[t]['train_number'],
-                    'data': dict(model.train_back_data[t])
-                }
+                solution['train_back'] = model.train_back_data[t]
         
         # 提取交通方式
         for d in model.days:
@@ -526,6 +590,73 @@ class PlannerAgent:
         
         return solution
     
+    def apply_warm_start(
+        self,
+        model: 'pyomo.environ.ConcreteModel',
+        solution: Dict,
+        free_days: Optional[List[int]] = None,
+        free_hotel: bool = False,
+        free_trains: bool = False,
+        forbid: Optional[Dict[int, List[str]]] = None
+    ) -> 'pyomo.environ.ConcreteModel':
+        """
+        以已有方案作为初始解，并固定不需要修复的部分
+        
+        Args:
+            model: 已构建的优化模型（可复用上一次的模型）
+            solution: 上一次的行程方案
+            free_days: 需要重新求解的天（这些天的景点、餐厅、交通方式不固定）
+            free_hotel: 是否重新选择住宿
+            free_trains: 是否重新选择火车
+            forbid: 禁止在指定天选择的 POI，格式 {day: [poi_id, ...]}
+            
+        Returns:
+            设置好初始值和固定变量的模型
+        """
+        free_days = set(free_days or [])
+        forbid = forbid or {}
+        
+        # 先解除上一次修复留下的固定
+        for var in model.component_data_objects(pyo.Var):
+            var.unfix()
+        
+        attractions = solution.get('attractions', {})
+        restaurants = solution.get('restaurants', {})
+        hotel_ids = {h.get('id') for h in solution.get('accommodations', [])}
+        modes = solution.get('transport_mode', {})
+        
+        def set_var(var, value, fix):
+            var.set_value(value)
+            if fix:
+                var.fix(value)
+        
+        for d in model.days:
+            fix_day = d not in free_days
+            chosen_attr = (attractions.get(d) or {}).get('id')
+            chosen_rest = {r.get('id') for r in restaurants.get(d, [])}
+            for a in model.attractions:
+                set_var(model.select_attr[d, a], 1 if a == chosen_attr else 0, fix_day)
+            for r in model.restaurants:
+                set_var(model.select_rest[d, r], 1 if r in chosen_rest else 0, fix_day)
+            set_var(model.trans_mode[d], 0 if modes.get(d, 'taxi') == 'taxi' else 1, fix_day)
+            for poi_id in forbid.get(d, []):
+                if poi_id in model.attractions:
+                    model.select_attr[d, poi_id].fix(0)
+                if poi_id in model.restaurants:
+                    model.select_rest[d, poi_id].fix(0)
+        
+        for h in model.accommodations:
+            set_var(model.select_hotel[h], 1 if h in hotel_ids else 0, not free_hotel)
+        
+        train_departure = (solution.get('train_departure') or {}).get('train_number')
+        for t in model.train_departure:
+            set_var(model.select_train_departure[t], 1 if t == train_departure else 0, not free_trains)
+        train_back = (solution.get('train_back') or {}).get('train_number')
+        for t in model.train_back:
+            set_var(model.select_train_back[t], 1 if t == train_back else 0, not free_trains)
+        
+        return model
+    
     def plan_trip(
         self,
         researcher,
@@ -534,7 +665,9 @@ class PlannerAgent:
         travel_days: int,
         peoples: int = 1,
         budget: Optional[float] = None,
-        prefer_taxi: bool = True
+        prefer_taxi: bool = True,
+        start_date: str = "",
+        poi_filters: Optional[Dict[str, Dict]] = None
     ) -> Dict:
         """
         规划行程
@@ -547,6 +680,8 @@ class PlannerAgent:
             peoples: 人数
             budget: 预算（可选，如果为None则不限制预算）
             prefer_taxi: 是否偏好出租车
+            start_date: 出发日期（可选，格式：2025年6月10日）
+            poi_filters: 按类别的服务端筛选条件（可选，见 fetch_data）
             
         Returns:
             包含行程方案的字典
@@ -554,8 +689,15 @@ class PlannerAgent:
         # 获取数据
         print(f"正在获取 {destination_city} 的 POI 数据和交通信息...")
         cross_city_train_departure, cross_city_train_back, poi_data, intra_city_trans = self.fetch_data(
-            researcher, origin_city, destination_city
+            researcher, origin_city, destination_city, poi_filters
         )
+        self.clear_state()
+        self.last_data = {
+            'cross_city_train_departure': cross_city_train_departure,
+            'cross_city_train_back': cross_city_train_back,
+            'poi_data': poi_data,
+            'intra_city_trans': intra_city_trans
+        }
         
         if not poi_data['attractions'] or not poi_data['accommodations'] or not poi_data['restaurants']:
             return {
@@ -563,22 +705,30 @@ class PlannerAgent:
                 'error': '数据不足，无法规划行程'
             }
         
-        # 构建模型
-        print("正在构建优化模型...")
-        model = self.build_model(
-            cross_city_train_departure,
-            cross_city_train_back,
-            poi_data,
-            intra_city_trans,
-            travel_days,
-            peoples,
-            budget,
-            prefer_taxi
-        )
-        
-        # 求解模型
-        print("正在求解优化问题...")
-        solution, success = self.solve_model(model)
+        if self.solver_pool is not None:
+            # 建模和求解在求解进程中进行，数据只传一次（修复时按句柄复用）
+            print("正在提交求解任务...")
+            self.last_data_handle = self.solver_pool.register_data(self.last_data)
+            solution, success = self.solve_in_pool(travel_days, peoples, budget, prefer_taxi)
+        else:
+            # 构建模型
+            print("正在构建优化模型...")
+            model = self.build_model(
+                cross_city_train_departure,
+                cross_city_train_back,
+                poi_data,
+                intra_city_trans,
+                travel_days,
+                peoples,
+                budget,
+                prefer_taxi
+            )
+            
+            self.last_model = model
+            
+            # 求解模型
+            print("正在求解优化问题...")
+            solution, success = self.solve_model(model)
         
         if not success:
             return {
@@ -586,13 +736,16 @@ class PlannerAgent:
                 'error': '无法找到可行解'
             }
         
-        return {
+        self.last_result = {
             'success': True,
             'solution': solution,
             'origin_city': origin_city,
             'destination_city': destination_city,
             'travel_days': travel_days,
             'peoples': peoples,
-            'budget': budget
+            'budget': budget,
+            'prefer_taxi': prefer_taxi,
+            'start_date': start_date
         }
+        return self.last_result
 
@@ -0,0 +1,66 @@
+import threading
+from typing import Dict, Type, TypeVar
+
+from config import require_api_key
+
+T = TypeVar("T")
+
+
+class AgentPool:
+    """
+    Agent 池，负责在进程内复用各个 Agent 实例
+    每种 Agent 只构建一次（包括其 autogen.AssistantAgent 和 LLM client），
+    每次使用前通过 reset 清空对话状态；
+    指定 llm_config 时池中 Agent 使用该 LLM 配置（如异步流程中共享 HTTP 客户端的配置）
+    """
+
+    def __init__(self, llm_config=None):
+        self.llm_config = llm_config
+        self._agents: Dict[type, object] = {}
+        self._lock = threading.Lock()
+
+    def get(self, agent_cls: Type[T]) -> T:
+        """获取指定类型的 Agent 实例，不存在时构建"""
+        agent = self._agents.get(agent_cls)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(agent_cls)
+                if agent is None:
+                    require_api_key()
+                    agent = agent_cls(llm_config=self.llm_config)
+                    self._agents[agent_cls] = agent
+        return agent
+
+    def reset(self, *agents) -> None:
+        """
+        清空 Agent 的对话状态（聊天记录、自动回复计数等）
+
+        Args:
+            *agents: 要重置的 Agent 包装对象；为空时重置池中所有 Agent
+        """
+        targets = agents or tuple(self._agents.values())
+        for agent in targets:
+            inner = agent.get_agent() if hasattr(agent, "get_agent") else agent
+            inner.reset()
+
+    def clear(self) -> None:
+        """丢弃池中所有 Agent（下次获取时重新构建）"""
+        with self._lock:
+            self._agents.clear()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """获取进程级默认 Agent 池"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = AgentPool()
+    return _default_pool
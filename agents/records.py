@@ -0,0 +1,180 @@
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Type
+
+import numpy as np
+
+# 记录只读，构建时绕过 Record.__setattr__ 直接写入槽
+_set_slot = object.__setattr__
+
+
+class Record(Mapping):
+    """
+    紧凑的只读 POI / 火车记录（__slots__，无实例字典）
+
+    同时充当方案条目和条目数据：record.get('data') 返回记录本身，
+    因此 entry.get('id')、entry.get('data', {}).get('cost', 0)、poi.get('data', poi) 等
+    原有的字典访问方式都可以直接使用。记录在多个方案间共享，深拷贝时返回自身；
+    需要普通字典（如序列化）时用 to_dict()
+    """
+
+    __slots__ = ()
+
+    # 字段顺序
+    FIELDS = ()
+    # 数值字段（缺失时为 0.0）
+    NUMERIC = ()
+    # 可为空的字段（缺失时为 None），其余字段缺失时为空字符串
+    OPTIONAL = ()
+    _field_set = frozenset()
+    _numeric_set = frozenset()
+    _optional_set = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._numeric_set = frozenset(cls.NUMERIC)
+        cls._optional_set = frozenset(cls.OPTIONAL)
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            _set_slot(self, field, values.get(field))
+
+    @classmethod
+    def from_api(cls, raw: Dict) -> 'Record':
+        """由 API 返回的数据（或方案中的 {'id', 'name', 'data'} 条目）构建记录"""
+        if isinstance(raw, cls):
+            return raw
+        data = raw.get('data', raw)
+        record = object.__new__(cls)
+        numeric, optional = cls._numeric_set, cls._optional_set
+        for field in cls.FIELDS:
+            value = data.get(field, raw.get(field))
+            if field in numeric:
+                value = float(value or 0)
+            elif value is None and field not in optional:
+                value = ''
+            _set_slot(record, field, value)
+        return record
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 记录是只读的")
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            return getattr(self, key)
+        if key == 'data':
+            return self
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key)
+        if key == 'data':
+            return self
+        return default
+
+    def __contains__(self, key) -> bool:
+        return key in self._field_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_rebuild, (type(self), self.to_dict()))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{f}={getattr(self, f)!r}' for f in self.FIELDS)})"
+
+    def to_dict(self) -> Dict:
+        """转为普通字典（只包含数据字段）"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def _rebuild(cls: Type[Record], values: Dict) -> Record:
+    return cls(**values)
+
+
+class AttractionRecord(Record):
+    __slots__ = ('id', 'name', 'cost', 'type', 'rating', 'duration', 'latitude', 'longitude',
+                 'open_time', 'close_time')
+    FIELDS = __slots__
+    NUMERIC = ('cost', 'rating', 'duration')
+    OPTIONAL = ('latitude', 'longitude')
+
+
+class HotelRecord(Record):
+    __slots__ = ('id', 'name', 'cost', 'type', 'rating', 'feature', 'latitude', 'longitude')
+    FIELDS = __slots__
+    NUMERIC = ('cost', 'rating')
+    OPTIONAL = ('latitude', 'longitude')
+
+
+class RestaurantRecord(Record):
+    __slots__ = ('id', 'name', 'cost', 'type', 'rating', 'queue_time', 'duration', 'latitude', 'longitude',
+                 'business_hours')
+    FIELDS = __slots__
+    NUMERIC = ('cost', 'rating', 'queue_time', 'duration')
+    OPTIONAL = ('latitude', 'longitude')
+
+
+class TrainRecord(Record):
+    __slots__ = ('train_number', 'cost', 'duration', 'origin_id', 'origin_station',
+                 'destination_id', 'destination_station')
+    FIELDS = __slots__
+    NUMERIC = ('cost', 'duration')
+
+
+class RecordTable:
+    """
+    一类记录的表：按键（POI 为 id，火车为车次）去重并保持首次出现的顺序，
+    提供 键→下标 映射和按需构建并缓存的 NumPy 数值列
+    """
+
+    def __init__(self, records: Iterable[Record], key: str = 'id'):
+        by_key = {}
+        for record in records:
+            by_key[record.get(key)] = record
+        self.key = key
+        self.records: List[Record] = list(by_key.values())
+        self.ids = list(by_key)
+        self.index = {record_id: i for i, record_id in enumerate(self.ids)}
+        self._columns = {}
+
+    @classmethod
+    def from_api(cls, record_type: Type[Record], raw: Optional[Iterable[Dict]], key: str = 'id') -> 'RecordTable':
+        """由 API 返回的列表构建（重复的键保留最后一条，与按键建字典的结果一致）"""
+        return cls((record_type.from_api(item) for item in raw or []), key)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self.records)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self.index
+
+    def __getitem__(self, record_id) -> Record:
+        return self.records[self.index[record_id]]
+
+    def get(self, record_id, default=None) -> Optional[Record]:
+        i = self.index.get(record_id)
+        return default if i is None else self.records[i]
+
+    def column(self, field: str) -> np.ndarray:
+        """数值列（按表中顺序，缺失值为 0）"""
+        column = self._columns.get(field)
+        if column is None:
+            column = np.array([float(record.get(field) or 0) for record in self.records], dtype=float)
+            column.setflags(write=False)
+            self._columns[field] = column
+        return column
@@ -0,0 +1,378 @@
+import copy
+from typing import Dict, List, Optional
+
+from agents.plan_state import PlanState
+from agents.records import RestaurantRecord
+
+
+class PlanRepairer:
+    """
+    行程修复器，负责将 FeedbackAgent / CheckAgent 检测出的结构化错误映射为定向修复动作
+    优先做局部替换（换餐厅、换交通方式），无法局部修复时复用已获取的数据和已构建的模型，
+    以上一次的方案为初始解，只放开出错的部分重新求解
+    """
+
+    # 约束名称（FeedbackAgent）/ 问题类型（CheckAgent）分类
+    TIME_CONSTRAINTS = {'每日活动时间限制'}
+    BUDGET_CONSTRAINTS = {'预算约束'}
+    DAY_CONSTRAINTS = {'每日选择一个景点', '每日三个餐饮'}
+    TRAIN_CONSTRAINTS = {'第一天出发火车', '最后一天返程火车'}
+    HOTEL_CONSTRAINTS = {'住宿选择'}
+    DISTANCE_ISSUES = {'unrealistic_time_distance', 'unrealistic_speed', 'excessive_distance'}
+    TRAIN_ISSUES = {'missing_train'}
+    HOURS_ISSUES = {'attraction_closed', 'schedule_overrun'}
+    RESTAURANT_HOURS_ISSUES = {'restaurant_closed'}
+
+    def __init__(self, planner, feedback, check=None):
+        """
+        Args:
+            planner: PlannerAgent 实例（提供上一次的数据和模型）
+            feedback: FeedbackAgent 实例
+            check: CheckAgent 实例（可选）
+        """
+        self.planner = planner
+        self.feedback = feedback
+        self.check = check
+
+    def validate(self, solution: Dict, travel_days: int, peoples: int,
+                 budget: Optional[float], intra_city_trans: Dict) -> Dict:
+        """使用 FeedbackAgent（和 CheckAgent）检查方案，两者共用一次单次遍历校验"""
+        validator = self.feedback.get_validator()
+        if self.check is not None:
+            validator = self.check.get_validator(validator)
+        validation = validator.validate(
+            solution, travel_days, peoples, budget, intra_city_trans, realistic=self.check is not None
+        )
+        feedback_result = self.feedback.check_solution(
+            solution, travel_days, peoples, budget, intra_city_trans, validation=validation
+        )
+        if self.check is None:
+            return feedback_result
+        return self.check.comprehensive_check(
+            solution, travel_days, peoples, budget, feedback_result, intra_city_trans, validation=validation
+        )
+
+    def collect_errors(self, check_result: Dict) -> List[Dict]:
+        """从 check_solution 或 comprehensive_check 的结果中收集错误"""
+        if 'constraint_check' in check_result:
+            errors = list(check_result['constraint_check'].get('error_list', []))
+            errors.extend(check_result.get('realistic_check', {}).get('error_list', []))
+            return errors
+        return list(check_result.get('error_list', []))
+
+    def diagnose(self, check_result: Dict) -> List[Dict]:
+        """
+        将结构化错误映射为修复动作
+
+        Returns:
+            修复动作列表，每个动作为字典，如 {'action': 'reduce_time', 'day': 2, 'excess': 35.0}
+        """
+        actions = []
+        for error in self.collect_errors(check_result):
+            constraint = error.get('constraint')
+            issue_type = error.get('type')
+            day = error.get('day')
+
+            if constraint in self.TIME_CONSTRAINTS:
+                actions.append({
+                    'action': 'reduce_time',
+                    'day': day,
+                    'excess': float(error.get('actual_time', 0)) - float(error.get('max_time', 0))
+                })
+            elif constraint in self.BUDGET_CONSTRAINTS:
+                actions.append({
+                    'action': 'reduce_cost',
+                    'excess': float(error.get('actual_cost', 0)) - float(error.get('budget', 0))
+                })
+            elif (issue_type in self.DISTANCE_ISSUES or issue_type in self.HOURS_ISSUES) and day is not None:
+                actions.append({'action': 'resolve_day', 'day': day, 'exclude_attraction': True})
+            elif issue_type in self.RESTAURANT_HOURS_ISSUES and day is not None:
+                actions.append({
+                    'action': 'fix_hours',
+                    'day': day,
+                    'slot': error.get('slot', 0),
+                    'restaurant_id': error.get('restaurant_id')
+                })
+            elif constraint in self.DAY_CONSTRAINTS and day is not None:
+                actions.append({'action': 'resolve_day', 'day': day, 'exclude_attraction': False})
+            elif constraint in self.TRAIN_CONSTRAINTS or issue_type in self.TRAIN_ISSUES:
+                actions.append({'action': 'resolve_trains'})
+            elif constraint in self.HOTEL_CONSTRAINTS:
+                actions.append({'action': 'resolve_hotel'})
+            else:
+                actions.append({'action': 'resolve_all'})
+
+        # 去重，保持顺序
+        unique_actions = []
+        for action in actions:
+            if action not in unique_actions:
+                unique_actions.append(action)
+        return unique_actions
+
+    def _restaurant_time(self, rest: Dict) -> float:
+        data = rest.get('data', rest)
+        return float(data.get('duration', 0)) + float(data.get('queue_time', 0))
+
+    def _restaurant_cost(self, rest: Dict) -> float:
+        data = rest.get('data', rest)
+        return float(data.get('cost', 0))
+
+    def _make_restaurant_entry(self, rest: Dict) -> RestaurantRecord:
+        """将 API 返回的餐厅数据转换为方案中的餐厅条目（与规划器提取的条目同为 RestaurantRecord）"""
+        return RestaurantRecord.from_api(rest)
+
+    def _unused_restaurants(self, solution: Dict, candidates: List[Dict]) -> List[Dict]:
+        used = {r.get('id') for rests in solution.get('restaurants', {}).values() for r in rests}
+        return [r for r in candidates if r.get('id') not in used]
+
+    def _best_restaurant(self, state: PlanState, day: int, slot: int, candidates: List[Dict], accept) -> Optional[Dict]:
+        """在候选餐厅中选出替换后满足 accept(delta) 的评分最高者"""
+        best = None
+        best_key = None
+        for rest in candidates:
+            if not accept(state.restaurant_delta(day, slot, rest)):
+                continue
+            key = (float(rest.get('rating', 0)), -float(rest.get('cost', 0)))
+            if best is None or key > best_key:
+                best, best_key = rest, key
+        return best
+
+    def _fix_time(self, state: PlanState, action: Dict, ctx: Dict) -> bool:
+        """局部修复某天超时：改乘更快的交通方式，或替换一家耗时最长的餐厅"""
+        day = action['day']
+        limit = state.max_daily_time
+        if state.day_excess(day) <= 0:
+            return True
+
+        if state.solution.get('transport_mode', {}).get(day, 'taxi') == 'bus':
+            delta = state.mode_delta(day, 'taxi')
+            if delta['day_time'] <= limit:
+                state.apply(delta)
+                return True
+
+        restaurants = state.solution.get('restaurants', {}).get(day, [])
+        if not restaurants:
+            return False
+        slot = max(range(len(restaurants)), key=lambda i: self._restaurant_time(restaurants[i]))
+        best = self._best_restaurant(
+            state, day, slot, self._unused_restaurants(state.solution, ctx['restaurants']),
+            lambda delta: delta['day_time'] <= limit
+        )
+        if best is None:
+            return False
+        state.apply(state.restaurant_delta(day, slot, self._make_restaurant_entry(best)))
+        return True
+
+    def _fix_cost(self, state: PlanState, action: Dict, ctx: Dict) -> bool:
+        """局部修复超预算：替换一家最贵的餐厅，或把一天的出租车改为公交"""
+        if state.budget_excess() <= 0:
+            return True
+        budget = state.budget
+        limit = state.max_daily_time
+
+        # 方案1: 替换最贵的餐厅（不增加当天耗时）
+        slots = [
+            (day, i, rest)
+            for day, rests in state.solution.get('restaurants', {}).items()
+            for i, rest in enumerate(rests)
+        ]
+        if slots:
+            day, slot, rest = max(slots, key=lambda s: self._restaurant_cost(s[2]))
+            best = self._best_restaurant(
+                state, day, slot, self._unused_restaurants(state.solution, ctx['restaurants']),
+                lambda delta: delta['total_cost'] <= budget and delta['time_delta'] <= 0
+            )
+            if best is not None:
+                state.apply(state.restaurant_delta(day, slot, self._make_restaurant_entry(best)))
+                return True
+
+        # 方案2: 出租车改公交（不超时的前提下）
+        modes = state.solution.get('transport_mode', {})
+        for day in range(1, state.travel_days + 1):
+            if modes.get(day, 'taxi') != 'taxi':
+                continue
+            delta = state.mode_delta(day, 'bus')
+            if delta['total_cost'] <= budget and delta['day_time'] <= limit:
+                state.apply(delta)
+                return True
+        return False
+
+    def _fix_hours(self, state: PlanState, action: Dict, ctx: Dict) -> bool:
+        """
+        局部修复营业时间冲突：逐个把无法安排用餐的餐厅换成能排进当天日程、且不增加违规的餐厅
+        每次替换后该餐厅不再是排程失败的原因即可，直到当天可行
+        """
+        day = action['day']
+        validator = state.validator
+        scheduler = validator.get_scheduler()
+        table = validator.build_table(state.solution, state.travel_days, state.peoples, state.intra_city_trans)
+        entry = table['days'][day - 1]
+        hotel_id = table['hotel_id']
+
+        for _ in range(len(entry['restaurants'])):
+            result = scheduler.schedule_day(entry, hotel_id, timeline=False)
+            if result['feasible']:
+                return True
+            issue = result['issues'][0]
+            if issue['type'] != 'restaurant_closed':
+                return False
+            slot = issue['slot']
+
+            def accept(delta):
+                if delta['violation_delta'] > 0:
+                    return False
+                replaced = list(entry['restaurants'])
+                replaced[slot] = delta['value']
+                trial = scheduler.schedule_day(dict(entry, restaurants=replaced), hotel_id, timeline=False)
+                return trial['feasible'] or trial['issues'][0].get('slot') != slot
+
+            best = self._best_restaurant(
+                state, day, slot, self._unused_restaurants(state.solution, ctx['restaurants']), accept
+            )
+            if best is None:
+                return False
+            state.apply(state.restaurant_delta(day, slot, self._make_restaurant_entry(best)))
+            entry = dict(entry, restaurants=state.solution['restaurants'][day])
+        return scheduler.schedule_day(entry, hotel_id, timeline=False)['feasible']
+
+    def _resolve(self, planner_result: Dict, solution: Dict, free_days: set,
+                 free_hotel: bool, free_trains: bool, forbid: Dict[int, List[str]]) -> Optional[Dict]:
+        """复用已构建的模型（或已获取的数据），以当前方案为初始解，只放开出错部分重新求解"""
+        if self.planner.solver_pool is not None and self.planner.last_data_handle:
+            # 使用求解进程池时模型在求解进程中，按数据句柄提交带初始解的求解任务
+            new_solution, success = self.planner.solve_in_pool(
+                planner_result['travel_days'],
+                planner_result.get('peoples', 1),
+                planner_result.get('budget'),
+                planner_result.get('prefer_taxi', True),
+                warm_start={
+                    'solution': solution,
+                    'free_days': sorted(free_days),
+                    'free_hotel': free_hotel,
+                    'free_trains': free_trains,
+                    'forbid': forbid
+                }
+            )
+            return new_solution if success else None
+        
+        model = self.planner.last_model
+        data = self.planner.last_data
+        if model is None:
+            if data is None:
+                return None
+            model = self.planner.build_model(
+                data['cross_city_train_departure'],
+                data['cross_city_train_back'],
+                data['poi_data'],
+                data['intra_city_trans'],
+                planner_result['travel_days'],
+                planner_result.get('peoples', 1),
+                planner_result.get('budget'),
+                planner_result.get('prefer_taxi', True)
+            )
+            self.planner.last_model = model
+
+        self.planner.apply_warm_start(
+            model, solution,
+            free_days=sorted(free_days),
+            free_hotel=free_hotel,
+            free_trains=free_trains,
+            forbid=forbid
+        )
+        new_solution, success = self.planner.solve_model(model, warmstart=True)
+        return new_solution if success else None
+
+    def repair(self, planner_result: Dict, check_result: Optional[Dict] = None, max_rounds: int = 3) -> Dict:
+        """
+        修复行程方案
+
+        Args:
+            planner_result: PlannerAgent.plan_trip 的结果
+            check_result: check_solution / comprehensive_check 的结果（为空时重新检查）
+            max_rounds: 最大修复轮数
+
+        Returns:
+            与 plan_trip 结构相同的结果字典，额外包含 repair_log（执行过的修复动作）
+        """
+        if not planner_result.get('success'):
+            return planner_result
+
+        data = self.planner.last_data or {}
+        intra_city_trans = data.get('intra_city_trans', {})
+        travel_days = planner_result['travel_days']
+        peoples = planner_result.get('peoples', 1)
+        budget = planner_result.get('budget')
+        solution = copy.deepcopy(planner_result['solution'])
+
+        if check_result is None:
+            check_result = self.validate(solution, travel_days, peoples, budget, intra_city_trans)
+
+        repair_log = []
+        for _ in range(max_rounds):
+            if check_result.get('is_valid'):
+                break
+            actions = self.diagnose(check_result)
+            if not actions:
+                break
+
+            ctx = {
+                'travel_days': travel_days,
+                'peoples': peoples,
+                'intra_city_trans': intra_city_trans,
+                'restaurants': data.get('poi_data', {}).get('restaurants', [])
+            }
+            # 局部修复在增量状态上评估替换，每次替换 O(1)
+            state = PlanState(solution, travel_days, peoples, budget, intra_city_trans,
+                              validator=self.feedback.get_validator())
+            free_days = set()
+            free_hotel = False
+            free_trains = False
+            forbid = {}
+
+            for action in actions:
+                kind = action['action']
+                if kind == 'reduce_time' and self._fix_time(state, action, ctx):
+                    repair_log.append(dict(action, method='local'))
+                    continue
+                if kind == 'reduce_cost' and self._fix_cost(state, action, ctx):
+                    repair_log.append(dict(action, method='local'))
+                    continue
+                if kind == 'fix_hours' and self._fix_hours(state, action, ctx):
+                    repair_log.append(dict(action, method='local'))
+                    continue
+
+                # 局部修复失败，合并为一次重新求解
+                if kind in ('reduce_time', 'resolve_day', 'fix_hours'):
+                    free_days.add(action['day'])
+                    if action.get('restaurant_id'):
+                        forbid.setdefault(action['day'], []).append(action['restaurant_id'])
+                    if action.get('exclude_attraction'):
+                        attraction = solution.get('attractions', {}).get(action['day'])
+                        if attraction:
+                            forbid.setdefault(action['day'], []).append(attraction.get('id'))
+                elif kind == 'resolve_trains':
+                    free_trains = True
+                elif kind == 'resolve_hotel':
+                    free_hotel = True
+                else:
+                    free_days.update(range(1, travel_days + 1))
+                    free_hotel = True
+                    free_trains = True
+                repair_log.append(dict(action, method='resolve'))
+
+            if free_days or free_hotel or free_trains:
+                new_solution = self._resolve(planner_result, solution, free_days, free_hotel, free_trains, forbid)
+                if new_solution is None:
+                    break
+                solution = new_solution
+
+            check_result = self.validate(solution, travel_days, peoples, budget, intra_city_trans)
+
+        result = dict(planner_result)
+        result['solution'] = solution
+        result['success'] = bool(check_result.get('is_valid'))
+        result['check_result'] = check_result
+        result['repair_log'] = repair_log
+        if not result['success']:
+            result['error'] = '修复后方案仍未通过检查'
+        return result
@@ -2,33 +2,156 @@ import autogen
 import requests
 import sys
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Annotated, Dict, List, Optional
 from urllib.parse import quote
 
 # 添加父目录到 Python 路径，以便可以导入 config 模块
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import AGENT_CONFIG, TRAVEL_API_BASE_URL, TRAVEL_API_TIMEOUT
+from config import (RESEARCH_CACHE_MAX_ENTRIES, RESEARCH_CACHE_MAX_MB, RESEARCH_CACHE_PATH, RESEARCH_CACHE_TTL,
+                    TRAVEL_API_BASE_URL, TRAVEL_API_TIMEOUT, agent_config)
+from agents.tools import DEFAULT_TOOL_LIMIT, compact_nearby, compact_pois, compact_trains
+from utils.http_client import create_session
+from utils.response_cache import ResponseCache, cache_key
+from utils.tracing import span
+
+
+_research_cache = None
+_research_cache_lock = threading.Lock()
+
+
+def get_research_cache() -> Optional[ResponseCache]:
+    """获取进程级数据 API 响应缓存（所有 ResearcherAgent 共用，RESEARCH_CACHE_TTL 为 0 时不缓存）"""
+    global _research_cache
+    if RESEARCH_CACHE_TTL <= 0:
+        return None
+    if _research_cache is None:
+        with _research_cache_lock:
+            if _research_cache is None:
+                _research_cache = ResponseCache(
+                    ttl=RESEARCH_CACHE_TTL,
+                    max_entries=RESEARCH_CACHE_MAX_ENTRIES,
+                    max_bytes=int(RESEARCH_CACHE_MAX_MB * (1 << 20)),
+                    path=RESEARCH_CACHE_PATH
+                )
+    return _research_cache
 
 
 class ResearcherAgent:
-    def __init__(self):
+    def __init__(self, llm_config=None):
         # 使用 config.py 中已配置的 system_message
-        self.agent = autogen.AssistantAgent(**AGENT_CONFIG["researcher"])
+        self.agent = autogen.AssistantAgent(**agent_config("researcher", llm_config))
         self.api_base_url = TRAVEL_API_BASE_URL
         self.api_timeout = TRAVEL_API_TIMEOUT
+        # 复用连接的 Session；异步流程中替换为经事件循环发送请求的 Session
+        self.session = create_session()
+        # GET 响应缓存（进程内共用，同一城市的数据只请求一次）
+        self.cache = get_research_cache()
     
     def get_agent(self):
         return self.agent
     
-    def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Optional[Dict]:
+    def get_tools(self) -> Dict:
+        """
+        获取可注册为 autogen 工具的数据查询函数
+        工具输出为紧凑格式（id|名称|费用|评分...），只返回按评分排序后的前若干条
+        
+        Returns:
+            {工具名: (函数, 描述)}
+        """
+        def get_attractions(
+            city_name: Annotated[str, "城市名称，如 上海市"],
+            min_rating: Annotated[float, "最低评分，0 表示不限制"] = 0.0,
+            max_cost: Annotated[float, "最高门票价格，0 表示不限制"] = 0.0,
+            limit: Annotated[int, "返回条数上限"] = DEFAULT_TOOL_LIMIT
+        ) -> str:
+            pois = self.get_attractions(city_name, **self._tool_filters(min_rating, max_cost, limit))
+            return compact_pois(pois, 'attractions', limit, min_rating, max_cost)
+        
+        def get_accommodations(
+            city_name: Annotated[str, "城市名称，如 上海市"],
+            min_rating: Annotated[float, "最低评分，0 表示不限制"] = 0.0,
+            max_cost: Annotated[float, "每晚最高价格，0 表示不限制"] = 0.0,
+            limit: Annotated[int, "返回条数上限"] = DEFAULT_TOOL_LIMIT
+        ) -> str:
+            pois = self.get_accommodations(city_name, **self._tool_filters(min_rating, max_cost, limit))
+            return compact_pois(pois, 'accommodations', limit, min_rating, max_cost)
+        
+        def get_restaurants(
+            city_name: Annotated[str, "城市名称，如 上海市"],
+            min_rating: Annotated[float, "最低评分，0 表示不限制"] = 0.0,
+            max_cost: Annotated[float, "人均最高价格，0 表示不限制"] = 0.0,
+            limit: Annotated[int, "返回条数上限"] = DEFAULT_TOOL_LIMIT
+        ) -> str:
+            pois = self.get_restaurants(city_name, **self._tool_filters(min_rating, max_cost, limit))
+            return compact_pois(pois, 'restaurants', limit, min_rating, max_cost)
+        
+        def get_cross_city_transport(
+            origin_city: Annotated[str, "出发城市，如 深圳市"],
+            destination_city: Annotated[str, "目的地城市，如 上海市"],
+            limit: Annotated[int, "返回条数上限"] = DEFAULT_TOOL_LIMIT
+        ) -> str:
+            return compact_trains(self.get_cross_city_transport(origin_city, destination_city), limit)
+        
+        def get_nearby(
+            poi_id: Annotated[str, "中心 POI 的 id，如当天景点或酒店的 id"],
+            kind: Annotated[str, "查询类别：restaurants / attractions / accommodations"] = "restaurants",
+            min_rating: Annotated[float, "最低评分，0 表示不限制"] = 0.0,
+            max_cost: Annotated[float, "最高价格，0 表示不限制"] = 0.0,
+            limit: Annotated[int, "返回条数上限"] = DEFAULT_TOOL_LIMIT
+        ) -> str:
+            pois = self.get_nearby(
+                [poi_id], kind, k=limit,
+                min_rating=min_rating if min_rating > 0 else None,
+                max_cost=max_cost if max_cost > 0 else None
+            )
+            return compact_nearby(pois, kind if kind in ('attractions', 'accommodations') else 'restaurants')
+        
+        return {
+            'get_attractions': (get_attractions, "查询城市景点，返回按评分排序的紧凑列表（id|名称|门票|评分|建议游玩分钟）"),
+            'get_accommodations': (get_accommodations, "查询城市酒店，返回按评分排序的紧凑列表（id|名称|每晚价格|评分|类型）"),
+            'get_restaurants': (get_restaurants, "查询城市餐厅，返回按评分排序的紧凑列表（id|名称|人均|评分|用餐分钟|排队分钟）"),
+            'get_cross_city_transport': (get_cross_city_transport, "查询两城市间的火车，返回按票价排序的紧凑列表"),
+            'get_nearby': (get_nearby, "查询某个 POI 附近的餐厅/景点/酒店，返回按距离排序的紧凑列表（最后一列为距离km）"),
+        }
+    
+    @staticmethod
+    def _tool_filters(min_rating: float, max_cost: float, limit: int) -> Dict:
+        """工具参数转换为服务端筛选参数：按评分降序只取前 limit 条"""
+        filters = {"sort": "-rating", "limit": max(limit, 0)}
+        if min_rating > 0:
+            filters["min_rating"] = min_rating
+        if max_cost > 0:
+            filters["max_cost"] = max_cost
+        return filters
+    
+    def _http(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """发送请求，GET 请求先查缓存（过期条目带 If-None-Match 重新验证）"""
+        url = f"{self.api_base_url}{endpoint}"
+        if method != "GET" or self.cache is None:
+            return self._send(method, url, endpoint, **kwargs)
+        
+        def send(headers):
+            return self._send(method, url, endpoint, headers=headers or None, **kwargs)
+        
+        return self.cache.fetch(cache_key(method, url, kwargs.get("params")), send)
+    
+    def _send(self, method: str, url: str, endpoint: str, **kwargs) -> requests.Response:
+        """发送请求（开启追踪时记录为 api.request 阶段）"""
+        with span("api.request", method=method, endpoint=endpoint) as request_span:
+            response = self.session.request(method, url, timeout=self.api_timeout, **kwargs)
+            request_span.set(status=response.status_code, bytes=len(response.content))
+        return response
+    
+    def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None,
+                      params: Optional[Dict] = None) -> Optional[Dict]:
         """通用请求方法"""
         try:
-            url = f"{self.api_base_url}{endpoint}"
             if method == "GET":
-                response = requests.get(url, timeout=self.api_timeout)
+                response = self._http("GET", endpoint, params=params)
             elif method == "POST":
-                response = requests.post(url, json=data, timeout=self.api_timeout, headers={"Content-Type": "application/json"})
+                response = self._http("POST", endpoint, json=data, headers={"Content-Type": "application/json"})
             else:
                 return None
             
@@ -50,13 +173,12 @@ class ResearcherAgent:
         """获取跨城市交通数据（火车）"""
         # 使用 params 参数而不是手动拼接，这样可以自动处理 URL 编码
         endpoint = "/cross-city-transport/"
-        url = f"{self.api_base_url}{endpoint}"
         params = {
             "origin_city": origin_city,
             "destination_city": destination_city
         }
         try:
-            response = requests.get(url, params=params, timeout=self.api_timeout)
+            response = self._http("GET", endpoint, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -75,20 +197,61 @@ class ResearcherAgent:
         endpoint = f"/intra-city-transport/{quote(city_name)}"
         return self._make_request(endpoint)
     
-    def get_attractions(self, city_name: str) -> Optional[List[Dict]]:
-        """获取城市景点数据"""
+    def get_attractions(self, city_name: str, **filters) -> Optional[List[Dict]]:
+        """
+        获取城市景点数据
+        
+        Args:
+            city_name: 城市名称
+            **filters: 服务端筛选参数（min_rating / max_rating / min_cost / max_cost / type / feature /
+                       sort / fields / limit / offset），不传时返回城市全部景点
+        """
         endpoint = f"/attractions/{quote(city_name)}"
-        return self._make_request(endpoint)
+        return self._make_request(endpoint, params=filters or None)
     
-    def get_accommodations(self, city_name: str) -> Optional[List[Dict]]:
-        """获取城市住宿数据"""
+    def get_accommodations(self, city_name: str, **filters) -> Optional[List[Dict]]:
+        """获取城市住宿数据（filters 同 get_attractions）"""
         endpoint = f"/accommodations/{quote(city_name)}"
-        return self._make_request(endpoint)
+        return self._make_request(endpoint, params=filters or None)
     
-    def get_restaurants(self, city_name: str) -> Optional[List[Dict]]:
-        """获取城市餐厅数据"""
+    def get_restaurants(self, city_name: str, **filters) -> Optional[List[Dict]]:
+        """获取城市餐厅数据（filters 同 get_attractions）"""
         endpoint = f"/restaurants/{quote(city_name)}"
-        return self._make_request(endpoint)
+        return self._make_request(endpoint, params=filters or None)
+    
+    def get_nearby(self,
+                   poi_ids: Optional[List[str]] = None,
+                   kind: str = "restaurants",
+                   k: Optional[int] = None,
+                   radius: Optional[float] = None,
+                   latitude: Optional[float] = None,
+                   longitude: Optional[float] = None,
+                   city_name: Optional[str] = None,
+                   **filters) -> Optional[List[Dict]]:
+        """
+        空间近邻查询：以 POI（或坐标）为中心查询同城最近的 k 个或半径 radius（km）内的 POI
+        
+        Args:
+            poi_ids: 中心 POI ID 列表（多个中心时结果取并集）
+            kind: 'attractions' / 'accommodations' / 'restaurants'
+            latitude, longitude, city_name: 未提供 poi_ids 时以该坐标为中心
+            **filters: 筛选参数（type / feature / min_rating / max_rating / min_cost / max_cost）
+        
+        Returns:
+            按距离升序的 POI 列表，每条额外包含 distance（km）和 center_id
+        """
+        params = {
+            "kind": kind,
+            "poi_id": list(poi_ids or []),
+            "k": k,
+            "radius": radius,
+            "latitude": latitude,
+            "longitude": longitude,
+            "city_name": city_name,
+            **filters
+        }
+        params = {key: value for key, value in params.items() if value is not None and value != [] and value != ""}
+        return self._make_request("/nearby", params=params)
     
     def get_poi_data(self, city_name: str) -> Optional[Dict]:
         """获取城市所有 POI 数据"""
@@ -112,14 +275,13 @@ class ResearcherAgent:
     def get_train_info(self, train_number: str, origin_id: str, destination_id: str) -> Optional[Dict]:
         """根据车次号获取列车信息"""
         endpoint = "/train"
-        url = f"{self.api_base_url}{endpoint}"
         params = {
             "train_number": train_number,
             "origin_id": origin_id,
             "destination_id": destination_id
         }
         try:
-            response = requests.get(url, params=params, timeout=self.api_timeout)
+            response = self._http("GET", endpoint, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -157,7 +319,12 @@ class ResearcherAgent:
             results["accommodations"] = self.get_accommodations(city_name)
             results["restaurants"] = self.get_restaurants(city_name)
             results["intra_city_transport"] = self.get_intra_city_transport(city_name)
-            results["poi_data"] = self.get_poi_data(city_name)
+            # 由上面三类数据组成，不再请求 /poi-data 重复下载同样的记录
+            results["poi_data"] = {
+                "attractions": results["attractions"] or [],
+                "accommodations": results["accommodations"] or [],
+                "restaurants": results["restaurants"] or []
+            }
         
         # 如果提供了起始城市和目的地城市，获取跨城市交通数据
         origin_city = kwargs.get("origin_city")
@@ -0,0 +1,337 @@
+from datetime import datetime
+from itertools import permutations
+from typing import Dict, List, Optional, Tuple
+
+from utils.time_windows import ALL_DAY, earliest_start, format_clock, parse_hours, window_range, windows_on
+
+
+class DayScheduler:
+    """
+    日程排程器：为每天的早餐、去程、景点、午餐、晚餐和返程分配具体的起止时间
+
+    以 PlanValidator.build_table 的每日表为输入（通勤时间与约束检查口径一致），
+    每个 POI 的营业时间只解析一次并按 id 缓存。每天按固定顺序贪心地取最早可行的开始时间，
+    依次尝试“景点后午餐 / 景点前午餐”两种顺序和三家餐厅的早/午/晚餐分配，
+    取不违反营业时间且迟到餐次最少的一种；全部不可行时给出该天的错误，供修复和快速失败使用。
+    与规划模型一致，跨城火车时间不计入当天日程
+    """
+
+    MEALS = ('breakfast', 'lunch', 'dinner')
+    MEAL_NAMES = {'breakfast': '早餐', 'lunch': '午餐', 'dinner': '晚餐'}
+
+    def __init__(self,
+                 validator=None,
+                 day_start: int = 480,
+                 day_end: int = 1440,
+                 meal_windows: Optional[Dict[str, Tuple[int, int]]] = None):
+        """
+        Args:
+            validator: 提供每日表和通勤段缓存的 PlanValidator（可选）
+            day_start: 每天最早开始活动的时间（分钟，默认 08:00）
+            day_end: 每天最晚结束活动的时间（分钟，默认 24:00）
+            meal_windows: 各餐次的开始时间范围 {餐次: (最早, 最晚)}，早于最早时间时等待，晚于最晚时间记为迟到
+        """
+        if validator is None:
+            from agents.validation import PlanValidator
+            validator = PlanValidator()
+        self.validator = validator
+        self.day_start = day_start
+        self.day_end = day_end
+        self.meal_windows = meal_windows or {
+            'breakfast': (360, 630),
+            'lunch': (660, 870),
+            'dinner': (1020, 1290)
+        }
+
+        # POI id -> 解析后的营业时间（None 表示未知）
+        self._hours = {}
+
+    # ---- 营业时间 ----
+
+    def hours(self, poi: Dict) -> Optional[Dict]:
+        """POI 解析后的营业时间表（按 id 缓存）"""
+        poi_id = poi.get('id')
+        if poi_id in self._hours:
+            return self._hours[poi_id]
+        data = poi.get('data', poi)
+        if 'business_hours' in data:
+            hours = parse_hours(data.get('business_hours'))
+        else:
+            hours = window_range(data.get('open_time'), data.get('close_time'))
+        if poi_id is not None:
+            self._hours[poi_id] = hours
+        return hours
+
+    def windows(self, poi: Dict, weekday: Optional[int] = None):
+        """POI 在某个星期几（未知时为 None）的营业区间"""
+        return windows_on(self.hours(poi), weekday)
+
+    @staticmethod
+    def first_weekday(start_date: str) -> Optional[int]:
+        """出发日期（如 2025年6月10日 / 2025-06-10）是星期几，无法解析时返回 None"""
+        if not start_date:
+            return None
+        text = start_date.replace('年', '-').replace('月', '-').replace('日', '').strip()
+        try:
+            return datetime.strptime(text, '%Y-%m-%d').weekday()
+        except ValueError:
+            return None
+
+    # ---- 排程 ----
+
+    @staticmethod
+    def _data(item: Dict) -> Dict:
+        return item.get('data', item)
+
+    def _meal_step(self, steps: Dict, meal: str, slot: int) -> Dict:
+        """第 slot 家餐厅作为某个餐次的活动（按需生成并缓存在 steps 中）"""
+        key = (meal, slot)
+        step = steps['meals'].get(key)
+        if step is None:
+            step = dict(steps['restaurants'][slot], activity=meal,
+                        not_before=self.meal_windows[meal][0], due=self.meal_windows[meal][1])
+            steps['meals'][key] = step
+        return step
+
+    def _day_steps(self, entry: Dict, hotel_id, weekday: Optional[int]) -> Dict:
+        """当天各项活动的时长和营业区间，不同顺序的排程共用"""
+        restaurants = []
+        for slot, rest in enumerate(entry['restaurants'][:len(self.MEALS)]):
+            data = self._data(rest)
+            restaurants.append({
+                'poi': rest,
+                'slot': slot,
+                'duration': float(data.get('duration', 0)) + float(data.get('queue_time', 0)),
+                'windows': self.windows(rest, weekday)
+            })
+        steps = {'restaurants': restaurants, 'meals': {}, 'visit': None, 'out': None, 'back': None}
+        attraction = entry['attraction']
+        if attraction is None:
+            return steps
+        attr_id = attraction.get('id')
+        steps['visit'] = {
+            'activity': 'attraction',
+            'poi': attraction,
+            'duration': float(self._data(attraction).get('duration', 0)),
+            'windows': self.windows(attraction, weekday),
+            'not_before': 0,
+            'due': None
+        }
+        if hotel_id:
+            steps['out'] = self._transport_step(hotel_id, attr_id, entry['mode'], entry['out_duration'])
+            if not entry['last']:
+                steps['back'] = self._transport_step(attr_id, hotel_id, entry['mode'], entry['back_duration'])
+        return steps
+
+    def _sequence(self, steps: Dict, order: Tuple[int, ...], lunch_first: bool) -> List[Dict]:
+        """按给定的餐厅分配和午餐位置排列当天的活动"""
+        meals = {meal: self._meal_step(steps, meal, slot) for meal, slot in zip(self.MEALS, order)}
+        sequence = [meals['breakfast']] if 'breakfast' in meals else []
+        if steps['visit'] is None:
+            sequence.extend(meals[meal] for meal in ('lunch', 'dinner') if meal in meals)
+            return sequence
+        if steps['out'] is not None:
+            sequence.append(steps['out'])
+        if lunch_first and 'lunch' in meals:
+            sequence.extend([meals['lunch'], steps['visit']])
+        else:
+            sequence.append(steps['visit'])
+            if 'lunch' in meals:
+                sequence.append(meals['lunch'])
+        if 'dinner' in meals:
+            sequence.append(meals['dinner'])
+        if steps['back'] is not None:
+            sequence.append(steps['back'])
+        return sequence
+
+    @staticmethod
+    def _transport_step(origin_id, destination_id, mode: str, duration: float) -> Dict:
+        return {
+            'activity': 'transport',
+            'ori_id': origin_id,
+            'des_id': destination_id,
+            'mode': mode,
+            'duration': duration,
+            'windows': ALL_DAY,
+            'not_before': 0,
+            'due': None
+        }
+
+    def _simulate(self, steps: List[Dict]) -> Dict:
+        """按顺序为每项活动取最早可行的开始时间"""
+        clock = self.day_start
+        placed = []
+        late = []
+        for step in steps:
+            ready = max(clock, step['not_before'])
+            start = earliest_start(step['windows'], ready, step['duration'])
+            if start is None or start + step['duration'] > self.day_end:
+                overrun = ready + step['duration'] > self.day_end
+                return {'placed': placed, 'late': late, 'failed': step, 'overrun': overrun, 'ready': ready}
+            end = start + step['duration']
+            placed.append((step, start, end))
+            if step['due'] is not None and start > step['due']:
+                late.append((step, start))
+            clock = end
+        return {'placed': placed, 'late': late, 'failed': None, 'overrun': False, 'ready': clock}
+
+    def _timeline(self, placed: List[Tuple[Dict, float, float]]) -> List[Dict]:
+        timeline = []
+        for step, start, end in placed:
+            if step['activity'] == 'transport':
+                event = {
+                    'activity': 'transport',
+                    'ori_id': step['ori_id'],
+                    'des_id': step['des_id'],
+                    'mode': step['mode']
+                }
+            else:
+                event = {'activity': step['activity'], 'id': step['poi'].get('id')}
+            event['start'] = format_clock(start)
+            event['end'] = format_clock(end)
+            timeline.append(event)
+        return timeline
+
+    def _failure_issue(self, day: int, attempt: Dict) -> Dict:
+        step = attempt['failed']
+        if attempt['overrun']:
+            return {
+                'type': 'schedule_overrun',
+                'day': day,
+                'issue': f'第{day}天：考虑营业时间和等待后，当天活动无法在{format_clock(self.day_end)}前结束',
+                'ready': format_clock(attempt['ready']),
+                'day_end': format_clock(self.day_end),
+                'severity': 'error',
+                'explanation': f'按营业时间排程后，第{day}天的活动需要等待开门，结束时间超出当天可用时间'
+            }
+        poi = step['poi']
+        hours = ' '.join(f'{format_clock(s)}-{format_clock(e)}' for s, e in step['windows']) or '当天不营业'
+        if step['activity'] == 'attraction':
+            return {
+                'type': 'attraction_closed',
+                'day': day,
+                'issue': f'第{day}天：景点{poi.get("name", poi.get("id"))}的开放时间（{hours}）内无法完成{step["duration"]:.0f}分钟的游览',
+                'attraction_id': poi.get('id'),
+                'hours': hours,
+                'severity': 'error',
+                'explanation': f'到达景点时间为{format_clock(attempt["ready"])}，开放时间内剩余时间不足以完成游览'
+            }
+        meal = self.MEAL_NAMES[step['activity']]
+        return {
+            'type': 'restaurant_closed',
+            'day': day,
+            'issue': f'第{day}天：餐厅{poi.get("name", poi.get("id"))}的营业时间（{hours}）无法安排{meal}',
+            'restaurant_id': poi.get('id'),
+            'meal': step['activity'],
+            'slot': step['slot'],
+            'hours': hours,
+            'severity': 'error',
+            'explanation': f'{format_clock(attempt["ready"])}之后该餐厅的营业时间内无法完成{step["duration"]:.0f}分钟的用餐'
+        }
+
+    def _late_issue(self, day: int, step: Dict, start: float) -> Dict:
+        meal = self.MEAL_NAMES[step['activity']]
+        return {
+            'type': 'late_meal',
+            'day': day,
+            'issue': f'第{day}天：{meal}开始时间为{format_clock(start)}，晚于{format_clock(step["due"])}',
+            'restaurant_id': step['poi'].get('id'),
+            'meal': step['activity'],
+            'start': format_clock(start),
+            'severity': 'warning',
+            'explanation': f'受景点游览和营业时间影响，{meal}只能推迟到{format_clock(start)}'
+        }
+
+    def schedule_day(self, entry: Dict, hotel_id=None, weekday: Optional[int] = None,
+                     timeline: bool = True) -> Dict:
+        """
+        为 build_table 的一天排程
+
+        Args:
+            entry: build_table 结果中的一天
+            hotel_id: 酒店 id
+            weekday: 星期几（0=周一，未知时为 None）
+            timeline: 是否生成时间线（只需判断可行性时可关闭）
+
+        Returns:
+            {'day', 'feasible', 'meals': 早/午/晚餐对应的餐厅下标, 'timeline': [活动], 'issues': [问题]}
+            timeline 中每项为 {'activity', 'id' 或 'ori_id'/'des_id'/'mode', 'start', 'end'}
+        """
+        day = entry['day']
+        steps = self._day_steps(entry, hotel_id, weekday)
+        slots = tuple(range(min(len(entry['restaurants']), len(self.MEALS))))
+        # 总时长已超出当天可用时间时，任何顺序都不可行，只排一次
+        total = sum(step['duration'] for step in self._sequence(steps, slots, False))
+        orders = [slots] if self.day_start + total > self.day_end else permutations(slots)
+        best = None
+        best_key = None
+        # 原始分配优先：只有它违反营业时间或迟到更多时才改用其他分配
+        for order in orders:
+            for lunch_first in (False, True):
+                attempt = self._simulate(self._sequence(steps, order, lunch_first))
+                if attempt['failed'] is None:
+                    key = (0, len(attempt['late']))
+                else:
+                    key = (1, -len(attempt['placed']))
+                if best is None or key < best_key:
+                    best, best_key = dict(attempt, order=order), key
+                if best_key == (0, 0):
+                    break
+            if best_key == (0, 0):
+                break
+
+        if best['failed'] is not None:
+            issues = [self._failure_issue(day, best)]
+        else:
+            issues = [self._late_issue(day, step, start) for step, start in best['late']]
+        return {
+            'day': day,
+            'feasible': best['failed'] is None,
+            'meals': list(best['order']),
+            'timeline': self._timeline(best['placed']) if timeline else [],
+            'issues': issues
+        }
+
+    def schedule_table(self, table: Dict, first_weekday: Optional[int] = None, timeline: bool = True) -> Dict:
+        """
+        为 build_table 的结果逐天排程（参数含义见 schedule_day）
+
+        Returns:
+            {'feasible', 'days': [schedule_day 的结果], 'issues': [问题], 'infeasible_days': [天]}
+        """
+        days = []
+        issues = []
+        for entry in table['days']:
+            weekday = None if first_weekday is None else (first_weekday + entry['day'] - 1) % 7
+            result = self.schedule_day(entry, table['hotel_id'], weekday, timeline)
+            days.append(result)
+            issues.extend(result['issues'])
+        infeasible_days = [result['day'] for result in days if not result['feasible']]
+        return {
+            'feasible': not infeasible_days,
+            'days': days,
+            'issues': issues,
+            'infeasible_days': infeasible_days
+        }
+
+    def schedule(self,
+                 solution: Dict,
+                 travel_days: int,
+                 intra_city_trans: Optional[Dict] = None,
+                 start_date: str = "",
+                 peoples: int = 1) -> Dict:
+        """
+        为整个方案排程
+
+        Args:
+            solution: planner 格式的行程方案
+            travel_days: 旅行天数
+            intra_city_trans: 市内交通数据
+            start_date: 出发日期（用于按星期区分的营业时间，可为空）
+            peoples: 人数
+
+        Returns:
+            与 schedule_table 相同
+        """
+        table = self.validator.build_table(solution, travel_days, peoples, intra_city_trans or {})
+        return self.schedule_table(table, self.first_weekday(start_date))
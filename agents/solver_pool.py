@@ -0,0 +1,350 @@
+"""
+求解进程池：建模和 SCIP 求解在独立的工作进程中进行，与驱动 LLM 对话的线程/事件循环互不占用
+- 任务 = 数据句柄 + 行程参数：城市数据用 register_data 写入共享目录一次，任务只传句柄，
+  工作进程按句柄缓存最近使用的数据（同一城市的后续任务和修复任务不再重复传输）
+- 每个工作进程绑定一个 CPU 核（sched_setaffinity，平台不支持时跳过），并自成进程组，
+  超时或取消正在执行的任务时连同 SCIP 子进程一起结束，再启动新的工作进程
+- 有界等待队列：队列满时 submit 阻塞（可设等待上限，超时抛出 SolverPoolFull），形成反压
+- submit 返回 concurrent.futures.Future，异步代码可用 asyncio.wrap_future 等待
+"""
+
+import hashlib
+import multiprocessing
+import os
+import pickle
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+from config import SOLVER_MAX_PENDING, SOLVER_TIMEOUT
+
+
+class SolverTimeoutError(TimeoutError):
+    """求解任务超过时限"""
+
+
+class SolverWorkerError(RuntimeError):
+    """工作进程异常退出或任务执行出错"""
+
+
+class SolverPoolFull(RuntimeError):
+    """等待队列已满"""
+
+
+def _load_data(handle: str, cache: OrderedDict, cache_size: int) -> Dict:
+    data = cache.get(handle)
+    if data is None:
+        with open(handle, "rb") as f:
+            data = pickle.load(f)
+        cache[handle] = data
+        while len(cache) > cache_size:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(handle)
+    return data
+
+
+def _worker_main(conn, core: Optional[int], cache_size: int) -> None:
+    """工作进程：循环接收任务，建模、求解后返回 (状态, 结果)"""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+    from agents.planner import PlannerAgent
+
+    planner = PlannerAgent.without_agent()
+    cache: OrderedDict = OrderedDict()
+    last_key, last_model = None, None
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        try:
+            data = _load_data(job["data"], cache, cache_size)
+            key = (job["data"], job["travel_days"], job["peoples"], job["budget"], job["prefer_taxi"])
+            warm_start = job.get("warm_start")
+            # 带初始解的修复任务复用同一数据和参数下构建的模型（apply_warm_start 会先解除上一次的固定）
+            if warm_start and key == last_key:
+                model = last_model
+            else:
+                model = planner.build_model(
+                    data['cross_city_train_departure'],
+                    data['cross_city_train_back'],
+                    data['poi_data'],
+                    data['intra_city_trans'],
+                    job["travel_days"],
+                    job["peoples"],
+                    job["budget"],
+                    job["prefer_taxi"]
+                )
+                last_key, last_model = key, model
+            if warm_start:
+                planner.apply_warm_start(model, **warm_start)
+            conn.send(("ok", planner.solve_model(model, warmstart=bool(warm_start))))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Job:
+    __slots__ = ("payload", "future", "timeout", "deadline", "cancel_requested")
+
+    def __init__(self, payload: Dict, timeout: Optional[float]):
+        self.payload = payload
+        self.future: Future = Future()
+        self.timeout = timeout
+        self.deadline = None
+        self.cancel_requested = False
+
+
+class _Worker:
+    def __init__(self, context, index: int, core: Optional[int], cache_size: int):
+        self.index = index
+        self.core = core
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, core, cache_size),
+                                       name=f"solver-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.job: Optional[_Job] = None
+
+    def kill(self) -> None:
+        """结束工作进程及其进程组（包括正在运行的 SCIP）"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class SolverPool:
+    """
+    求解进程池
+
+    Args:
+        processes: 工作进程数（为空时取可用 CPU 核数）
+        max_pending: 等待队列上限（默认 SOLVER_MAX_PENDING，为 0 时取进程数的 2 倍）
+        timeout: 单个任务的默认时限（秒，从开始执行计时），为 0 时不限制
+        pin_cores: 是否把工作进程绑定到 CPU 核
+        cache_size: 每个工作进程缓存的数据份数
+    """
+
+    def __init__(self, processes: Optional[int] = None, max_pending: int = SOLVER_MAX_PENDING,
+                 timeout: float = SOLVER_TIMEOUT, pin_cores: bool = True, cache_size: int = 4):
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+        self.processes = processes or len(cores) or os.cpu_count() or 1
+        self.max_pending = max_pending or self.processes * 2
+        self.timeout = timeout or None
+        self.cache_size = cache_size
+        self._cores = cores if pin_cores else []
+        # spawn：调用方进程中有多个线程（对话通道、事件循环），fork 可能复制处于加锁状态的锁
+        self._context = multiprocessing.get_context("spawn")
+        self._data_dir = tempfile.mkdtemp(prefix="solver-data-")
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "timed_out": 0, "cancelled": 0, "restarts": 0}
+        self._workers: List[_Worker] = [self._spawn(i) for i in range(self.processes)]
+        self._thread = threading.Thread(target=self._dispatch, name="solver-dispatch", daemon=True)
+        self._thread.start()
+
+    def _spawn(self, index: int) -> _Worker:
+        core = self._cores[index % len(self._cores)] if self._cores else None
+        return _Worker(self._context, index, core, self.cache_size)
+
+    def register_data(self, data: Dict) -> str:
+        """写入规划数据（trains、poi_data、intra_city_trans），返回数据句柄；内容相同的数据共用一个句柄"""
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        path = os.path.join(self._data_dir, hashlib.sha1(blob).hexdigest()[:20] + ".pickle")
+        if not os.path.exists(path):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(blob)
+            os.replace(temp_path, path)
+        return path
+
+    def submit(self, handle: str, travel_days: int, peoples: int = 1, budget: Optional[float] = None,
+               prefer_taxi: bool = True, warm_start: Optional[Dict] = None, timeout: Optional[float] = None,
+               block: bool = True, queue_timeout: Optional[float] = None) -> Future:
+        """
+        提交求解任务，Future 的结果为 (solution, success)
+
+        Args:
+            handle: register_data 返回的数据句柄
+            warm_start: apply_warm_start 的参数（solution、free_days 等）
+            timeout: 任务时限（秒），为空时使用池的默认时限
+            block: 队列满时是否等待
+            queue_timeout: 队列满时最多等待的秒数
+
+        Raises:
+            SolverPoolFull: 队列满且不等待（或等待超时）
+        """
+        job = _Job({
+            "data": handle,
+            "travel_days": travel_days,
+            "peoples": peoples,
+            "budget": budget,
+            "prefer_taxi": prefer_taxi,
+            "warm_start": warm_start
+        }, timeout if timeout is not None else self.timeout)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SolverPool 已关闭")
+            if len(self._pending) >= self.max_pending:
+                if not block or not self._cond.wait_for(
+                        lambda: self._closed or len(self._pending) < self.max_pending, queue_timeout):
+                    raise SolverPoolFull(f"求解队列已满（{self.max_pending}）")
+                if self._closed:
+                    raise RuntimeError("SolverPool 已关闭")
+            self._pending.append(job)
+            self._stats["submitted"] += 1
+            self._cond.notify_all()
+        return job.future
+
+    def solve(self, handle: str, travel_days: int, peoples: int = 1, budget: Optional[float] = None,
+              prefer_taxi: bool = True, warm_start: Optional[Dict] = None,
+              timeout: Optional[float] = None) -> Tuple[Dict, bool]:
+        """提交任务并等待结果（超时抛出 SolverTimeoutError，出错抛出 SolverWorkerError）"""
+        return self.submit(handle, travel_days, peoples, budget, prefer_taxi, warm_start, timeout).result()
+
+    def cancel(self, future: Future) -> bool:
+        """取消任务：等待中的直接取消，执行中的结束其工作进程（Future 抛出 CancelledError）"""
+        if future.cancel():
+            return True
+        with self._cond:
+            for worker in self._workers:
+                if worker.job is not None and worker.job.future is future:
+                    worker.job.cancel_requested = True
+                    self._cond.notify_all()
+                    return True
+        return False
+
+    def _next_job(self) -> Optional[_Job]:
+        while self._pending:
+            job = self._pending.popleft()
+            self._cond.notify_all()
+            if job.future.set_running_or_notify_cancel():
+                return job
+            self._stats["cancelled"] += 1
+        return None
+
+    def _restart(self, worker: _Worker) -> None:
+        worker.kill()
+        self._workers[worker.index] = self._spawn(worker.index)
+        self._stats["restarts"] += 1
+
+    def _dispatch(self) -> None:
+        """分派线程：把等待中的任务交给空闲进程，收集结果，处理超时、取消和进程异常退出"""
+        while True:
+            with self._cond:
+                for worker in self._workers:
+                    if worker.job is None:
+                        job = self._next_job()
+                        if job is None:
+                            break
+                        job.deadline = time.monotonic() + job.timeout if job.timeout else None
+                        try:
+                            worker.conn.send(job.payload)
+                        except OSError:
+                            self._stats["failed"] += 1
+                            self._restart(worker)
+                            job.future.set_exception(SolverWorkerError("无法向求解进程发送任务"))
+                            continue
+                        worker.job = job
+                busy = [worker for worker in self._workers if worker.job is not None]
+                if not busy:
+                    if self._closed and not self._pending:
+                        break
+                    self._cond.wait(0.5)
+                    continue
+
+            deadlines = [worker.job.deadline for worker in busy if worker.job.deadline is not None]
+            wait_seconds = 0.1
+            if deadlines:
+                wait_seconds = max(0.0, min(wait_seconds, min(deadlines) - time.monotonic()))
+            ready = wait([worker.conn for worker in busy], wait_seconds)
+
+            with self._cond:
+                for worker in busy:
+                    job = worker.job
+                    if worker.conn in ready:
+                        try:
+                            status, value = worker.conn.recv()
+                        except (EOFError, OSError):
+                            status, value = "died", f"求解进程异常退出（exitcode={worker.process.exitcode}）"
+                        if status == "ok":
+                            worker.job = None
+                            self._stats["completed"] += 1
+                            job.future.set_result(value)
+                            continue
+                        self._stats["failed"] += 1
+                        if status == "died":
+                            self._restart(worker)
+                        else:
+                            worker.job = None
+                        job.future.set_exception(SolverWorkerError(value))
+                    elif job.cancel_requested:
+                        self._stats["cancelled"] += 1
+                        self._restart(worker)
+                        job.future.set_exception(CancelledError())
+                    elif job.deadline is not None and time.monotonic() >= job.deadline:
+                        self._stats["timed_out"] += 1
+                        self._restart(worker)
+                        job.future.set_exception(SolverTimeoutError(f"求解超过 {job.timeout} 秒"))
+                    elif not worker.process.is_alive():
+                        self._stats["failed"] += 1
+                        self._restart(worker)
+                        job.future.set_exception(SolverWorkerError("求解进程异常退出"))
+
+        for worker in self._workers:
+            worker.stop()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending),
+                        busy=sum(1 for worker in self._workers if worker.job is not None),
+                        processes=self.processes)
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """关闭进程池：等待已提交的任务完成（cancel_pending 时取消等待中的任务）后结束工作进程"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            if cancel_pending:
+                for job in self._pending:
+                    job.future.cancel()
+            self._cond.notify_all()
+        self._thread.join()
+        shutil.rmtree(self._data_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(cancel_pending=exc_type is not None)
+        return False
@@ -0,0 +1,137 @@
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.tracing import traced
+
+# 工具输出中每类 POI 默认返回的条数（按评分排序后截取）
+DEFAULT_TOOL_LIMIT = 20
+
+# 各类 POI 在工具输出中保留的字段（按顺序以 | 拼接）
+POI_FIELDS = {
+    'attractions': ('id', 'name', 'cost', 'rating', 'duration'),
+    'accommodations': ('id', 'name', 'cost', 'rating', 'type'),
+    'restaurants': ('id', 'name', 'cost', 'rating', 'duration', 'queue_time'),
+}
+TRAIN_FIELDS = ('train_number', 'origin_id', 'destination_id', 'cost', 'duration')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def compact_records(records: Iterable[Dict], fields: Tuple[str, ...]) -> List[str]:
+    """将记录压缩为 'v1|v2|...' 形式的字符串列表"""
+    return ['|'.join(_format_value(record.get(field, '')) for field in fields) for record in records]
+
+
+def compact_pois(
+    pois: Optional[List[Dict]],
+    kind: str,
+    limit: int = DEFAULT_TOOL_LIMIT,
+    min_rating: float = 0.0,
+    max_cost: float = 0.0
+) -> str:
+    """
+    生成紧凑的 POI 列表输出：按评分降序筛选后只返回前 limit 条
+
+    Args:
+        pois: API 返回的 POI 列表
+        kind: 'attractions' / 'accommodations' / 'restaurants'
+        limit: 返回条数上限
+        min_rating: 最低评分（0 表示不限制）
+        max_cost: 最高价格（0 表示不限制）
+    """
+    if not pois:
+        return json.dumps({'total': 0, 'items': []}, ensure_ascii=False)
+    selected = [
+        p for p in pois
+        if float(p.get('rating', 0)) >= min_rating and (max_cost <= 0 or float(p.get('cost', 0)) <= max_cost)
+    ]
+    selected.sort(key=lambda p: float(p.get('rating', 0)), reverse=True)
+    fields = POI_FIELDS[kind]
+    return json.dumps({
+        'total': len(pois),
+        'matched': len(selected),
+        'fields': '|'.join(fields),
+        'items': compact_records(selected[:max(limit, 0)], fields)
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def compact_nearby(pois: Optional[List[Dict]], kind: str) -> str:
+    """生成紧凑的近邻查询输出：保持 /nearby 的距离升序，最后一列为距离（km）"""
+    if not pois:
+        return json.dumps({'total': 0, 'items': []}, ensure_ascii=False)
+    fields = POI_FIELDS[kind] + ('distance',)
+    return json.dumps({
+        'total': len(pois),
+        'fields': '|'.join(fields),
+        'items': compact_records(pois, fields)
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def compact_trains(trains: Optional[List[Dict]], limit: int = DEFAULT_TOOL_LIMIT) -> str:
+    """生成紧凑的火车列表输出（按费用升序）"""
+    if not trains:
+        return json.dumps({'total': 0, 'items': []}, ensure_ascii=False)
+    ordered = sorted(trains, key=lambda t: float(t.get('cost', 0) or 0))
+    return json.dumps({
+        'total': len(trains),
+        'fields': '|'.join(TRAIN_FIELDS),
+        'items': compact_records(ordered[:max(limit, 0)], TRAIN_FIELDS)
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def compact_plan_result(result: Dict) -> str:
+    """生成紧凑的规划结果输出：只保留 id、名称和每日交通方式"""
+    if not result.get('success'):
+        return json.dumps({'success': False, 'error': result.get('error', '')}, ensure_ascii=False)
+
+    solution = result['solution']
+    accommodations = solution.get('accommodations', [])
+    plan = []
+    for day in range(1, result['travel_days'] + 1):
+        attraction = solution.get('attractions', {}).get(day) or {}
+        plan.append({
+            'day': day,
+            'attraction': f"{attraction.get('id', '')}|{attraction.get('name', '')}",
+            'restaurants': [f"{r.get('id', '')}|{r.get('name', '')}" for r in solution.get('restaurants', {}).get(day, [])],
+            'mode': solution.get('transport_mode', {}).get(day, 'taxi')
+        })
+    return json.dumps({
+        'success': True,
+        'travel_days': result['travel_days'],
+        'peoples': result.get('peoples', 1),
+        'budget': result.get('budget'),
+        'hotel': f"{accommodations[0].get('id', '')}|{accommodations[0].get('name', '')}" if accommodations else '',
+        'train_departure': (solution.get('train_departure') or {}).get('train_number', ''),
+        'train_back': (solution.get('train_back') or {}).get('train_number', ''),
+        'plan': plan
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def register_tools(caller, executor, tools: Dict[str, Tuple[Callable, str]]) -> None:
+    """
+    将工具注册到 autogen agent：caller 负责生成调用，executor 负责执行
+
+    caller 通常是池中复用的 AssistantAgent，同名工具只注册一次（重复注册会重建 LLM client）；
+    executor 通常是每个任务自己的 user_proxy
+
+    Args:
+        caller: 发起工具调用的 autogen agent
+        executor: 执行工具的 autogen agent
+        tools: {工具名: (函数, 描述)}
+    """
+    registered = getattr(caller, '_travel_tools', None)
+    if registered is None:
+        registered = set()
+        caller._travel_tools = registered
+
+    for name, (func, description) in tools.items():
+        if name not in registered:
+            caller.register_for_llm(name=name, description=description)(func)
+            registered.add(name)
+        if name not in executor.function_map:
+            # 执行端记录为 tool.<工具名> 阶段（开启追踪时）
+            executor.register_for_execution(name=name)(traced(f"tool.{name}")(func))
@@ -0,0 +1,544 @@
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from utils.geo import get_coordinates, haversine
+
+from agents.scheduler import DayScheduler
+
+# 一条通勤段（origin→destination）解析后的交通参数；exists 表示数据中存在 "origin,destination" 这个键
+Leg = namedtuple('Leg', ['exists', 'taxi_duration', 'taxi_cost', 'bus_duration', 'bus_cost'])
+
+
+class PlanValidator:
+    """
+    单次遍历的行程校验引擎，FeedbackAgent 与 CheckAgent 共用
+
+    先把每天的通勤段（酒店↔景点）在市内交通数据中各查一次，得到每日费用/时间表，
+    再基于这张表一次性评估全部约束和合理性规则。
+    FeedbackAgent.check_constraint_* / check_budget、CheckAgent.check_* 只读取 validate 结果中对应规则的分组
+    """
+
+    # FeedbackAgent 规则顺序
+    CONSTRAINT_RULES = ('constraint_1', 'constraint_2_3', 'constraint_4', 'constraint_5_6', 'constraint_8_9', 'budget')
+    # CheckAgent 规则顺序
+    REALISTIC_RULES = ('realistic_transport_time', 'activity_sequence', 'train_schedule', 'data_consistency',
+                       'opening_hours')
+
+    def __init__(self,
+                 max_daily_time: float = 840,
+                 meals_per_day: int = 3,
+                 taxi_capacity: int = 4,
+                 max_taxi_speed: float = 80,
+                 min_taxi_speed: float = 10,
+                 max_bus_speed: float = 60,
+                 max_city_distance: float = 100,
+                 min_realistic_time: float = 5,
+                 max_distance_for_time: Optional[Dict[str, float]] = None,
+                 detour_factor: float = 1.3,
+                 max_restaurant_distance: float = 10):
+        self.max_daily_time = max_daily_time
+        self.meals_per_day = meals_per_day
+        self.taxi_capacity = taxi_capacity
+        self.max_taxi_speed = max_taxi_speed
+        self.min_taxi_speed = min_taxi_speed
+        self.max_bus_speed = max_bus_speed
+        self.max_city_distance = max_city_distance
+        self.min_realistic_time = min_realistic_time
+        self.max_distance_for_time = max_distance_for_time or {'taxi': 0.8, 'bus': 0.5}
+        self.detour_factor = detour_factor
+        self.max_restaurant_distance = max_restaurant_distance
+
+        # 通勤段缓存：同一份市内交通数据上，每个 (origin, destination) 只解析一次
+        self._legs = {}
+        self._legs_source = None
+        self._legs_size = 0
+
+        self._scheduler = None
+
+    def get_scheduler(self) -> DayScheduler:
+        """共用本引擎每日表和通勤段缓存的日程排程器（营业时间按 POI 缓存）"""
+        if self._scheduler is None:
+            self._scheduler = DayScheduler(self)
+        return self._scheduler
+
+    @staticmethod
+    def _param(data: Optional[Dict], param_type: str) -> float:
+        if data is None:
+            return 0.0
+        value = float(data.get(param_type, 0))
+        return value if value > 0 else 0.0
+
+    def _bind_transport(self, intra_city_trans: Dict) -> None:
+        """切换市内交通数据时清空通勤段缓存（交通数据在一次规划中视为只读）"""
+        if intra_city_trans is not self._legs_source or len(intra_city_trans) != self._legs_size:
+            self._legs = {}
+            self._legs_source = intra_city_trans
+            self._legs_size = len(intra_city_trans)
+
+    def resolve_leg(self, intra_city_trans: Dict, origin_id, destination_id) -> Leg:
+        """
+        解析一条通勤段的交通参数
+        先查 "origin,destination"，再查反向；时间、费用缺失或非正数时取 0
+        """
+        self._bind_transport(intra_city_trans)
+        return self._leg(intra_city_trans, origin_id, destination_id)
+
+    def _leg(self, intra_city_trans: Dict, origin_id, destination_id) -> Leg:
+        """resolve_leg 的缓存查找部分（调用方已对 intra_city_trans 执行 _bind_transport）"""
+        key = (origin_id, destination_id)
+        leg = self._legs.get(key)
+        if leg is None:
+            forward_key = f"{origin_id},{destination_id}"
+            data = intra_city_trans.get(forward_key)
+            if data is None:
+                data = intra_city_trans.get(f"{destination_id},{origin_id}")
+            leg = Leg(
+                forward_key in intra_city_trans,
+                self._param(data, 'taxi_duration'),
+                self._param(data, 'taxi_cost'),
+                self._param(data, 'bus_duration'),
+                self._param(data, 'bus_cost')
+            )
+            self._legs[key] = leg
+        return leg
+
+    def build_table(self, solution: Dict, travel_days: int, peoples: int, intra_city_trans: Dict) -> Dict:
+        """
+        构建每日费用/时间表，每条通勤段只解析一次交通数据
+
+        Returns:
+            {
+                'hotel_id', 'has_hotel', 'hotel_cost',
+                'days': [{'day', 'attraction', 'restaurants', 'mode', 'last', 'out', 'back',
+                          'out_duration', 'back_duration', 'activity_time',
+                          'attraction_cost', 'restaurant_costs', 'transport_cost'}, ...]
+            }
+            out/back 为酒店→景点、景点→酒店的 Leg（无住宿或景点时为 None），
+            out_duration/back_duration 为按当天交通方式取的时间（最后一天不计返程）
+        """
+        self._bind_transport(intra_city_trans)
+        attractions = solution.get('attractions', {})
+        all_restaurants = solution.get('restaurants', {})
+        transport_modes = solution.get('transport_mode', {})
+        accommodations = solution.get('accommodations', [])
+        hotel_id = accommodations[0].get('id') if accommodations else None
+        hotel_cost = float(accommodations[0].get('data', {}).get('cost', 0)) if accommodations else 0.0
+        taxi_trips = (peoples + self.taxi_capacity - 1) // self.taxi_capacity
+
+        days = []
+        for day in range(1, travel_days + 1):
+            attraction = attractions.get(day)
+            restaurants = all_restaurants.get(day, [])
+            mode = transport_modes.get(day, 'taxi')
+            last = day == travel_days
+
+            activity_time = 0.0
+            attraction_cost = 0.0
+            if attraction is not None:
+                attr_data = attraction.get('data', {})
+                activity_time += float(attr_data.get('duration', 0))
+                attraction_cost = float(attr_data.get('cost', 0)) * peoples
+            restaurant_costs = []
+            for rest in restaurants:
+                rest_data = rest.get('data', {})
+                activity_time += float(rest_data.get('duration', 0)) + float(rest_data.get('queue_time', 0))
+                restaurant_costs.append(float(rest_data.get('cost', 0)) * peoples)
+
+            out = back = None
+            out_duration = back_duration = 0.0
+            transport_cost = 0.0
+            if accommodations and attraction is not None:
+                attr_id = attraction.get('id')
+                out = self._leg(intra_city_trans, hotel_id, attr_id)
+                back = self._leg(intra_city_trans, attr_id, hotel_id)
+                if mode == 'taxi':
+                    out_duration = out.taxi_duration
+                    leg_cost = out.taxi_cost
+                    if not last:
+                        back_duration = back.taxi_duration
+                        leg_cost += back.taxi_cost
+                    transport_cost = taxi_trips * leg_cost
+                else:
+                    out_duration = out.bus_duration
+                    leg_cost = out.bus_cost
+                    if not last:
+                        back_duration = back.bus_duration
+                        leg_cost += back.bus_cost
+                    transport_cost = peoples * leg_cost
+                if hotel_id:
+                    # 往返两段先相加再计入
+                    activity_time += out_duration if last else out_duration + back_duration
+
+            days.append({
+                'day': day,
+                'attraction': attraction,
+                'restaurants': restaurants,
+                'mode': mode,
+                'last': last,
+                'out': out,
+                'back': back,
+                'out_duration': out_duration,
+                'back_duration': back_duration,
+                'activity_time': activity_time,
+                'attraction_cost': attraction_cost,
+                'restaurant_costs': restaurant_costs,
+                'transport_cost': transport_cost
+            })
+
+        return {
+            'hotel_id': hotel_id,
+            'has_hotel': bool(accommodations),
+            'hotel_cost': hotel_cost,
+            'days': days
+        }
+
+    def validate(self,
+                 solution: Dict,
+                 travel_days: int,
+                 peoples: int = 1,
+                 budget: Optional[float] = None,
+                 intra_city_trans: Optional[Dict] = None,
+                 constraints: bool = True,
+                 realistic: bool = True) -> Dict:
+        """
+        单次遍历评估全部规则
+
+        Args:
+            solution: planner 生成的行程方案
+            travel_days: 旅行天数
+            peoples: 人数
+            budget: 预算（可选）
+            intra_city_trans: 市内交通数据
+            constraints: 是否评估 FeedbackAgent 的约束规则
+            realistic: 是否评估 CheckAgent 的合理性规则
+
+        Returns:
+            {
+                'rules': {规则名: [冲突/问题字典]},
+                'conflicts': 约束冲突（按 FeedbackAgent 规则顺序）,
+                'issues': 合理性问题（按 CheckAgent 规则顺序）,
+                'table': build_table 的结果,
+                'total_cost': 总费用
+            }
+        """
+        if intra_city_trans is None:
+            intra_city_trans = {}
+        table = self.build_table(solution, travel_days, peoples, intra_city_trans)
+        rules = {name: [] for name in self.CONSTRAINT_RULES + self.REALISTIC_RULES}
+
+        attractions = solution.get('attractions', {})
+        has_hotel = table['has_hotel']
+        has_hotel_id = bool(table['hotel_id'])
+        # 酒店坐标每次校验只读取一次
+        hotel_position = get_coordinates(solution['accommodations'][0]) if has_hotel else None
+
+        for entry in table['days']:
+            if constraints:
+                self._check_day_constraints(entry, attractions, has_hotel, has_hotel_id, rules)
+            if realistic and has_hotel and entry['attraction'] is not None:
+                self._check_day_realistic(entry, hotel_position, rules)
+
+        total_cost = self.total_cost(solution, travel_days, peoples, table)
+        if constraints:
+            self._check_plan_constraints(solution, travel_days, peoples, budget, table, total_cost, rules)
+        if realistic:
+            rules['train_schedule'] = self.check_trains(solution)
+            rules['opening_hours'] = self.get_scheduler().schedule_table(table, timeline=False)['issues']
+
+        conflicts = [c for name in self.CONSTRAINT_RULES for c in rules[name]]
+        issues = [i for name in self.REALISTIC_RULES for i in rules[name]]
+        return {
+            'rules': rules,
+            'conflicts': conflicts,
+            'issues': issues,
+            'table': table,
+            'total_cost': total_cost
+        }
+
+    def total_cost(self, solution: Dict, travel_days: int, peoples: int, table: Dict) -> float:
+        """基于每日表计算总费用（住宿按房间数和晚数计）"""
+        total_cost = 0.0
+        if table['has_hotel']:
+            rooms_needed = (peoples + 1) // 2
+            total_cost += table['hotel_cost'] * (travel_days - 1) * rooms_needed
+        # 按景点、餐饮、交通、火车的顺序累加
+        for entry in table['days']:
+            total_cost += entry['attraction_cost']
+        for entry in table['days']:
+            for cost in entry['restaurant_costs']:
+                total_cost += cost
+        for entry in table['days']:
+            total_cost += entry['transport_cost']
+        for key in ('train_departure', 'train_back'):
+            if solution.get(key):
+                total_cost += float(solution[key].get('data', {}).get('cost', 0)) * peoples
+        return total_cost
+
+    def _check_day_constraints(self, entry: Dict, attractions: Dict, has_hotel: bool,
+                               has_hotel_id: bool, rules: Dict) -> None:
+        """约束1、2&3、4 的单日部分"""
+        day = entry['day']
+        attraction = entry['attraction']
+
+        # 约束1: 每日景点、三餐
+        if day not in attractions:
+            rules['constraint_1'].append({
+                'constraint': '每日选择一个景点',
+                'day': day,
+                'issue': f'第{day}天缺少景点选择',
+                'severity': 'error'
+            })
+        elif attraction is None:
+            rules['constraint_1'].append({
+                'constraint': '每日选择一个景点',
+                'day': day,
+                'issue': f'第{day}天景点选择为空',
+                'severity': 'error'
+            })
+        restaurants = entry['restaurants']
+        if len(restaurants) != self.meals_per_day:
+            rules['constraint_1'].append({
+                'constraint': '每日三个餐饮',
+                'day': day,
+                'issue': f'第{day}天餐饮数量为{len(restaurants)}，应为{self.meals_per_day}',
+                'severity': 'error'
+            })
+
+        # 约束2&3: 市内通勤数据
+        if has_hotel and has_hotel_id and attraction is not None and attraction.get('id'):
+            if entry['last']:
+                if not entry['out'].exists and not entry['back'].exists:
+                    rules['constraint_2_3'].append({
+                        'constraint': '最后一天交通',
+                        'day': day,
+                        'issue': f'第{day}天缺少从酒店到景点的交通数据',
+                        'severity': 'warning'
+                    })
+            elif not entry['out'].exists or not entry['back'].exists:
+                rules['constraint_2_3'].append({
+                    'constraint': '每日两次市内通勤',
+                    'day': day,
+                    'issue': f'第{day}天缺少酒店与景点间的往返交通数据',
+                    'severity': 'warning'
+                })
+
+        # 约束4: 每日活动时间
+        total_time = entry['activity_time']
+        if total_time > self.max_daily_time:
+            rules['constraint_4'].append({
+                'constraint': '每日活动时间限制',
+                'day': day,
+                'issue': f'第{day}天活动时间为{total_time:.1f}分钟，超过{self.max_daily_time}分钟限制',
+                'actual_time': total_time,
+                'max_time': self.max_daily_time,
+                'severity': 'error'
+            })
+
+    def _check_plan_constraints(self, solution: Dict, travel_days: int, peoples: int,
+                                budget: Optional[float], table: Dict, total_cost: float, rules: Dict) -> None:
+        """约束1（住宿）、2&3（缺少住宿）、5&6、8&9、11 的全局部分"""
+        if not table['has_hotel']:
+            rules['constraint_1'].append({
+                'constraint': '住宿选择',
+                'issue': '缺少住宿选择（前几晚需要住宿）',
+                'severity': 'error'
+            })
+            rules['constraint_2_3'] = [{
+                'constraint': '市内通勤',
+                'issue': '缺少住宿信息，无法检查交通安排',
+                'severity': 'warning'
+            }]
+
+        if not solution.get('train_departure'):
+            rules['constraint_5_6'].append({
+                'constraint': '第一天出发火车',
+                'day': 1,
+                'issue': '缺少第一天出发的火车信息',
+                'severity': 'error'
+            })
+        if not solution.get('train_back'):
+            rules['constraint_5_6'].append({
+                'constraint': '最后一天返程火车',
+                'day': travel_days,
+                'issue': f'缺少第{travel_days}天返程的火车信息',
+                'severity': 'error'
+            })
+
+        # 约束8&9: 出租车载客数（按方案中的景点天数检查）
+        if table['has_hotel'] and peoples > self.taxi_capacity:
+            attractions = solution.get('attractions', {})
+            transport_modes = solution.get('transport_mode', {})
+            for day in range(1, len(attractions) + 1):
+                if attractions.get(day) is not None and transport_modes.get(day, 'taxi') == 'taxi':
+                    rules['constraint_8_9'].append({
+                        'constraint': '出租车载客数',
+                        'day': day,
+                        'issue': f'第{day}天人数({peoples}人)超过出租车载客数({self.taxi_capacity}人)，需要多辆车',
+                        'severity': 'warning'
+                    })
+
+        if budget is not None and total_cost > budget:
+            rules['budget'].append({
+                'constraint': '预算约束',
+                'issue': f'总费用{total_cost:.2f}元超过预算{budget:.2f}元',
+                'actual_cost': total_cost,
+                'budget': budget,
+                'severity': 'error'
+            })
+
+    def _estimate_distance(self, duration: float, mode: str) -> float:
+        """POI 缺少坐标时根据交通时间估算距离（按最大速度的一半作为平均速度）"""
+        max_speed = self.max_taxi_speed if mode == 'taxi' else self.max_bus_speed
+        return duration * (max_speed / 60 * 0.5)
+
+    def road_distance(self, origin: Optional[Dict], destination: Optional[Dict]) -> Optional[float]:
+        """按坐标估算两个 POI 间的道路距离（直线距离乘以绕行系数），缺少坐标时返回 None"""
+        return self._road_distance(get_coordinates(origin), get_coordinates(destination))
+
+    def _road_distance(self, origin: Optional[Tuple[float, float]], destination: Optional[Tuple[float, float]]) -> Optional[float]:
+        """road_distance 的坐标版本（参数为 get_coordinates 的结果）"""
+        if origin is None or destination is None:
+            return None
+        return haversine(origin[0], origin[1], destination[0], destination[1]) * self.detour_factor
+
+    def _check_day_realistic(self, entry: Dict, hotel_position: Optional[Tuple[float, float]], rules: Dict) -> None:
+        """CheckAgent 合理性规则的单日部分（交通时间、活动序列、往返一致性）"""
+        day = entry['day']
+        mode = entry['mode']
+        # 有坐标时使用酒店到景点的实际距离，否则按交通时间估算
+        attraction_position = get_coordinates(entry['attraction'])
+        hotel_distance = self._road_distance(hotel_position, attraction_position)
+
+        if entry['last']:
+            duration = entry['out_duration']
+            if duration > 0:
+                estimated_distance = hotel_distance if hotel_distance is not None else self._estimate_distance(duration, mode)
+                if duration < self.min_realistic_time:
+                    max_distance = duration * self.max_distance_for_time.get(mode, 0.6)
+                    if estimated_distance > max_distance:
+                        rules['realistic_transport_time'].append({
+                            'type': 'unrealistic_time_distance',
+                            'day': day,
+                            'issue': f'第{day}天：{mode}从酒店到景点仅需{duration:.1f}分钟，但可能距离过远（估算{estimated_distance:.2f}km），不合常理',
+                            'duration': duration,
+                            'estimated_distance': estimated_distance,
+                            'max_realistic_distance': max_distance,
+                            'severity': 'error',
+                            'explanation': f'正常情况下，{duration:.1f}分钟只能行驶约{max_distance:.2f}km，但估算距离为{estimated_distance:.2f}km，存在矛盾'
+                        })
+                speed = estimated_distance / duration * 60
+                if mode == 'taxi':
+                    if speed > self.max_taxi_speed:
+                        rules['realistic_transport_time'].append({
+                            'type': 'unrealistic_speed',
+                            'day': day,
+                            'issue': f'第{day}天：出租车速度{speed:.1f}km/h超过合理范围（最大{self.max_taxi_speed}km/h）',
+                            'speed': speed,
+                            'max_speed': self.max_taxi_speed,
+                            'severity': 'error',
+                            'explanation': f'城市内出租车平均速度通常不超过{self.max_taxi_speed}km/h，当前速度为{speed:.1f}km/h不合理'
+                        })
+                    elif speed < self.min_taxi_speed and duration > 5:
+                        rules['realistic_transport_time'].append({
+                            'type': 'too_slow',
+                            'day': day,
+                            'issue': f'第{day}天：出租车速度{speed:.1f}km/h过低（低于{self.min_taxi_speed}km/h），可能交通拥堵或路线不合理',
+                            'speed': speed,
+                            'min_speed': self.min_taxi_speed,
+                            'severity': 'warning',
+                            'explanation': f'城市内正常行驶速度应不低于{self.min_taxi_speed}km/h，当前速度{speed:.1f}km/h可能存在问题'
+                        })
+                elif speed > self.max_bus_speed:
+                    rules['realistic_transport_time'].append({
+                        'type': 'unrealistic_speed',
+                        'day': day,
+                        'issue': f'第{day}天：公交速度{speed:.1f}km/h超过合理范围（最大{self.max_bus_speed}km/h）',
+                        'speed': speed,
+                        'max_speed': self.max_bus_speed,
+                        'severity': 'error',
+                        'explanation': f'城市内公交平均速度通常不超过{self.max_bus_speed}km/h，当前速度为{speed:.1f}km/h不合理'
+                    })
+        else:
+            duration1 = entry['out_duration']
+            duration2 = entry['back_duration']
+            if duration1 > 0 and duration2 > 0:
+                estimated_distance = hotel_distance if hotel_distance is not None else self._estimate_distance(duration1, mode)
+                for i, duration in enumerate([duration1, duration2], 1):
+                    if duration < self.min_realistic_time:
+                        max_distance = duration * self.max_distance_for_time.get(mode, 0.6)
+                        if estimated_distance > max_distance:
+                            direction = '去程' if i == 1 else '返程'
+                            rules['realistic_transport_time'].append({
+                                'type': 'unrealistic_time_distance',
+                                'day': day,
+                                'issue': f'第{day}天：{direction}仅需{duration:.1f}分钟但可能距离过远（估算{estimated_distance:.2f}km），不合常理',
+                                'duration': duration,
+                                'estimated_distance': estimated_distance,
+                                'max_realistic_distance': max_distance,
+                                'severity': 'error',
+                                'explanation': f'{direction}时间{duration:.1f}分钟与估算距离{estimated_distance:.2f}km不匹配'
+                            })
+
+                # 往返时间差异过大（超过50%）
+                time_diff_ratio = abs(duration1 - duration2) / max(duration1, duration2)
+                if time_diff_ratio > 0.5:
+                    rules['data_consistency'].append({
+                        'type': 'asymmetric_time',
+                        'day': day,
+                        'issue': f'第{day}天：酒店↔景点往返时间差异过大（去程{duration1:.1f}分钟，返程{duration2:.1f}分钟）',
+                        'duration1': duration1,
+                        'duration2': duration2,
+                        'difference_ratio': time_diff_ratio,
+                        'severity': 'warning',
+                        'explanation': f'正常情况下往返时间应该相近，但去程{duration1:.1f}分钟与返程{duration2:.1f}分钟差异过大（{time_diff_ratio*100:.1f}%），可能存在数据错误'
+                    })
+
+        # 酒店到景点距离（无坐标时按出租车时间估算）
+        taxi_duration = entry['out'].taxi_duration
+        if hotel_distance is not None or taxi_duration > 0:
+            estimated_distance = hotel_distance if hotel_distance is not None else self._estimate_distance(taxi_duration, 'taxi')
+            if estimated_distance > self.max_city_distance:
+                rules['activity_sequence'].append({
+                    'type': 'excessive_distance',
+                    'day': day,
+                    'issue': f'第{day}天：酒店到景点距离约{estimated_distance:.2f}km，超过城市内合理距离（{self.max_city_distance}km）',
+                    'distance': estimated_distance,
+                    'max_distance': self.max_city_distance,
+                    'severity': 'error',
+                    'explanation': f'同一城市内，酒店到景点的距离通常不超过{self.max_city_distance}km，当前距离{estimated_distance:.2f}km可能不合理'
+                })
+
+        # 餐厅是否都距离景点过远
+        restaurant_distances = [self._road_distance(attraction_position, get_coordinates(rest))
+                                for rest in entry['restaurants']]
+        if restaurant_distances and None not in restaurant_distances:
+            nearest = min(restaurant_distances)
+            if nearest > self.max_restaurant_distance:
+                rules['activity_sequence'].append({
+                    'type': 'distant_restaurants',
+                    'day': day,
+                    'issue': f'第{day}天：所选餐厅距离景点均超过{self.max_restaurant_distance}km（最近约{nearest:.2f}km）',
+                    'distances': restaurant_distances,
+                    'max_distance': self.max_restaurant_distance,
+                    'severity': 'warning',
+                    'explanation': f'餐饮通常安排在景点附近，当前餐厅距离景点最近也有{nearest:.2f}km，会增加额外通勤时间'
+                })
+
+    def check_trains(self, solution: Dict) -> List[Dict]:
+        """出发/返程火车信息是否齐全"""
+        issues = []
+        if not solution.get('train_departure'):
+            issues.append({
+                'type': 'missing_train',
+                'issue': '缺少出发火车信息',
+                'severity': 'error',
+                'explanation': '方案必须包含第一天的出发火车信息'
+            })
+        if not solution.get('train_back'):
+            issues.append({
+                'type': 'missing_train',
+                'issue': '缺少返程火车信息',
+                'severity': 'error',
+                'explanation': '方案必须包含最后一天的返程火车信息'
+            })
+        return issues
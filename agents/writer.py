@@ -8,7 +8,8 @@ from datetime import datetime, timedelta
 # 添加父目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import AGENT_CONFIG
+from config import agent_config
+from agents.scheduler import DayScheduler
 
 
 class WriterAgent:
@@ -16,11 +17,14 @@ class WriterAgent:
     Writer Agent，负责整合多方结果，生成满足预算且兼顾体验的 JSON 格式行程信息
     """
     
-    def __init__(self):
-        self.agent = autogen.AssistantAgent(**AGENT_CONFIG["writer"])
+    def __init__(self, llm_config=None):
+        self.agent = autogen.AssistantAgent(**agent_config("writer", llm_config))
         
         # 约束条件常量
         self.TAXI_CAPACITY = 4  # 出租车载客数
+        
+        # 按营业时间为每天分配起止时间
+        self.scheduler = DayScheduler()
     
     def get_agent(self):
         return self.agent
@@ -96,16 +100,16 @@ class WriterAgent:
             "cost": f"{cost:.2f}" if cost > 0 else "0.00"
         }
     
-    def _assign_meals(self, restaurants: List[Dict]) -> Dict:
+    def _assign_meals(self, restaurants: List[Dict], order: Optional[List[int]] = None) -> Dict:
         """
         将3个餐厅分配为早餐、午餐、晚餐
-        默认：第一个为早餐，第二个为午餐，第三个为晚餐
+        默认：第一个为早餐，第二个为午餐，第三个为晚餐；order 为排程给出的早/午/晚餐对应的餐厅下标
         """
-        meal_assignments = {
-            'breakfast': restaurants[0] if len(restaurants) > 0 else None,
-            'lunch': restaurants[1] if len(restaurants) > 1 else None,
-            'dinner': restaurants[2] if len(restaurants) > 2 else None
-        }
+        if order is None:
+            order = list(range(min(len(restaurants), 3)))
+        meal_assignments = {'breakfast': None, 'lunch': None, 'dinner': None}
+        for meal, index in zip(('breakfast', 'lunch', 'dinner'), order):
+            meal_assignments[meal] = restaurants[index]
         return meal_assignments
     
     def generate_travel_plan_json(
@@ -154,6 +158,10 @@ class WriterAgent:
             hotel_total = hotel_cost_per_night * (travel_days - 1) * rooms_needed
             total_cost += hotel_total
         
+        # 按营业时间排程，得到每天各项活动的起止时间和餐次分配
+        schedule = self.scheduler.schedule(solution, travel_days, intra_city_trans, start_date, peoples)
+        schedule_days = {result['day']: result for result in schedule['days']}
+        
         # 处理每一天的行程
         for day in range(1, travel_days + 1):
             date = self._format_date(start_date, day - 1)
@@ -181,7 +189,7 @@ class WriterAgent:
             
             # 餐饮信息（3个：早餐、午餐、晚餐）
             restaurants = solution.get('restaurants', {}).get(day, [])
-            meals = self._assign_meals(restaurants)
+            meals = self._assign_meals(restaurants, schedule_days[day]['meals'])
             
             # 早餐
             if meals['breakfast']:
@@ -329,6 +337,7 @@ class WriterAgent:
                     total_cost += path_cost2
             
             day_plan["path"] = path
+            day_plan["schedule"] = schedule_days[day]['timeline']
             plan.append(day_plan)
         
         # 构建最终答案
@@ -339,6 +348,12 @@ class WriterAgent:
             "total_cost": f"{total_cost:.2f}"
         }
         
+        # 营业时间内无法排程的天
+        if not schedule['feasible']:
+            answer["schedule_issues"] = [
+                issue['issue'] for issue in schedule['issues'] if issue.get('severity') == 'error'
+            ]
+        
         # 如果有预算，添加预算相关信息
         if budget is not None:
             answer["budget"] = f"{budget:.2f}"
@@ -0,0 +1,209 @@
+"""
+API 服务内置指标：按接口统计请求数、状态码、延迟直方图和响应字节数，记录索引命中率、
+数据集规模和加载耗时，以 Prometheus 文本格式（text exposition format 0.0.4）输出
+- 接口按路由模板（如 /attractions/<city_name>）聚合，避免城市名等路径参数导致标签基数膨胀
+- 线程安全：Flask 多线程处理请求时共用一个 ApiMetrics
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 延迟直方图分桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 响应大小直方图分桶上界（字节）
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """累积分桶直方图（不加锁，由 ApiMetrics 串行化访问）"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """[(le, 累计次数)]，最后一项为 +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else _format_value(bound), total))
+        return result
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class ApiMetrics:
+    """API 请求、索引命中和数据加载指标"""
+
+    def __init__(self, latency_buckets: Iterable[float] = LATENCY_BUCKETS,
+                 size_buckets: Iterable[float] = SIZE_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        # {数据集: 行数}、{索引: 条目数}、最近一次 load_data() 的耗时和结果
+        self._datasets: Dict[str, int] = {}
+        self._index_sizes: Dict[str, int] = {}
+        self._load_seconds: Optional[float] = None
+        self._load_success: Optional[bool] = None
+        self.reset()
+
+    def reset(self) -> None:
+        """清空请求和索引统计（数据集规模和加载耗时保留）"""
+        with self._lock:
+            # {(接口, 方法, 状态码): 次数}
+            self._requests: Dict[Tuple[str, str, int], int] = {}
+            # {(接口, 方法): 直方图}
+            self._latency: Dict[Tuple[str, str], Histogram] = {}
+            # {(接口, 城市): 直方图}，只记录带城市参数的请求
+            self._city_latency: Dict[Tuple[str, str], Histogram] = {}
+            self._sizes: Dict[Tuple[str, str], Histogram] = {}
+            # {索引名: [命中, 未命中]}
+            self._lookups: Dict[str, List[int]] = {}
+            self._in_flight = 0
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float,
+                        response_bytes: Optional[int], city: Optional[str] = None) -> None:
+        """
+        记录一次请求
+
+        Args:
+            endpoint: 路由模板，未匹配路由的请求用 "unmatched"
+            response_bytes: 响应体字节数，流式响应等未知长度时为 None（不计入大小直方图）
+            city: 请求的城市（调用方应把未知城市归为 "other" 以限制标签基数），None 表示不按城市统计
+        """
+        key = (endpoint, method)
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            status_key = (endpoint, method, int(status))
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(self.latency_buckets)
+            latency.observe(seconds)
+            if response_bytes is not None:
+                sizes = self._sizes.get(key)
+                if sizes is None:
+                    sizes = self._sizes[key] = Histogram(self.size_buckets)
+                sizes.observe(response_bytes)
+            if city is not None:
+                city_key = (endpoint, city)
+                city_latency = self._city_latency.get(city_key)
+                if city_latency is None:
+                    city_latency = self._city_latency[city_key] = Histogram(self.latency_buckets)
+                city_latency.observe(seconds)
+
+    def record_lookup(self, index: str, hit: bool) -> None:
+        """记录一次预建索引（城市记录表、排序视图、空间索引等）的查找是否命中"""
+        with self._lock:
+            counts = self._lookups.get(index)
+            if counts is None:
+                counts = self._lookups[index] = [0, 0]
+            counts[0 if hit else 1] += 1
+
+    def set_dataset(self, name: str, rows: int) -> None:
+        with self._lock:
+            self._datasets[name] = int(rows)
+
+    def set_index_size(self, index: str, entries: int) -> None:
+        with self._lock:
+            self._index_sizes[index] = int(entries)
+
+    def set_load(self, seconds: float, success: bool) -> None:
+        with self._lock:
+            self._load_seconds = seconds
+            self._load_success = success
+
+    def hit_ratio(self, index: str) -> float:
+        with self._lock:
+            hits, misses = self._lookups.get(index, (0, 0))
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram],
+                      label: str = "method") -> None:
+            family(name, "histogram", help_text)
+            for (endpoint, value), hist in sorted(histograms.items()):
+                labels = {"endpoint": endpoint, label: value}
+                for le, count in hist.cumulative():
+                    lines.append(f"{name}_bucket{_labels(**labels, le=le)} {count}")
+                lines.append(f"{name}_sum{_labels(**labels)} {_format_value(hist.sum)}")
+                lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+
+        with self._lock:
+            family("travel_api_requests_total", "counter", "Requests by endpoint, method and status code")
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f"travel_api_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+            histogram("travel_api_request_duration_seconds", "Request latency in seconds", self._latency)
+            histogram("travel_api_response_size_bytes", "Response body size in bytes", self._sizes)
+            histogram("travel_api_city_request_duration_seconds", "Request latency in seconds by city",
+                      self._city_latency, label="city")
+
+            family("travel_api_requests_in_flight", "gauge", "Requests currently being handled")
+            lines.append(f"travel_api_requests_in_flight {self._in_flight}")
+
+            family("travel_api_index_lookups_total", "counter", "Lookups in prebuilt in-memory indexes")
+            for index, (hits, misses) in sorted(self._lookups.items()):
+                lines.append(f"travel_api_index_lookups_total{_labels(index=index, result='hit')} {hits}")
+                lines.append(f"travel_api_index_lookups_total{_labels(index=index, result='miss')} {misses}")
+            family("travel_api_index_hit_ratio", "gauge", "Hit ratio of prebuilt in-memory indexes")
+            for index, (hits, misses) in sorted(self._lookups.items()):
+                ratio = hits / (hits + misses) if hits + misses else 0.0
+                lines.append(f"travel_api_index_hit_ratio{_labels(index=index)} {_format_value(ratio)}")
+
+            family("travel_api_dataset_rows", "gauge", "Rows loaded per dataset")
+            for name, rows in sorted(self._datasets.items()):
+                lines.append(f"travel_api_dataset_rows{_labels(dataset=name)} {rows}")
+            family("travel_api_index_entries", "gauge", "Entries in prebuilt indexes")
+            for index, entries in sorted(self._index_sizes.items()):
+                lines.append(f"travel_api_index_entries{_labels(index=index)} {entries}")
+
+            if self._load_seconds is not None:
+                family("travel_api_data_load_seconds", "gauge", "Duration of the last load_data() call")
+                lines.append(f"travel_api_data_load_seconds {_format_value(self._load_seconds)}")
+                family("travel_api_data_load_success", "gauge", "Whether the last load_data() call succeeded")
+                lines.append(f"travel_api_data_load_success {int(bool(self._load_success))}")
+
+            family("travel_api_start_time_seconds", "gauge", "Unix time the metrics registry was created")
+            lines.append(f"travel_api_start_time_seconds {_format_value(self.started)}")
+        return "\n".join(lines) + "\n"
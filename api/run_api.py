@@ -3,10 +3,22 @@ from datetime import datetime
 import pandas as pd
 import json
 import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 
+# 添加项目根目录到 Python 路径，以便复用 utils.geo 的空间索引
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo import GridIndex
+from api.metrics import CONTENT_TYPE, ApiMetrics
+
 app = Flask(__name__)
 
+# 请求、索引命中和数据加载指标（/metrics 输出）
+metrics = ApiMetrics()
+
 # 数据存储
 data = {
     'attractions': None,
@@ -18,12 +30,29 @@ data = {
     'city_info': None
 }
 
+# 空间索引（load_data 时构建）
+# spatial_index: {POI类别: {城市: GridIndex}}
+# poi_records: {POI类别: {城市: {POI ID: 接口返回的记录}}}
+# poi_locations: {POI ID: (城市, 纬度, 经度)}，包含交通站点
+spatial_index = {}
+poi_records = {}
+poi_locations = {}
+# sorted_index: {POI类别: {城市: {排序字段: {'asc'/'desc': (排序键列表, 记录列表)}}}}
+sorted_index = {}
+# 数据中出现的城市，指标中其他城市名归为 "other"
+known_cities = set()
+
+# /nearby 默认和最大返回条数
+NEARBY_DEFAULT_K = 10
+NEARBY_MAX_K = 100
+
 # 数据文件路径
 CSV_DIR = Path(__file__).parent / 'data'
 
 
 def load_data():
     """加载所有CSV数据"""
+    start = time.perf_counter()
     try:
         print("正在加载数据...")
         
@@ -55,13 +84,285 @@ def load_data():
         data['city_info'] = pd.read_csv(CSV_DIR / 'city_info.csv')
         print(f"已加载 {len(data['city_info'])} 条城市信息数据")
         
+        # 构建空间索引
+        build_spatial_index()
+        print(f"已构建 {sum(len(v) for v in spatial_index.values())} 个城市空间索引")
+        
+        for name, frame in data.items():
+            metrics.set_dataset(name, len(frame))
+        metrics.set_index_size('city_records', sum(len(v) for v in poi_records.values()))
+        metrics.set_index_size('spatial_index', sum(len(v) for v in spatial_index.values()))
+        metrics.set_index_size('poi_locations', len(poi_locations))
+        metrics.set_load(time.perf_counter() - start, True)
+        
         print("所有数据加载完成!")
         return True
     except Exception as e:
+        metrics.set_load(time.perf_counter() - start, False)
         print(f"加载数据失败: {str(e)}")
         return False
 
 
+def coordinate(value):
+    """经纬度字段，缺失时返回 None"""
+    return float(value) if pd.notna(value) else None
+
+
+def format_attraction(row):
+    """景点记录（/attractions 返回格式）"""
+    return {
+        "id": row['attraction_id'],
+        "name": row['attraction_name'],
+        "cost": float(row['avg_consumption']) if pd.notna(row['avg_consumption']) else 0.0,
+        "type": row['attraction_type'] if pd.notna(row['attraction_type']) else "",
+        "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
+        "duration": float(row['suggested_duration']) if pd.notna(row['suggested_duration']) else 0.0,
+        "longitude": coordinate(row['longitude']),
+        "latitude": coordinate(row['latitude']),
+        "open_time": row['open_time'] if pd.notna(row['open_time']) else "",
+        "close_time": row['close_time'] if pd.notna(row['close_time']) else ""
+    }
+
+
+def format_accommodation(row):
+    """住宿记录（/accommodations 返回格式）"""
+    return {
+        "id": row['accommodation_id'],
+        "name": row['accommodation_name'],
+        "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
+        "type": row['accommodation_type'] if pd.notna(row['accommodation_type']) else "",
+        "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
+        "feature": row['feature_hotel_type'] if pd.notna(row['feature_hotel_type']) else "",
+        "longitude": coordinate(row['longitude']),
+        "latitude": coordinate(row['latitude'])
+    }
+
+
+def format_restaurant(row):
+    """餐厅记录（/restaurants 返回格式）"""
+    return {
+        "id": row['restaurant_id'],
+        "name": row['restaurant_name'],
+        "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
+        "type": row['restaurant_type'] if pd.notna(row['restaurant_type']) else "",
+        "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
+        "recommended_food": row['recommended_food'] if pd.notna(row['recommended_food']) else "",
+        "queue_time": float(row['queue_time']) if pd.notna(row['queue_time']) else 0.0,
+        "duration": float(row['consumption_time']) if pd.notna(row['consumption_time']) else 0.0,
+        "longitude": coordinate(row['longitude']),
+        "latitude": coordinate(row['latitude']),
+        "business_hours": row['business_hours'] if pd.notna(row['business_hours']) else ""
+    }
+
+
+# POI 类别: (记录格式化函数, ID 列)
+POI_KINDS = {
+    'attractions': (format_attraction, 'attraction_id'),
+    'accommodations': (format_accommodation, 'accommodation_id'),
+    'restaurants': (format_restaurant, 'restaurant_id')
+}
+
+# 各类别可排序的字段（load_data 时按城市预先排序）
+SORT_FIELDS = {
+    'attractions': ('rating', 'cost', 'duration'),
+    'accommodations': ('rating', 'cost'),
+    'restaurants': ('rating', 'cost', 'duration', 'queue_time')
+}
+
+# 范围筛选参数: (字段, 比较方向)
+RANGE_FILTERS = {
+    'min_rating': ('rating', 'min'),
+    'max_rating': ('rating', 'max'),
+    'min_cost': ('cost', 'min'),
+    'max_cost': ('cost', 'max')
+}
+
+
+def build_spatial_index():
+    """按类别和城市构建 POI 记录表和网格空间索引，并记录所有 POI（含交通站点）的坐标"""
+    spatial_index.clear()
+    poi_records.clear()
+    poi_locations.clear()
+    sorted_index.clear()
+    known_cities.clear()
+    
+    for kind, (formatter, _) in POI_KINDS.items():
+        spatial_index[kind] = {}
+        poi_records[kind] = {}
+        sorted_index[kind] = {}
+        for city_name, rows in data[kind].groupby('city_name'):
+            records = [formatter(row) for _, row in rows.iterrows()]
+            poi_records[kind][city_name] = {record['id']: record for record in records}
+            spatial_index[kind][city_name] = GridIndex(records)
+            sorted_index[kind][city_name] = build_sorted_views(records, SORT_FIELDS[kind])
+    
+    for kind, id_column in [(k, v[1]) for k, v in POI_KINDS.items()] + [('transport', 'transport_id')]:
+        frame = data[kind]
+        located = frame[frame['latitude'].notna() & frame['longitude'].notna()]
+        for poi_id, city_name, lat, lon in zip(located[id_column], located['city_name'],
+                                               located['latitude'], located['longitude']):
+            poi_locations[poi_id] = (city_name, float(lat), float(lon))
+        known_cities.update(frame['city_name'].dropna().unique())
+
+
+def build_sorted_views(records, fields):
+    """为每个排序字段预先生成升序和降序视图（稳定排序，相同值保持原始顺序）"""
+    views = {}
+    for field in fields:
+        ascending = sorted(records, key=lambda record: record[field])
+        descending = sorted(records, key=lambda record: record[field], reverse=True)
+        views[field] = {
+            'asc': ([record[field] for record in ascending], ascending),
+            'desc': ([-record[field] for record in descending], descending)
+        }
+    return views
+
+
+def parse_number(name, cast=float, minimum=None):
+    """解析数值型查询参数，未提供时返回 None，非法时抛出 ValueError"""
+    raw = request.args.get(name, '').strip()
+    if not raw:
+        return None
+    value = cast(raw)
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} 不能小于 {minimum}")
+    return value
+
+
+def parse_poi_filters():
+    """
+    解析 POI 筛选参数
+    
+    Returns:
+        {'ranges': [(字段, 'min'/'max', 值)], 'type': 类型关键词, 'feature': 特色关键词}
+    """
+    ranges = []
+    for name, (field, bound) in RANGE_FILTERS.items():
+        value = parse_number(name)
+        if value is not None:
+            ranges.append((field, bound, value))
+    return {
+        'ranges': ranges,
+        'type': request.args.get('type', '').strip(),
+        'feature': request.args.get('feature', '').strip()
+    }
+
+
+def match_poi(record, filters, skip_field=None):
+    """POI 记录是否满足筛选条件（skip_field 为已通过排序视图切片处理的范围字段）"""
+    if filters['type'] and filters['type'] not in record.get('type', ''):
+        return False
+    if filters['feature'] and filters['feature'] not in record.get('feature', ''):
+        return False
+    for field, bound, value in filters['ranges']:
+        if field == skip_field:
+            continue
+        if bound == 'min' and record[field] < value:
+            return False
+        if bound == 'max' and record[field] > value:
+            return False
+    return True
+
+
+def query_city_pois(kind, city_name, label):
+    """
+    按城市查询某类 POI，支持筛选、排序、字段投影和分页
+    
+    查询参数：
+        min_rating / max_rating / min_cost / max_cost: 评分和价格范围
+        type: 类型关键词；feature: 特色关键词（住宿）
+        sort: 排序字段，前缀 '-' 表示降序，如 -rating
+        fields: 返回字段，逗号分隔，如 id,name,cost
+        limit / offset: 分页
+    不带参数时与原接口一致，返回城市全部 POI；响应头 X-Total-Count 为筛选后的总数
+    """
+    try:
+        city_name = city_name.strip()
+        
+        if not city_name:
+            return error_response(
+                "Invalid Parameter",
+                "城市名称不能为空",
+                request.path,
+                400
+            )
+        
+        records = poi_records.get(kind, {}).get(city_name)
+        metrics.record_lookup('city_records', bool(records))
+        if not records:
+            return error_response(
+                "Data Not Found",
+                f"未找到城市'{city_name}'的{label}数据",
+                request.path,
+                404
+            )
+        
+        try:
+            filters = parse_poi_filters()
+            limit = parse_number('limit', int, 0)
+            offset = parse_number('offset', int, 0) or 0
+            sort = request.args.get('sort', '').strip()
+            sort_field = sort.lstrip('-')
+            if sort and sort_field not in SORT_FIELDS[kind]:
+                raise ValueError(f"sort 必须是 {', '.join(SORT_FIELDS[kind])} 之一（可加 '-' 前缀表示降序）")
+            fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+            sample = next(iter(records.values()))
+            unknown = [f for f in fields if f not in sample]
+            if unknown:
+                raise ValueError(f"未知字段: {', '.join(unknown)}")
+        except ValueError as e:
+            return error_response(
+                "Validation Error",
+                "请求参数验证失败",
+                request.path,
+                422,
+                [{"type": "value_error", "loc": ["query"], "msg": str(e)}]
+            )
+        
+        # 按排序字段取预排序视图，并用二分查找截取该字段的范围
+        skip_field = None
+        if sort:
+            direction = 'desc' if sort.startswith('-') else 'asc'
+            keys, ordered = sorted_index[kind][city_name][sort_field][direction]
+            lo, hi = 0, len(ordered)
+            for field, bound, value in filters['ranges']:
+                if field != sort_field:
+                    continue
+                if direction == 'asc':
+                    if bound == 'min':
+                        lo = max(lo, bisect_left(keys, value))
+                    else:
+                        hi = min(hi, bisect_right(keys, value))
+                else:
+                    if bound == 'max':
+                        lo = max(lo, bisect_left(keys, -value))
+                    else:
+                        hi = min(hi, bisect_right(keys, -value))
+            candidates = ordered[lo:hi]
+            skip_field = sort_field
+        else:
+            candidates = records.values()
+        
+        matched = [record for record in candidates if match_poi(record, filters, skip_field)]
+        total = len(matched)
+        page = matched[offset:offset + limit] if limit is not None else matched[offset:]
+        if fields:
+            page = [{field: record[field] for field in fields} for record in page]
+        
+        response = jsonify(page)
+        response.headers['X-Total-Count'] = str(total)
+        return response
+    
+    except Exception as e:
+        return error_response(
+            "Internal Server Error",
+            "服务器内部错误",
+            request.path,
+            500,
+            str(e)
+        )
+
+
 def error_response(error, message, path, status_code, details=None):
     """统一的错误响应格式"""
     response = {
@@ -166,151 +467,20 @@ def get_cross_city_transport():
 
 @app.route('/attractions/<city_name>', methods=['GET'])
 def get_attractions(city_name):
-    """获取城市所有景点数据"""
-    try:
-        city_name = city_name.strip()
-        
-        if not city_name:
-            return error_response(
-                "Invalid Parameter",
-                "城市名称不能为空",
-                request.path,
-                400
-            )
-        
-        # 查询景点
-        attractions = data['attractions'][data['attractions']['city_name'] == city_name]
-        
-        if attractions.empty:
-            return error_response(
-                "Data Not Found",
-                f"未找到城市'{city_name}'的景点数据",
-                request.path,
-                404
-            )
-        
-        result = []
-        for _, row in attractions.iterrows():
-            attraction = {
-                "id": row['attraction_id'],
-                "name": row['attraction_name'],
-                "cost": float(row['avg_consumption']) if pd.notna(row['avg_consumption']) else 0.0,
-                "type": row['attraction_type'] if pd.notna(row['attraction_type']) else "",
-                "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "duration": float(row['suggested_duration']) if pd.notna(row['suggested_duration']) else 0.0
-            }
-            result.append(attraction)
-        
-        return jsonify(result)
-    
-    except Exception as e:
-        return error_response(
-            "Internal Server Error",
-            "服务器内部错误",
-            request.path,
-            500,
-            str(e)
-        )
+    """获取城市景点数据（支持筛选、排序、字段投影和分页，见 query_city_pois）"""
+    return query_city_pois('attractions', city_name, '景点')
 
 
 @app.route('/accommodations/<city_name>', methods=['GET'])
 def get_accommodations(city_name):
-    """获取城市所有住宿数据"""
-    try:
-        city_name = city_name.strip()
-        
-        if not city_name:
-            return error_response(
-                "Invalid Parameter",
-                "城市名称不能为空",
-                request.path,
-                400
-            )
-        
-        # 查询住宿
-        accommodations = data['accommodations'][data['accommodations']['city_name'] == city_name]
-        
-        if accommodations.empty:
-            return error_response(
-                "Data Not Found",
-                f"未找到城市'{city_name}'的酒店数据",
-                request.path,
-                404
-            )
-        
-        result = []
-        for _, row in accommodations.iterrows():
-            accommodation = {
-                "id": row['accommodation_id'],
-                "name": row['accommodation_name'],
-                "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
-                "type": row['accommodation_type'] if pd.notna(row['accommodation_type']) else "",
-                "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "feature": row['feature_hotel_type'] if pd.notna(row['feature_hotel_type']) else ""
-            }
-            result.append(accommodation)
-        
-        return jsonify(result)
-    
-    except Exception as e:
-        return error_response(
-            "Internal Server Error",
-            "服务器内部错误",
-            request.path,
-            500,
-            str(e)
-        )
+    """获取城市住宿数据（支持筛选、排序、字段投影和分页，见 query_city_pois）"""
+    return query_city_pois('accommodations', city_name, '酒店')
 
 
 @app.route('/restaurants/<city_name>', methods=['GET'])
 def get_restaurants(city_name):
-    """获取城市所有餐厅数据"""
-    try:
-        city_name = city_name.strip()
-        
-        if not city_name:
-            return error_response(
-                "Invalid Parameter",
-                "城市名称不能为空",
-                request.path,
-                400
-            )
-        
-        # 查询餐厅
-        restaurants = data['restaurants'][data['restaurants']['city_name'] == city_name]
-        
-        if restaurants.empty:
-            return error_response(
-                "Data Not Found",
-                f"未找到城市'{city_name}'的餐厅数据",
-                request.path,
-                404
-            )
-        
-        result = []
-        for _, row in restaurants.iterrows():
-            restaurant = {
-                "id": row['restaurant_id'],
-                "name": row['restaurant_name'],
-                "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
-                "type": row['restaurant_type'] if pd.notna(row['restaurant_type']) else "",
-                "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "recommended_food": row['recommended_food'] if pd.notna(row['recommended_food']) else "",
-                "queue_time": float(row['queue_time']) if pd.notna(row['queue_time']) else 0.0,
-                "duration": float(row['consumption_time']) if pd.notna(row['consumption_time']) else 0.0
-            }
-            result.append(restaurant)
-        
-        return jsonify(result)
-    
-    except Exception as e:
-        return error_response(
-            "Internal Server Error",
-            "服务器内部错误",
-            request.path,
-            500,
-            str(e)
-        )
+    """获取城市餐厅数据（支持筛选、排序、字段投影和分页，见 query_city_pois）"""
+    return query_city_pois('restaurants', city_name, '餐厅')
 
 
 @app.route('/intra-city-transport/<city_name>', methods=['GET'])
@@ -384,7 +554,11 @@ def get_poi_data(city_name):
                 "cost": float(row['avg_consumption']) if pd.notna(row['avg_consumption']) else 0.0,
                 "attraction_type": row['attraction_type'] if pd.notna(row['attraction_type']) else "",
                 "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "duration": str(int(row['suggested_duration'])) if pd.notna(row['suggested_duration']) else "0"
+                "duration": str(int(row['suggested_duration'])) if pd.notna(row['suggested_duration']) else "0",
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude']),
+                "open_time": row['open_time'] if pd.notna(row['open_time']) else "",
+                "close_time": row['close_time'] if pd.notna(row['close_time']) else ""
             })
         
         # 获取住宿数据
@@ -397,7 +571,9 @@ def get_poi_data(city_name):
                 "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
                 "type": row['accommodation_type'] if pd.notna(row['accommodation_type']) else "",
                 "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "feature": row['feature_hotel_type'] if pd.notna(row['feature_hotel_type']) else ""
+                "feature": row['feature_hotel_type'] if pd.notna(row['feature_hotel_type']) else "",
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude'])
             })
         
         # 获取餐厅数据
@@ -412,7 +588,10 @@ def get_poi_data(city_name):
                 "type": row['restaurant_type'] if pd.notna(row['restaurant_type']) else "",
                 "recommended_food": row['recommended_food'] if pd.notna(row['recommended_food']) else "",
                 "queue_time": int(row['queue_time']) if pd.notna(row['queue_time']) else 0,
-                "duration": int(row['consumption_time']) if pd.notna(row['consumption_time']) else 0
+                "duration": int(row['consumption_time']) if pd.notna(row['consumption_time']) else 0,
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude']),
+                "business_hours": row['business_hours'] if pd.notna(row['business_hours']) else ""
             })
         
         if not attractions_list and not accommodations_list and not restaurants_list:
@@ -464,7 +643,11 @@ def get_poi_by_id(poi_id):
                 "type": row['attraction_type'] if pd.notna(row['attraction_type']) else "",
                 "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
                 "duration": str(int(row['suggested_duration'])) if pd.notna(row['suggested_duration']) else "0",
-                "city_name": row['city_name']
+                "city_name": row['city_name'],
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude']),
+                "open_time": row['open_time'] if pd.notna(row['open_time']) else "",
+                "close_time": row['close_time'] if pd.notna(row['close_time']) else ""
             })
         
         # 在住宿中查找
@@ -477,7 +660,9 @@ def get_poi_by_id(poi_id):
                 "cost": float(row['avg_price']) if pd.notna(row['avg_price']) else 0.0,
                 "type": row['accommodation_type'] if pd.notna(row['accommodation_type']) else "",
                 "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
-                "city_name": row['city_name']
+                "city_name": row['city_name'],
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude'])
             })
         
         # 在餐厅中查找
@@ -491,7 +676,10 @@ def get_poi_by_id(poi_id):
                 "type": row['restaurant_type'] if pd.notna(row['restaurant_type']) else "",
                 "rating": float(row['rating']) if pd.notna(row['rating']) else 0.0,
                 "duration": int(row['consumption_time']) if pd.notna(row['consumption_time']) else 0,
-                "city_name": row['city_name']
+                "city_name": row['city_name'],
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude']),
+                "business_hours": row['business_hours'] if pd.notna(row['business_hours']) else ""
             })
         
         # 在交通站点中查找
@@ -502,7 +690,9 @@ def get_poi_by_id(poi_id):
                 "id": row['transport_id'],
                 "name": row['transport_name'],
                 "type": row['transport_type'] if pd.notna(row['transport_type']) else "",
-                "city_name": row['city_name']
+                "city_name": row['city_name'],
+                "longitude": coordinate(row['longitude']),
+                "latitude": coordinate(row['latitude'])
             })
         
         return error_response(
@@ -742,6 +932,164 @@ def get_all_cities():
         )
 
 
+@app.route('/nearby', methods=['GET'])
+def get_nearby():
+    """
+    空间近邻查询：以一个或多个 POI（或坐标）为中心，查询同城最近的 k 个或半径内的景点/酒店/餐厅
+    
+    查询参数：
+        kind: attractions / accommodations / restaurants（默认 restaurants）
+        poi_id: 中心 POI ID（可重复传入多个，结果取并集并保留最近的中心）
+        latitude, longitude, city_name: 以坐标为中心（未提供 poi_id 时必填）
+        k: 每个中心返回的条数（默认 10，最大 100）
+        radius: 搜索半径（km，可选）
+        type / feature / min_rating / max_rating / min_cost / max_cost: 筛选条件（同 query_city_pois）
+    """
+    try:
+        kind = request.args.get('kind', 'restaurants').strip()
+        if kind not in POI_KINDS:
+            return error_response(
+                "Invalid Parameter",
+                f"kind 必须是 {', '.join(POI_KINDS)} 之一",
+                request.path,
+                400
+            )
+        
+        try:
+            k = parse_number('k', int, 1)
+            radius = parse_number('radius', float, 0)
+            latitude = parse_number('latitude')
+            longitude = parse_number('longitude')
+            filters = parse_poi_filters()
+        except ValueError as e:
+            return error_response(
+                "Validation Error",
+                "请求参数验证失败",
+                request.path,
+                422,
+                [{"type": "value_error", "loc": ["query"], "msg": str(e)}]
+            )
+        k = min(k or NEARBY_DEFAULT_K, NEARBY_MAX_K)
+        
+        # 确定搜索中心：[(中心ID, 城市, 纬度, 经度)]
+        centers = []
+        poi_ids = [poi_id.strip() for poi_id in request.args.getlist('poi_id') if poi_id.strip()]
+        for poi_id in poi_ids:
+            location = poi_locations.get(poi_id)
+            metrics.record_lookup('poi_locations', location is not None)
+            if location is None:
+                return error_response(
+                    "Data Not Found",
+                    f"未找到ID为'{poi_id}'的POI或其坐标",
+                    request.path,
+                    404
+                )
+            centers.append((poi_id, *location))
+        if not centers:
+            city_name = request.args.get('city_name', '').strip()
+            if latitude is None or longitude is None or not city_name:
+                return error_response(
+                    "Validation Error",
+                    "请求参数验证失败",
+                    request.path,
+                    422,
+                    [{"type": "missing", "loc": ["query", "poi_id"],
+                      "msg": "需要提供 poi_id，或同时提供 latitude、longitude 和 city_name"}]
+                )
+            centers.append((None, city_name, latitude, longitude))
+        
+        # 每个中心取满足条件的最近 k 个，多个中心的结果按 POI 保留最近距离
+        best = {}
+        for center_id, city_name, lat, lon in centers:
+            index = spatial_index.get(kind, {}).get(city_name)
+            metrics.record_lookup('spatial_index', index is not None)
+            if index is None:
+                continue
+            records = poi_records[kind][city_name]
+            if radius is not None:
+                candidates = index.within(lat, lon, radius)
+            else:
+                # 从最近的网格逐步向外查找，取够 k 个满足条件的 POI 即停止
+                candidates = index.iter_nearest(lat, lon)
+            found = 0
+            for poi_id, distance in candidates:
+                if found >= k:
+                    break
+                if poi_id == center_id or not match_poi(records[poi_id], filters):
+                    continue
+                found += 1
+                if poi_id not in best or distance < best[poi_id][0]:
+                    best[poi_id] = (distance, center_id, records[poi_id])
+        
+        if not best:
+            return error_response(
+                "Data Not Found",
+                "未找到符合条件的POI",
+                request.path,
+                404
+            )
+        
+        result = []
+        for distance, center_id, record in sorted(best.values(), key=lambda item: item[0]):
+            item = dict(record)
+            item["distance"] = round(distance, 3)
+            if center_id is not None:
+                item["center_id"] = center_id
+            result.append(item)
+        return jsonify(result)
+    
+    except Exception as e:
+        return error_response(
+            "Internal Server Error",
+            "服务器内部错误",
+            request.path,
+            500,
+            str(e)
+        )
+
+
+def request_city():
+    """请求涉及的城市（路径或查询参数），不在数据中的城市归为 "other"，不涉及城市时返回 None"""
+    city_name = ((request.view_args or {}).get('city_name') or request.args.get('city_name')
+                 or request.args.get('origin_city'))
+    if city_name is None:
+        return None
+    city_name = city_name.strip()
+    return city_name if city_name in known_cities else 'other'
+
+
+@app.before_request
+def start_request_timer():
+    request.environ['travel_api.start'] = time.perf_counter()
+    metrics.request_started()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('travel_api.start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(endpoint, request.method, response.status_code,
+                                time.perf_counter() - start, response.content_length, request_city())
+    return response
+
+
+@app.after_request
+def add_conditional_etag(response):
+    """GET 的 JSON 响应附带 ETag，请求带匹配的 If-None-Match 时返回 304（先于指标记录执行）"""
+    if (request.method == 'GET' and response.status_code == 200 and response.mimetype == 'application/json'
+            and not response.direct_passthrough):
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 指标接口（文本格式）"""
+    return app.response_class(metrics.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
@@ -167,6 +167,52 @@ def test_poi_data():
         return False
 
 
+def test_filtered_query():
+    """测试带筛选和分页的查询"""
+    print("\n测试 /accommodations/{city_name} 筛选和分页...")
+    try:
+        response = requests.get(
+            f"{BASE_URL}/accommodations/北京市",
+            params={"min_rating": 4.5, "max_cost": 800, "sort": "-rating", "limit": 5, "fields": "id,name,cost,rating"},
+            timeout=5
+        )
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ 共 {response.headers.get('X-Total-Count')} 个酒店符合条件，返回 {len(data)} 个")
+            if len(data) > 0:
+                print(f"   示例: {data[0]['name']} ({data[0]['rating']}分, {data[0]['cost']}元)")
+            return True
+        else:
+            print(f"❌ 请求失败: {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ 请求出错: {e}")
+        return False
+
+
+def test_nearby():
+    """测试空间近邻查询接口"""
+    print("\n测试 /nearby 接口...")
+    try:
+        response = requests.get(
+            f"{BASE_URL}/nearby",
+            params={"poi_id": "B0FFG8V7SH", "kind": "restaurants", "k": 5},
+            timeout=5
+        )
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ 成功获取 {len(data)} 个附近餐厅")
+            if len(data) > 0:
+                print(f"   最近: {data[0]['name']} ({data[0]['distance']}km)")
+            return True
+        else:
+            print(f"❌ 请求失败: {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ 请求出错: {e}")
+        return False
+
+
 def main():
     """运行所有测试"""
     print("=" * 60)
@@ -186,7 +232,9 @@ def main():
         test_cross_city_transport,
         test_intra_city_transport,
         test_all_cities,
-        test_poi_data
+        test_poi_data,
+        test_filtered_query,
+        test_nearby
     ]
     
     results = []
@@ -0,0 +1,229 @@
+"""
+异步流程：await plan_question(question, question_id) 返回行程计划结果，一个进程内同时处理多个问题
+- 每个进行中的问题占用一条通道（独立的 Agent 池和任务实例），通道数即并发上限，空闲通道复用
+- ag2 的多智能体对话是同步的，每条通道的对话在工作线程中执行；对话中的 LLM 请求（OpenAI 客户端）
+  和数据 API 请求（ResearcherAgent）都经 AsyncHttpBridge 交给事件循环上的 httpx 异步连接池发送
+- 求解默认在独立的求解执行器中进行（pyomo 不保证线程安全，默认 1 个线程）；
+  solver_processes 大于 0 时建模和求解交给求解进程池（agents/solver_pool.py），CPU 密集的规划与对话各自扩展
+- 超时或取消时立即返回，已开始的对话无法中断，其通道在对话结束后才回到空闲队列
+
+用法：
+    python async_pipeline.py --concurrency 16          # 处理全部问题，结果按 RESULT_SINK 写入 RESULT_DIR
+    python async_pipeline.py --questions 1-10 --timeout 600
+
+    async with AsyncPipeline(max_in_flight=16) as pipeline:
+        result = await pipeline.plan_question(question, question_id)
+"""
+
+import argparse
+import asyncio
+import contextvars
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import main
+from config import LLM_CONFIG, PIPELINE_MAX_IN_FLIGHT, RESULT_DIR, RESULT_SINK, SOLVER_PROCESSES
+from utils import AsyncHttpBridge, BackgroundWriter, create_sink
+
+
+def bridged_llm_config(http_client) -> Dict:
+    """LLM_CONFIG 的副本，每个模型配置使用给定的 http_client"""
+    return {
+        **LLM_CONFIG,
+        "config_list": [{**entry, "http_client": http_client} for entry in LLM_CONFIG["config_list"]]
+    }
+
+
+class AsyncPipeline:
+    """
+    异步处理问题的流程
+
+    Args:
+        max_in_flight: 同时处理的问题数上限（通道数）
+        solver_workers: 求解执行器的线程数（不使用求解进程池时）
+        solver_processes: 求解进程池的进程数，为 0 时不使用进程池
+        timeout: 单个问题的超时（秒），为空时不限制
+        max_connections: 共享连接池的连接数上限，默认为 max_in_flight 的 2 倍
+    """
+
+    def __init__(self, max_in_flight: int = PIPELINE_MAX_IN_FLIGHT, solver_workers: int = 1,
+                 timeout: Optional[float] = None, max_connections: Optional[int] = None,
+                 solver_processes: int = SOLVER_PROCESSES):
+        self.max_in_flight = max(1, max_in_flight)
+        self.solver_workers = max(1, solver_workers)
+        self.solver_processes = max(0, solver_processes)
+        self.timeout = timeout
+        self.max_connections = max_connections or self.max_in_flight * 2
+        self.bridge = None
+        self.llm_config = None
+        self._executor = None
+        self._solver_executor = None
+        self.solver_pool = None
+        self._lanes: Optional[asyncio.Queue] = None
+        self._lane_count = 0
+
+    async def start(self) -> 'AsyncPipeline':
+        self.bridge = AsyncHttpBridge(max_connections=self.max_connections, timeout=LLM_CONFIG["timeout"])
+        self.llm_config = bridged_llm_config(self.bridge.httpx_client(timeout=LLM_CONFIG["timeout"]))
+        self._executor = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="pipeline-lane")
+        self._solver_executor = ThreadPoolExecutor(self.solver_workers, thread_name_prefix="pipeline-solver")
+        if self.solver_processes:
+            from agents.solver_pool import SolverPool
+            self.solver_pool = SolverPool(self.solver_processes)
+        self._lanes = asyncio.Queue()
+        self._lane_count = 0
+        return self
+
+    async def close(self) -> None:
+        """等待进行中的对话结束后释放线程和连接"""
+        loop = asyncio.get_running_loop()
+        # 在其他线程中等待，事件循环继续为进行中的对话发送请求
+        await loop.run_in_executor(None, self._executor.shutdown)
+        self._solver_executor.shutdown()
+        if self.solver_pool is not None:
+            await loop.run_in_executor(None, self.solver_pool.close)
+        await self.bridge.aclose()
+
+    async def __aenter__(self) -> 'AsyncPipeline':
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        await self.close()
+        return False
+
+    def _build_lane(self):
+        """构建一条通道：独立的 Agent 池（LLM 请求经桥接发送）和任务实例"""
+        from agents import AgentPool, PlannerAgent, ResearcherAgent
+
+        pool = AgentPool(llm_config=self.llm_config)
+        tasks = main.build_tasks(pool)
+        pool.get(ResearcherAgent).session = self.bridge.requests_session()
+        planner = pool.get(PlannerAgent)
+        planner.solver_executor = self._solver_executor
+        planner.solver_pool = self.solver_pool
+        return tasks
+
+    async def _acquire_lane(self):
+        if self._lanes.empty() and self._lane_count < self.max_in_flight:
+            self._lane_count += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, self._build_lane)
+            except BaseException:
+                self._lane_count -= 1
+                raise
+        return await self._lanes.get()
+
+    async def plan_question(self, question: str, question_id=None) -> Optional[Dict]:
+        """
+        获取行程计划结果（与 main.run_traced 相同，失败时为 None）
+
+        Raises:
+            asyncio.TimeoutError: 超过 timeout
+        """
+        loop = asyncio.get_running_loop()
+        lane = await self._acquire_lane()
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, main.run_traced, question, question_id, lane)
+        # 对话结束（或尚未开始即被取消）后通道才回到空闲队列
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._lanes.put_nowait, lane))
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    async def plan_many(self, queries: Iterable[Tuple],
+                        on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        并发处理多个问题
+
+        Args:
+            queries: [(question_id, question_text, ...), ...]（如 main.get_all_queries() 的返回值）
+            on_result: 每个问题处理完成时调用（参数为该问题的结果行）
+
+        Returns:
+            按输入顺序的 [{"question_id": ..., "result": ..., "error": ..., "seconds": ...}, ...]
+        """
+        async def run(question_id, question):
+            start = time.perf_counter()
+            try:
+                result, error = await self.plan_question(question, question_id), None
+            except asyncio.TimeoutError:
+                result, error = None, f"超时（{self.timeout} 秒）"
+            except Exception as e:
+                result, error = None, str(e)
+            row = {"question_id": question_id, "result": result, "error": error,
+                   "seconds": time.perf_counter() - start}
+            if on_result is not None:
+                on_result(row)
+            return row
+
+        return await asyncio.gather(*(run(query[0], query[1]) for query in queries))
+
+
+async def plan_question(question: str, question_id=None, **kwargs) -> Optional[Dict]:
+    """处理单个问题（临时创建流程，批量处理时应复用 AsyncPipeline）"""
+    async with AsyncPipeline(max_in_flight=1, **kwargs) as pipeline:
+        return await pipeline.plan_question(question, question_id)
+
+
+def select_queries(spec: str):
+    """按 "1-10,15" 形式的编号范围筛选问题，为空时返回全部"""
+    queries = main.get_all_queries()
+    if not spec:
+        return queries
+    wanted = set()
+    for part in spec.split(","):
+        low, _, high = part.strip().partition("-")
+        wanted.update(range(int(low), int(high or low) + 1))
+    return [query for query in queries if query[0] in wanted]
+
+
+async def run_batch(queries, args) -> List[Dict]:
+    """处理问题，成功的结果由后台线程写入"""
+    writer = BackgroundWriter(create_sink(RESULT_SINK, RESULT_DIR))
+
+    def save(row):
+        if row["result"]:
+            writer.submit(row["question_id"], row["result"])
+
+    try:
+        async with AsyncPipeline(args.concurrency, args.solver_workers, args.timeout,
+                                 solver_processes=args.solver_processes) as pipeline:
+            rows = await pipeline.plan_many(queries, on_result=save)
+            if pipeline.solver_pool is not None:
+                print(f"求解进程池: {pipeline.solver_pool.stats()}")
+            return rows
+    finally:
+        writer.close()
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="异步批量处理问题")
+    parser.add_argument("--questions", default="", help="问题编号范围，如 1-10,15（默认全部）")
+    parser.add_argument("--concurrency", type=int, default=PIPELINE_MAX_IN_FLIGHT, help="同时处理的问题数")
+    parser.add_argument("--solver-workers", type=int, default=1, help="求解执行器线程数")
+    parser.add_argument("--solver-processes", type=int, default=SOLVER_PROCESSES,
+                        help="求解进程池的进程数（0 为不使用进程池）")
+    parser.add_argument("--timeout", type=float, default=None, help="单个问题超时（秒）")
+    args = parser.parse_args(argv)
+    if not main.check_api_key():
+        return 1
+
+    queries = select_queries(args.questions)
+    print(f"\n 异步处理 {len(queries)} 个问题，并发 {args.concurrency}")
+    start = time.perf_counter()
+    rows = asyncio.run(run_batch(queries, args))
+    elapsed = time.perf_counter() - start
+
+    success = sum(1 for row in rows if row["result"])
+    for row in rows:
+        if not row["result"]:
+            print(f"✗ 问题 {row['question_id']} 处理失败{('：' + row['error']) if row['error'] else ''}")
+    print(f"\n成功处理: {success} 个问题，失败: {len(rows) - success} 个，总耗时 {elapsed:.2f} 秒")
+    print(f"结果已保存到: {RESULT_DIR}")
+    main.print_prompt_stats()
+    main.print_stage_stats()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+批量校验基准测试
+对比 agents.validation.PlanValidator 逐个校验与 agents.batch_validation.BatchPlanValidator
+对 N 个索引编码候选方案的向量化校验，并抽样校验两者的总费用和违规数一致
+
+需要设置 SILICONFLOW_API_KEY（导入 agents 包时读取配置，不会发起请求）
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.batch_validation import MODES, BatchPlanValidator
+from agents.validation import PlanValidator
+
+
+def make_city(seed=0, n_attractions=200, n_restaurants=400, n_hotels=30):
+    """构造合成城市数据（API 返回格式）和完整的酒店↔景点交通表"""
+    rnd = random.Random(seed)
+    attractions = [{'id': f'A{i}', 'name': f'A{i}', 'cost': rnd.choice([0, 50, 120, 300]),
+                    'duration': rnd.choice([60, 120, 240])} for i in range(n_attractions)]
+    restaurants = [{'id': f'R{i}', 'name': f'R{i}', 'cost': rnd.choice([20, 60, 150]),
+                    'duration': rnd.choice([30, 60, 90]), 'queue_time': rnd.choice([0, 10, 30])}
+                   for i in range(n_restaurants)]
+    hotels = [{'id': f'H{i}', 'name': f'H{i}', 'cost': rnd.choice([300, 500, 900])} for i in range(n_hotels)]
+    intra_city_trans = {}
+    for hotel in hotels:
+        for attraction in attractions:
+            for key in (f"{hotel['id']},{attraction['id']}", f"{attraction['id']},{hotel['id']}"):
+                intra_city_trans[key] = {
+                    'taxi_duration': rnd.randint(10, 90), 'taxi_cost': rnd.randint(15, 80),
+                    'bus_duration': rnd.randint(20, 150), 'bus_cost': rnd.randint(2, 6)
+                }
+    return {'attractions': attractions, 'restaurants': restaurants, 'accommodations': hotels}, intra_city_trans
+
+
+def random_candidates(batch, n, travel_days, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'attractions': rng.integers(0, len(batch.attraction_ids), (n, travel_days)),
+        'restaurants': rng.integers(0, len(batch.restaurant_ids), (n, travel_days, 3)),
+        'hotels': rng.integers(0, len(batch.hotel_ids), n),
+        'modes': rng.integers(0, len(MODES), (n, travel_days))
+    }
+
+
+def decode(poi_data, candidates, i):
+    """将第 i 个索引编码方案还原为 planner 格式"""
+    def entry(poi):
+        return {'id': poi['id'], 'name': poi['name'], 'data': poi}
+
+    attractions, restaurants = poi_data['attractions'], poi_data['restaurants']
+    travel_days = candidates['attractions'].shape[1]
+    return {
+        'attractions': {d + 1: entry(attractions[candidates['attractions'][i, d]]) for d in range(travel_days)},
+        'restaurants': {d + 1: [entry(restaurants[r]) for r in candidates['restaurants'][i, d]]
+                        for d in range(travel_days)},
+        'accommodations': [entry(poi_data['accommodations'][candidates['hotels'][i]])],
+        'transport_mode': {d + 1: MODES[candidates['modes'][i, d]] for d in range(travel_days)},
+        'train_departure': {'data': {'cost': 500.0}},
+        'train_back': {'data': {'cost': 500.0}}
+    }
+
+
+def main():
+    travel_days, peoples, budget = 5, 3, 9000.0
+    poi_data, intra_city_trans = make_city()
+
+    print("=" * 60)
+    print("批量校验基准测试")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    batch = BatchPlanValidator.from_poi_data(poi_data, intra_city_trans)
+    print(f"构建交通矩阵: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(batch.hotel_ids)} 酒店 x {len(batch.attraction_ids)} 景点)")
+
+    validator = PlanValidator()
+    print(f"\n{'方案数':>8} {'逐个(ms)':>10} {'批量(ms)':>10} {'批量 方案/秒':>14} {'加速比':>8}")
+    for n in (1_000, 10_000, 100_000):
+        candidates = random_candidates(batch, n, travel_days, seed=n)
+
+        start = time.perf_counter()
+        result = batch.validate(**candidates, peoples=peoples, budget=budget, train_cost=1000.0)
+        batch_time = time.perf_counter() - start
+
+        # 逐个校验只测前 1000 个，再按比例折算
+        sample = min(n, 1_000)
+        solutions = [decode(poi_data, candidates, i) for i in range(sample)]
+        start = time.perf_counter()
+        for i, solution in enumerate(solutions):
+            single = validator.validate(solution, travel_days, peoples, budget, intra_city_trans, realistic=False)
+            if i < 100:
+                assert abs(single['total_cost'] - result['total_cost'][i]) < 1e-6
+                assert len(single['rules']['constraint_4']) + len(single['rules']['budget']) == result['violations'][i]
+        single_time = (time.perf_counter() - start) * n / sample
+
+        print(f"{n:>8} {single_time * 1000:>10.1f} {batch_time * 1000:>10.1f} "
+              f"{n / batch_time:>14.0f} {single_time / batch_time:>7.1f}x")
+        print(f"{'':>8} 通过率 {result['valid'].mean() * 100:.1f}%，平均总费用 {result['total_cost'].mean():.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+批量评估基准测试
+在本地启动一个模拟 chat/completions 接口（固定延迟，按提示词哈希给出确定的评分，
+每隔若干个请求返回一次 429），对比 evaluate_multiple_samples 逐个评估与并发评估的耗时，
+并校验两者的逐样本结果和平均分一致；再对比评判缓存命中和批量评判的请求数与耗时
+
+需要设置 SILICONFLOW_API_KEY（导入 agents 包时读取配置，不会发起外部请求）
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LATENCY = 0.2
+THROTTLE_EVERY = 7
+
+
+def fake_score(text):
+    return int(hashlib.sha256(text.encode('utf-8')).hexdigest(), 16) % 101 / 100
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    counter = 0
+    completions = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            FakeCompletionHandler.counter += 1
+            throttled = FakeCompletionHandler.counter % THROTTLE_EVERY == 0
+        if throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        with self.lock:
+            FakeCompletionHandler.completions += 1
+        time.sleep(LATENCY)
+        prompt = body['messages'][0]['content']
+        sections = re.split(r'### 行程 (P\d+)\n', prompt)
+        if len(sections) > 1:
+            # 批量评判：按编号逐个评分
+            results = [
+                {'id': plan_id, 'overall_score': fake_score(text), 'explanation': f'模拟批量评分 {fake_score(text)}'}
+                for plan_id, text in zip(sections[1::2], sections[2::2])
+            ]
+            content = json.dumps({'results': results}, ensure_ascii=False)
+        else:
+            score = fake_score(prompt)
+            content = json.dumps({'overall_score': score, 'explanation': f'模拟评分 {score}'}, ensure_ascii=False)
+        payload = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': content}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_sample(i):
+    day = {
+        'date': f'2025-06-{10 + i % 3:02d}',
+        'breakfast_id': f'R{i}', 'breakfast': f'早餐{i}', 'breakfast_time': '08:00', 'breakfast_cost': 20.0 + i,
+        'lunch_id': f'R{i + 1}', 'lunch': f'午餐{i}', 'lunch_time': '12:00', 'lunch_cost': 60.0,
+        'dinner_id': f'R{i + 2}', 'dinner': f'晚餐{i}', 'dinner_time': '18:00', 'dinner_cost': 80.0,
+        'attraction_id': f'A{i}', 'attraction': f'景点{i}', 'attraction_cost': 50.0,
+        'accommodation_id': 'H1', 'accommodation': '酒店', 'accommodation_cost': 300.0,
+        'path': [{'ori_id': 'H1', 'des_id': f'A{i}', 'time': 20, 'cost': 15.0}]
+    }
+    question = f'第{i}个问题：从深圳去上海玩{2 + i % 3}天'
+    result = {'answer': {'question_id': str(i), 'question': question, 'plan': [day], 'total_cost': 530.0 + i}}
+    entities = {'attractions': [f'A{i}'], 'restaurants': [f'R{i}', f'R{i + 9}']}
+    return result, question, entities, 30.0 + i
+
+
+def strip_timestamps(evaluation):
+    return [{k: v for k, v in item.items() if k != 'timestamp'} for item in evaluation['individual_evaluations']]
+
+
+def main():
+    n_samples = 40
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['SILICONFLOW_API_BASE_URL'] = f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+    from agents.evaluator import TravelPlanEvaluator, evaluate_multiple_samples
+    from utils.http_client import RateLimiter, create_session
+    from utils.judgment_cache import JudgmentCache
+
+    samples = [make_sample(i) for i in range(n_samples)]
+    results, questions, entities, times = (list(column) for column in zip(*samples))
+
+    print("=" * 60)
+    print("批量评估基准测试")
+    print("=" * 60)
+    print(f"{n_samples} 个样本，模拟 LLM 延迟 {LATENCY * 1000:.0f} ms，每 {THROTTLE_EVERY} 个请求返回一次 429")
+
+    outputs = {}
+    print(f"\n{'并发数':>6} {'耗时(s)':>10} {'样本/秒':>10} {'加速比':>8}")
+    for workers in (1, 4, 8, 16):
+        evaluator = TravelPlanEvaluator(session=create_session(workers), rate_limiter=RateLimiter(None),
+                                        retry_backoff=0.01)
+        start = time.perf_counter()
+        outputs[workers] = evaluate_multiple_samples(results, questions, entities, times,
+                                                     max_workers=workers, evaluator=evaluator)
+        elapsed = time.perf_counter() - start
+        if workers == 1:
+            serial_time = elapsed
+        print(f"{workers:>6} {elapsed:>10.2f} {n_samples / elapsed:>10.1f} {serial_time / elapsed:>7.1f}x")
+
+    serial = outputs[1]
+    for workers, output in outputs.items():
+        assert output['average_scores'] == serial['average_scores'], workers
+        assert strip_timestamps(output) == strip_timestamps(serial), workers
+    assert all(item['ar']['explanation'].startswith('模拟评分') for item in serial['individual_evaluations'])
+    print(f"\n逐样本结果和平均分一致，平均最终分数 {serial['average_scores']['final_score']:.4f}")
+
+    # 限流：每秒 20 个请求、突发 4 个时的实际吞吐
+    evaluator = TravelPlanEvaluator(session=create_session(8), rate_limiter=RateLimiter(20, burst=4),
+                                    retry_backoff=0.01)
+    start = time.perf_counter()
+    evaluate_multiple_samples(results, questions, entities, times, max_workers=8, evaluator=evaluator)
+    elapsed = time.perf_counter() - start
+    print(f"限流 20 请求/秒（8 线程）: {elapsed:.2f} s，{n_samples / elapsed:.1f} 样本/秒")
+
+    # 评判缓存与批量评判（8 线程，不限流）
+    print(f"\n{'模式':<22} {'LLM 请求':>8} {'耗时(s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = JudgmentCache(os.path.join(tmp, 'judgments.sqlite'))
+        for label, batch_size in (('逐个评判（冷缓存）', 1), ('逐个评判（热缓存）', 1), ('批量评判 5 个/请求', 5),
+                                  ('批量评判 10 个/请求', 10)):
+            if batch_size > 1:
+                cache.clear()
+            evaluator = TravelPlanEvaluator(session=create_session(8), rate_limiter=RateLimiter(None),
+                                            retry_backoff=0.01, cache=cache)
+            before = FakeCompletionHandler.completions
+            start = time.perf_counter()
+            output = evaluate_multiple_samples(results, questions, entities, times, max_workers=8,
+                                               evaluator=evaluator, ar_batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            requests_sent = FakeCompletionHandler.completions - before
+            print(f"{label:<22} {requests_sent:>8} {elapsed:>10.2f}")
+            if label == '逐个评判（热缓存）':
+                assert requests_sent == 0
+                assert strip_timestamps(output) == strip_timestamps(serial)
+            if batch_size > 1:
+                assert requests_sent == -(-n_samples // batch_size)
+                assert all(item['ar']['explanation'].startswith('模拟批量评分')
+                           for item in output['individual_evaluations'])
+        print(f"缓存: {cache.stats()}")
+        cache.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
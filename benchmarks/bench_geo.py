@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+地理距离基准测试
+使用 api/data 中的 POI 坐标，对比逐个计算距离与 utils.geo 向量化距离 / GridIndex 网格索引的
+半径查询耗时，并校验两者结果一致；同时给出单日“餐厅是否靠近景点”检查的耗时
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo import GridIndex, haversine, poi_distance
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'data')
+
+
+def load_pois(filename, id_column):
+    frame = pd.read_csv(os.path.join(DATA_DIR, filename))
+    return [
+        {'id': row[id_column], 'city_name': row['city_name'], 'latitude': row['latitude'], 'longitude': row['longitude']}
+        for _, row in frame.iterrows()
+    ]
+
+
+def brute_force_within(pois, lat, lon, radius_km):
+    result = []
+    for poi in pois:
+        distance = haversine(lat, lon, poi['latitude'], poi['longitude'])
+        if distance <= radius_km:
+            result.append((poi['id'], distance))
+    result.sort(key=lambda item: item[1])
+    return result
+
+
+def main():
+    attractions = load_pois('poi_attraction.csv', 'attraction_id')
+    restaurants = load_pois('poi_restaurant.csv', 'restaurant_id')
+
+    print("=" * 60)
+    print("地理距离基准测试")
+    print("=" * 60)
+
+    by_city = {}
+    for poi in restaurants:
+        by_city.setdefault(poi['city_name'], []).append(poi)
+    start = time.perf_counter()
+    indexes = {city: GridIndex(pois) for city, pois in by_city.items()}
+    print(f"构建 {len(indexes)} 个城市的餐厅网格索引: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rnd = random.Random(0)
+    queries = [a for a in attractions if a['city_name'] in indexes]
+    queries = [rnd.choice(queries) for _ in range(2000)]
+
+    print(f"\n{'半径(km)':>8} {'逐个(µs/次)':>12} {'网格(µs/次)':>12} {'加速比':>8}")
+    for radius in (1, 3, 10):
+        start = time.perf_counter()
+        expected = [brute_force_within(by_city[q['city_name']], q['latitude'], q['longitude'], radius) for q in queries]
+        brute_time = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        actual = [indexes[q['city_name']].within(q['latitude'], q['longitude'], radius) for q in queries]
+        grid_time = (time.perf_counter() - start) / len(queries)
+
+        for got, want in zip(actual, expected):
+            assert [poi_id for poi_id, _ in got] == [poi_id for poi_id, _ in want]
+        print(f"{radius:>8} {brute_time * 1e6:>12.1f} {grid_time * 1e6:>12.1f} {brute_time / grid_time:>7.1f}x")
+
+    # 单日餐厅-景点距离检查（三家餐厅）
+    days = [(q, rnd.sample(by_city[q['city_name']], 3)) for q in queries]
+    start = time.perf_counter()
+    for attraction, day_restaurants in days:
+        min(poi_distance(attraction, rest) for rest in day_restaurants)
+    per_day = (time.perf_counter() - start) / len(days)
+    print(f"\n单日餐厅距离检查: {per_day * 1e6:.1f} µs/天")
+
+
+if __name__ == "__main__":
+    main()
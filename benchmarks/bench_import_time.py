@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+导入耗时分析
+在子进程中以 python -X importtime 执行几种典型用法（main.py 启动到输入提示、只使用评估器、构建全部任务），
+汇总导入总耗时、进程耗时，以及 autogen / pyomo / pandas / numpy / openai / requests 等重依赖是否被加载和各自的耗时
+（按顶层包汇总包内所有模块的自身耗时）
+
+用法：
+    python benchmarks/bench_import_time.py            # 每种用法运行 5 次取最小值
+    python benchmarks/bench_import_time.py --top 15   # 同时列出耗时最高的 15 个顶层包
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "main.py 启动": "import main",
+    "只使用评估器": "from agents.evaluator import TravelPlanEvaluator, evaluate_multiple_samples",
+    "构建全部任务": "import main; main.get_tasks()"
+}
+HEAVY_PACKAGES = ("autogen", "pyomo", "pandas", "numpy", "openai", "requests", "tiktoken")
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def run_importtime(code):
+    """执行一次，返回 (进程耗时秒, 导入总耗时微秒, {顶层包: 包内模块自身耗时之和（微秒）})"""
+    env = dict(os.environ)
+    env.setdefault("SILICONFLOW_API_KEY", "import-time-profile")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                               capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+
+    total = 0
+    packages = {}
+    for line in completed.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, name = int(match.group(1)), match.group(4)
+        total += self_us
+        root = name.split(".", 1)[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return elapsed, total, packages
+
+
+def profile(code, repeat):
+    runs = [run_importtime(code) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run[1])
+    return {
+        "process_s": min(run[0] for run in runs),
+        "import_ms": best[1] / 1000,
+        "packages": best[2]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入耗时分析（python -X importtime）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="列出耗时最高的 N 个顶层包")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("导入耗时分析")
+    print("=" * 60)
+    print(f"\n{'导入(ms)':>10} {'进程(s)':>9}  用法：已加载的重依赖（ms）")
+    results = {}
+    for label, code in SCENARIOS.items():
+        result = results[label] = profile(code, args.repeat)
+        heavy = ", ".join(f"{name} {us / 1000:.0f}" for name, us in
+                          sorted(result["packages"].items(), key=lambda item: -item[1])
+                          if name in HEAVY_PACKAGES) or "无"
+        print(f"{result['import_ms']:>10.1f} {result['process_s']:>9.2f}  {label}：{heavy}")
+
+    if args.top:
+        for label, result in results.items():
+            print(f"\n{label}：耗时最高的顶层包")
+            for name, us in sorted(result["packages"].items(), key=lambda item: -item[1])[:args.top]:
+                print(f"  {name:<40} {us / 1000:>8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
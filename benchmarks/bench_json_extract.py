@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+JSON 提取基准测试
+对比旧的贪婪正则提取（r'\\{[\\s\\S]*"answer"[\\s\\S]*\\}' + json.loads）与
+utils.json_extract 的单次扫描提取在大型合成对话上的耗时，验证新实现随消息长度线性增长
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_extract import find_json
+
+
+def legacy_find_answer(messages):
+    """旧实现（与改造前 GenerateTask 中的提取逻辑一致）"""
+    for message in reversed(messages):
+        content = message.get("content", "")
+        json_match = re.search(r'\{[\s\S]*"answer"[\s\S]*\}', content)
+        if json_match:
+            try:
+                result = json.loads(json_match.group(0))
+                if "answer" in result:
+                    return result
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def make_transcript(target_chars, seed=0):
+    """
+    构造合成对话：第一条消息包含 answer，之后是一条很长的数据消息（大量 POI 片段、
+    说明文字和残缺 JSON，不含 answer）。从后往前查找时，旧正则会在长消息中从每个 '{'
+    起匹配到末尾再回溯
+    """
+    rnd = random.Random(seed)
+    answer = {"answer": {"question_id": "1", "question": "测试", "plan": [{"day": 1}]}}
+    messages = [{"role": "assistant", "content": "最终结果：\n```json\n" + json.dumps(answer, ensure_ascii=False) + "\n```"}]
+    parts = []
+    size = 0
+    while size < target_chars:
+        pois = [
+            {
+                "id": f"B0{rnd.randint(10000000, 99999999)}",
+                "name": f"景点{rnd.randint(1, 9999)}",
+                "cost": rnd.choice([0, 50, 120]),
+                "rating": round(rnd.uniform(3.5, 5.0), 1)
+            }
+            for _ in range(20)
+        ]
+        part = (
+            "研究者返回的数据如下：\n"
+            + json.dumps(pois, ensure_ascii=False)
+            + "\n部分结果 {\"plan\": [ {\"day\": 1, 未完成 \n"
+        )
+        parts.append(part)
+        size += len(part)
+    messages.append({"role": "assistant", "content": "".join(parts)})
+    return messages
+
+
+def measure(func, messages, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(messages)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    print("=" * 60)
+    print("JSON 提取基准测试")
+    print("=" * 60)
+    sizes = [10_000, 20_000, 40_000, 80_000, 160_000, 320_000, 640_000]
+    legacy_limit = 80_000  # 旧实现在更大的对话上耗时过长，只测到这里
+
+    print(f"{'字符数':>10} {'新实现(ms)':>12} {'ns/字符':>10} {'旧实现(ms)':>12} {'加速比':>8}")
+    for size in sizes:
+        messages = make_transcript(size)
+        total_chars = sum(len(m["content"]) for m in messages)
+        new_time, new_result = measure(lambda m: find_json(m, required_keys=("answer",)), messages)
+        assert new_result and "answer" in new_result
+
+        if size <= legacy_limit:
+            old_time, old_result = measure(legacy_find_answer, messages, repeat=1)
+            legacy_text = f"{old_time * 1000:>12.1f} {old_time / new_time:>7.1f}x"
+        else:
+            legacy_text = f"{'-':>12} {'-':>8}"
+        print(f"{total_chars:>10} {new_time * 1000:>12.2f} {new_time / total_chars * 1e9:>10.1f} {legacy_text}")
+
+    print("\n说明：新实现的 ns/字符 应基本保持不变（线性），旧实现耗时随长度超线性增长")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+多智能体流程离线压测
+启动本地 LLM 替身服务（benchmarks/mock_llm.py，脚本回复或回放录制的对话），
+用 main.run_traced 依次处理若干问题（--concurrency 大于 1 时用 async_pipeline 并发处理），
+输出每个问题的耗时、LLM 请求数和各阶段耗时统计（p50/p95）
+
+不访问 SiliconFlow；默认的脚本回复不发起工具调用，因此不需要启动数据 API（回放含工具调用的录制对话时需要）
+benchmarks/scripts/plan_trip_tool.json 让 planner 对生成任务发起 plan_trip 工具调用，用于确认工具在群聊中实际执行
+（阶段统计中出现 tool.plan_trip；未启动数据 API 时 plan_trip 返回数据不足）
+用法：
+    python benchmarks/bench_pipeline.py --questions 5 --latency 0.3
+    python benchmarks/bench_pipeline.py --questions 20 --latency 0.3 --concurrency 10
+    python benchmarks/bench_pipeline.py --replay transcripts.jsonl
+    python benchmarks/bench_pipeline.py --questions 1 --script benchmarks/scripts/plan_trip_tool.json
+    python -m cProfile -o pipeline.prof benchmarks/bench_pipeline.py --questions 3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm import MockLLMServer, ScriptedResponder, TranscriptResponder
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="多智能体流程离线压测")
+    parser.add_argument("--questions", type=int, default=5, help="处理的问题数（从第 1 题开始）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个 LLM 请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机抖动上限（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="模拟生成速度（0 为不模拟）")
+    parser.add_argument("--script", default=None, help="自定义规则 JSON 文件")
+    parser.add_argument("--replay", default=None, help="回放的对话记录 JSONL")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时处理的问题数（大于 1 时使用异步流程）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scripted = ScriptedResponder.from_file(args.script) if args.script else ScriptedResponder()
+    responder = TranscriptResponder(args.replay, fallback=scripted) if args.replay else scripted
+    server = MockLLMServer(responder, latency=args.latency, jitter=args.jitter,
+                           tokens_per_second=args.tokens_per_second).start()
+
+    # 配置在导入时读取，需在导入 main 之前设置
+    os.environ["SILICONFLOW_API_BASE_URL"] = server.base_url
+    os.environ.setdefault("SILICONFLOW_API_KEY", "mock")
+    os.environ["TRACE_DIR"] = ""
+    import main as pipeline
+    from utils import get_stage_stats
+
+    queries = pipeline.get_all_queries()[:args.questions]
+    print("=" * 60)
+    print("多智能体流程离线压测")
+    print("=" * 60)
+    print(f"{len(queries)} 个问题，并发 {args.concurrency}，LLM 替身 {server.base_url}，延迟 {args.latency * 1000:.0f} ms")
+
+    rows = []
+    start_all = time.perf_counter()
+    if args.concurrency > 1:
+        from async_pipeline import AsyncPipeline
+
+        async def run_all():
+            async with AsyncPipeline(max_in_flight=args.concurrency) as async_pipeline:
+                return await async_pipeline.plan_many(queries)
+
+        # 并发处理时各问题的 LLM 请求交错，不单独统计
+        for row in asyncio.run(run_all()):
+            rows.append((row["question_id"], row["seconds"], "-", row["result"] is not None))
+    else:
+        for question_id, question, _ in queries:
+            before = server.stats()["requests"]
+            start = time.perf_counter()
+            result = pipeline.run_traced(question, question_id)
+            rows.append((question_id, time.perf_counter() - start, server.stats()["requests"] - before,
+                         result is not None))
+    total = time.perf_counter() - start_all
+
+    print(f"\n{'问题':>6} {'耗时(s)':>10} {'LLM 请求':>9} {'结果':>6}")
+    for question_id, elapsed, requests_sent, ok in rows:
+        print(f"{question_id:>6} {elapsed:>10.2f} {requests_sent:>9} {'ok' if ok else 'none':>6}")
+    print(f"\n合计 {total:.2f} s，平均每题 {total / max(1, len(rows)):.2f} s")
+    print(f"LLM 替身: {server.stats()}")
+    if isinstance(responder, TranscriptResponder):
+        print(f"回放命中 {responder.hits}，未命中 {responder.misses}")
+    print("\n阶段耗时统计（秒）:")
+    print(get_stage_stats().format_table())
+    server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
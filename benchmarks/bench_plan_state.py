@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+增量状态基准测试
+对比局部搜索中评估单项替换（餐厅、景点、交通方式）的两种方式：
+每次替换后用 PlanValidator 重新校验整个方案，与 agents.plan_state.PlanState 的 O(1) 增量评估，
+并校验两者的总费用和每日时间违规数一致
+
+需要设置 SILICONFLOW_API_KEY（导入 agents 包时读取配置，不会发起请求）
+"""
+
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.plan_state import PlanState
+from agents.validation import PlanValidator
+from bench_validation import make_case
+
+
+def random_moves(solution, travel_days, n, seed=0):
+    """生成 n 个随机单项替换 (类型, 天, 参数)"""
+    rnd = random.Random(seed)
+    attractions = list(solution['attractions'].values())
+    restaurants = [r for rests in solution['restaurants'].values() for r in rests]
+    moves = []
+    for _ in range(n):
+        day = rnd.randint(1, travel_days)
+        kind = rnd.choice(('restaurant', 'attraction', 'mode'))
+        if kind == 'restaurant':
+            moves.append((kind, day, (rnd.randint(0, 2), rnd.choice(restaurants))))
+        elif kind == 'attraction':
+            moves.append((kind, day, rnd.choice(attractions)))
+        else:
+            moves.append((kind, day, rnd.choice(('taxi', 'bus'))))
+    return moves
+
+
+def full_evaluate(validator, solution, travel_days, peoples, budget, intra_city_trans, moves):
+    """每次替换后重新校验整个方案"""
+    results = []
+    for kind, day, arg in moves:
+        if kind == 'restaurant':
+            solution['restaurants'][day][arg[0]] = arg[1]
+        elif kind == 'attraction':
+            solution['attractions'][day] = arg
+        else:
+            solution['transport_mode'][day] = arg
+        result = validator.validate(solution, travel_days, peoples, budget, intra_city_trans, realistic=False)
+        results.append((result['total_cost'], len(result['rules']['constraint_4'])))
+    return results
+
+
+def delta_evaluate(validator, solution, travel_days, peoples, budget, intra_city_trans, moves):
+    """在增量状态上评估并应用替换"""
+    state = PlanState(solution, travel_days, peoples, budget, intra_city_trans, validator=validator)
+    results = []
+    for kind, day, arg in moves:
+        if kind == 'restaurant':
+            delta = state.restaurant_delta(day, arg[0], arg[1])
+        elif kind == 'attraction':
+            delta = state.attraction_delta(day, arg)
+        else:
+            delta = state.mode_delta(day, arg)
+        state.apply(delta)
+        results.append((state.total_cost, state.time_violations))
+    return results
+
+
+def main():
+    peoples, budget, n_moves = 3, 8000.0, 2000
+    validator = PlanValidator()
+
+    print("=" * 60)
+    print("增量状态基准测试")
+    print("=" * 60)
+    print(f"{'天数':>6} {'全量(ms)':>10} {'增量(ms)':>10} {'增量 次/秒':>12} {'加速比':>8}")
+    for travel_days in (5, 30, 120):
+        solution, intra_city_trans = make_case(travel_days, seed=travel_days)
+        moves = random_moves(solution, travel_days, n_moves, seed=travel_days)
+        args = (travel_days, peoples, budget, intra_city_trans, moves)
+
+        start = time.perf_counter()
+        full = full_evaluate(validator, copy.deepcopy(solution), *args)
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        delta = delta_evaluate(validator, copy.deepcopy(solution), *args)
+        delta_time = time.perf_counter() - start
+
+        for (full_cost, full_violations), (delta_cost, delta_violations) in zip(full, delta):
+            assert abs(full_cost - delta_cost) < 1e-6
+            assert full_violations == delta_violations
+
+        print(f"{travel_days:>6} {full_time * 1000:>10.1f} {delta_time * 1000:>10.1f} "
+              f"{n_moves / delta_time:>12.0f} {full_time / delta_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+问题数据集加载对比
+- 逐题查找：原实现每次重新读取并解析 question.json 后线性查找，对比共享的 DatasetStore 按 id 索引查找
+- 冷加载：解析 JSON，对比读取二进制缓存（DATASET_CACHE_DIR）
+
+用法：
+    python benchmarks/bench_question_store.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import clear_dataset_cache, load_dataset
+
+QUESTION_PATH = os.path.join(ROOT, "prompts", "question.json")
+
+
+def lookup_by_reparse(question_id):
+    """原 main.get_query 的做法：每次解析文件再线性查找"""
+    with open(QUESTION_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for item in data:
+        if int(item.get("question_id")) == question_id:
+            return item
+    return None
+
+
+def lookup_by_store(question_id):
+    return load_dataset(QUESTION_PATH, "question_id").get(question_id)
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="问题数据集加载对比")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    ids = [int(item["question_id"]) for item in load_dataset(QUESTION_PATH, "question_id")]
+    reparse = best_of(args.repeat, lambda: [lookup_by_reparse(i) for i in ids])
+    indexed = best_of(args.repeat, lambda: [lookup_by_store(i) for i in ids])
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def cold(use_cache):
+            clear_dataset_cache()
+            load_dataset(QUESTION_PATH, "question_id", cache_dir=cache_dir if use_cache else None)
+
+        cold(True)  # 生成缓存文件
+        parse = best_of(args.repeat, lambda: cold(False))
+        cached = best_of(args.repeat, lambda: cold(True))
+
+    print("=" * 60)
+    print(f"问题数据集加载对比（{len(ids)} 题，{os.path.getsize(QUESTION_PATH) / 1024:.0f} KB）")
+    print("=" * 60)
+    print(f"{'耗时(ms)':>10}  方式")
+    print(f"{reparse * 1000:>10.2f}  逐题查找：每次重新解析 + 线性查找")
+    print(f"{indexed * 1000:>10.2f}  逐题查找：共享数据集 + id 索引")
+    print(f"{parse * 1000:>10.2f}  冷加载：解析 JSON")
+    print(f"{cached * 1000:>10.2f}  冷加载：读取二进制缓存")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+POI 记录内存基准测试
+使用 api/data 中 POI 最多的城市，对比规划器原来的按 POI 建字典 + 提取解时逐条复制 data 字典，
+与 agents.records 的 __slots__ 记录表 + 方案间共享记录的内存占用（tracemalloc）和构建耗时，
+并校验两种方式得到的字段值一致
+
+需要设置 SILICONFLOW_API_KEY（导入 agents 包时读取配置，不会发起请求）
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.records import AttractionRecord, HotelRecord, RestaurantRecord, TrainRecord, RecordTable
+from api.run_api import CSV_DIR, POI_KINDS
+
+RECORD_TYPES = {
+    'attractions': AttractionRecord,
+    'accommodations': HotelRecord,
+    'restaurants': RestaurantRecord
+}
+CSV_FILES = {
+    'attractions': 'poi_attraction.csv',
+    'accommodations': 'poi_accommodation.csv',
+    'restaurants': 'poi_restaurant.csv'
+}
+
+
+def load_largest_city():
+    """按 API 返回格式加载 POI 总数最多的城市"""
+    frames = {kind: pd.read_csv(CSV_DIR / filename) for kind, filename in CSV_FILES.items()}
+    counts = sum(frame['city_name'].value_counts() for frame in frames.values())
+    city_name = counts.idxmax()
+    poi_data = {}
+    for kind, frame in frames.items():
+        formatter, _ = POI_KINDS[kind]
+        poi_data[kind] = [formatter(row) for _, row in frame[frame['city_name'] == city_name].iterrows()]
+    return city_name, poi_data
+
+
+def load_trains():
+    """全部跨城火车（/cross-city-transport 返回格式，数值字段为字符串）"""
+    frame = pd.read_csv(CSV_DIR / 'path_planning_cross_city.csv')
+    return [{
+        'origin_id': row['origin_id'],
+        'destination_id': row['destination_id'],
+        'train_number': f"{row['train_plan_train_number']}-{i}",
+        'duration': str(int(row['train_plan_duration'])) if pd.notna(row['train_plan_duration']) else "0",
+        'cost': str(row['train_plan_cost']) if pd.notna(row['train_plan_cost']) else "0",
+        'origin_station': row['train_plan_origin_station'],
+        'destination_station': row['train_plan_destination_station']
+    } for i, (_, row) in enumerate(frame.iterrows())]
+
+
+def dict_tables(poi_data, trains):
+    """原实现：每个 POI / 火车一个字段字典（与 build_model 原来的 Param 初始化相同）"""
+    tables = {}
+    for kind, record_type in RECORD_TYPES.items():
+        tables[kind] = {}
+        for item in poi_data[kind]:
+            tables[kind][item['id']] = {
+                field: float(item.get(field, 0)) if field in record_type.NUMERIC
+                else item.get(field, None if field in record_type.OPTIONAL else '')
+                for field in record_type.FIELDS
+            }
+    tables['trains'] = {
+        t['train_number']: {
+            field: float(t.get(field, 0)) if field in TrainRecord.NUMERIC else t.get(field, '')
+            for field in TrainRecord.FIELDS
+        }
+        for t in trains
+    }
+    return tables
+
+
+def record_tables(poi_data, trains):
+    tables = {kind: RecordTable.from_api(record_type, poi_data[kind]) for kind, record_type in RECORD_TYPES.items()}
+    tables['trains'] = RecordTable.from_api(TrainRecord, trains, key='train_number')
+    return tables
+
+
+def pick_solutions(tables, n, travel_days, seed=0):
+    """n 个随机方案的选择（只含 id，两种实现共用）"""
+    rnd = random.Random(seed)
+    attractions = tables['attractions'].ids
+    restaurants = tables['restaurants'].ids
+    hotels = tables['accommodations'].ids
+    trains = tables['trains'].ids
+    return [{
+        'attractions': rnd.sample(attractions, travel_days),
+        'restaurants': [rnd.sample(restaurants, 3) for _ in range(travel_days)],
+        'hotel': rnd.choice(hotels),
+        'trains': rnd.sample(trains, 2)
+    } for _ in range(n)]
+
+
+def extract_dicts(tables, picks):
+    """原 _extract_solution：每个选中的 POI 复制一份 data 字典"""
+    def entry(table, poi_id):
+        data = table[poi_id]
+        return {'id': data['id'], 'name': data['name'], 'data': dict(data)}
+
+    solutions = []
+    for pick in picks:
+        solutions.append({
+            'attractions': {d: entry(tables['attractions'], a) for d, a in enumerate(pick['attractions'], 1)},
+            'accommodations': [entry(tables['accommodations'], pick['hotel'])],
+            'restaurants': {
+                d: [entry(tables['restaurants'], r) for r in rests] for d, rests in enumerate(pick['restaurants'], 1)
+            },
+            'train_departure': {'train_number': pick['trains'][0], 'data': dict(tables['trains'][pick['trains'][0]])},
+            'train_back': {'train_number': pick['trains'][1], 'data': dict(tables['trains'][pick['trains'][1]])}
+        })
+    return solutions
+
+
+def extract_records(tables, picks):
+    """新 _extract_solution：直接引用记录表中的记录"""
+    solutions = []
+    for pick in picks:
+        solutions.append({
+            'attractions': {d: tables['attractions'][a] for d, a in enumerate(pick['attractions'], 1)},
+            'accommodations': [tables['accommodations'][pick['hotel']]],
+            'restaurants': {
+                d: [tables['restaurants'][r] for r in rests] for d, rests in enumerate(pick['restaurants'], 1)
+            },
+            'train_departure': tables['trains'][pick['trains'][0]],
+            'train_back': tables['trains'][pick['trains'][1]]
+        })
+    return solutions
+
+
+def measure(fn, *args):
+    """返回 (结果, 新分配的内存字节数, 耗时秒)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    n_solutions, travel_days = 1000, 5
+    city_name, poi_data = load_largest_city()
+    trains = load_trains()
+
+    print("=" * 60)
+    print("POI 记录内存基准测试")
+    print("=" * 60)
+    print(f"{city_name}: " + ", ".join(f"{kind} {len(items)}" for kind, items in poi_data.items())
+          + f", 火车 {len(trains)}")
+
+    old_tables, old_size, old_time = measure(dict_tables, poi_data, trains)
+    new_tables, new_size, new_time = measure(record_tables, poi_data, trains)
+    for kind, table in old_tables.items():
+        assert list(table) == new_tables[kind].ids
+        for key, data in table.items():
+            assert new_tables[kind][key].to_dict() == data
+
+    print(f"\n{'':<14} {'字典(KB)':>10} {'记录(KB)':>10} {'节省':>7} {'字典(ms)':>10} {'记录(ms)':>10}")
+    print(f"{'数据表':<14} {old_size / 1024:>10.1f} {new_size / 1024:>10.1f} {1 - new_size / old_size:>6.0%} "
+          f"{old_time * 1000:>10.1f} {new_time * 1000:>10.1f}")
+
+    picks = pick_solutions(new_tables, n_solutions, travel_days)
+    old_solutions, old_size, old_time = measure(extract_dicts, old_tables, picks)
+    new_solutions, new_size, new_time = measure(extract_records, new_tables, picks)
+    for old, new in zip(old_solutions, new_solutions):
+        for d in range(1, travel_days + 1):
+            assert old['attractions'][d]['data'] == new['attractions'][d].get('data').to_dict()
+            assert [r['id'] for r in old['restaurants'][d]] == [r['id'] for r in new['restaurants'][d]]
+    label = f"{n_solutions}个方案"
+    print(f"{label:<14} {old_size / 1024:>10.1f} {new_size / 1024:>10.1f} {1 - new_size / old_size:>6.0%} "
+          f"{old_time * 1000:>10.1f} {new_time * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ResearcherAgent 响应缓存对比
+- 在本地启动数据 API（api/run_api.py），按问题中出现的城市依次查询景点/住宿/餐厅/市内交通和跨城交通
+- 对比不缓存、进程内缓存（同一城市只请求一次）和磁盘缓存（新进程从 sqlite 读取）的耗时与实际请求数
+
+用法：
+    python benchmarks/bench_research_cache.py
+    python benchmarks/bench_research_cache.py --data-dir /path/to/csv --questions 40
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+from utils import ResponseCache, load_dataset
+
+QUESTION_PATH = os.path.join(ROOT, "prompts", "question.json")
+
+
+def start_api(data_dir=None):
+    """在后台线程中启动数据 API，返回 (base_url, server)，数据加载失败时返回 (None, None)"""
+    import run_api
+    from werkzeug.serving import make_server
+
+    if data_dir:
+        run_api.CSV_DIR = Path(data_dir)
+    if not run_api.load_data():
+        return None, None
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, run_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def question_cities(questions, known_cities):
+    """每个问题中出现的城市（按在问题中出现的位置排序，第一个视为出发城市）"""
+    result = []
+    for item in questions:
+        text = item["question"]
+        found = [(text.find(city.rstrip("市")), city) for city in known_cities if city.rstrip("市") in text]
+        result.append([city for _, city in sorted(found)])
+    return result
+
+
+def make_researcher(base_url, cache):
+    """不构建 autogen Agent 的 ResearcherAgent（只使用数据查询方法）"""
+    from agents.researcher import ResearcherAgent
+    from utils.http_client import create_session
+
+    researcher = ResearcherAgent.__new__(ResearcherAgent)
+    researcher.api_base_url = base_url
+    researcher.api_timeout = 30
+    researcher.session = create_session()
+    researcher.cache = cache
+    return researcher
+
+
+def run_lookups(researcher, cities_per_question):
+    """返回 (耗时, 发出的请求数)"""
+    sent = [0]
+    send = researcher._send
+
+    def counting_send(*args, **kwargs):
+        sent[0] += 1
+        return send(*args, **kwargs)
+
+    researcher._send = counting_send
+    start = time.perf_counter()
+    for cities in cities_per_question:
+        for city in cities[1:] or cities:
+            researcher.get_attractions(city)
+            researcher.get_accommodations(city)
+            researcher.get_restaurants(city)
+            researcher.get_intra_city_transport(city)
+        if len(cities) >= 2:
+            researcher.get_cross_city_transport(cities[0], cities[1])
+            researcher.get_cross_city_transport(cities[1], cities[0])
+    return time.perf_counter() - start, sent[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ResearcherAgent 响应缓存对比")
+    parser.add_argument("--data-dir", default="", help="数据 API 的 CSV 目录（默认 api/data）")
+    parser.add_argument("--questions", type=int, default=0, help="只使用前 N 个问题（默认全部）")
+    args = parser.parse_args(argv)
+
+    base_url, server = start_api(args.data_dir or None)
+    if base_url is None:
+        print("skipped: 数据 API 加载数据失败（api/data 数据不完整，可用 --data-dir 指定）")
+        return 0
+
+    import run_api
+    questions = list(load_dataset(QUESTION_PATH, "question_id"))
+    if args.questions:
+        questions = questions[:args.questions]
+    cities = question_cities(questions, run_api.known_cities)
+
+    rows = []
+    try:
+        plain = run_lookups(make_researcher(base_url, None), cities)
+        rows.append(("不缓存", *plain, None))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, "responses.sqlite")
+            memory = ResponseCache(path=path)
+            rows.append(("进程内缓存", *run_lookups(make_researcher(base_url, memory), cities), memory.stats()))
+            memory.close()
+            # 新的缓存实例相当于新进程：内存层为空，从磁盘层读取
+            disk = ResponseCache(path=path)
+            rows.append(("磁盘缓存（新进程）", *run_lookups(make_researcher(base_url, disk), cities), disk.stats()))
+            disk.close()
+    finally:
+        server.shutdown()
+
+    print("=" * 72)
+    print(f"ResearcherAgent 响应缓存对比（{len(questions)} 题，"
+          f"{len({city for item in cities for city in item})} 个城市）")
+    print("=" * 72)
+    print(f"{'耗时(ms)':>10} {'请求数':>6} {'命中率':>7}  方式")
+    for name, seconds, sent, stats in rows:
+        hit_rate = f"{stats['hit_rate']:.0%}" if stats else "-"
+        print(f"{seconds * 1000:>10.1f} {sent:>6} {hit_rate:>7}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+日程排程基准测试
+使用 api/data 中的景点开放时间和餐厅营业时间，随机组合每日行程，统计
+营业时间解析（按 POI 缓存前后）和单日排程的耗时，以及不可行天和各类问题的数量
+
+需要设置 SILICONFLOW_API_KEY（导入 agents 包时读取配置，不会发起请求）
+"""
+
+import collections
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.scheduler import DayScheduler
+from utils.time_windows import parse_hours, window_range
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api', 'data')
+
+
+def text(value) -> str:
+    return value if isinstance(value, str) else ''
+
+
+def load_city(city_name):
+    attractions = pd.read_csv(os.path.join(DATA_DIR, 'poi_attraction.csv'))
+    restaurants = pd.read_csv(os.path.join(DATA_DIR, 'poi_restaurant.csv'))
+    attractions = [
+        {'id': row['attraction_id'], 'name': row['attraction_name'], 'data': {
+            'duration': float(row['suggested_duration']) if pd.notna(row['suggested_duration']) else 0.0,
+            'open_time': text(row['open_time']), 'close_time': text(row['close_time'])}}
+        for _, row in attractions[attractions['city_name'] == city_name].iterrows()
+    ]
+    restaurants = [
+        {'id': row['restaurant_id'], 'name': row['restaurant_name'], 'data': {
+            'duration': float(row['consumption_time']) if pd.notna(row['consumption_time']) else 0.0,
+            'queue_time': float(row['queue_time']) if pd.notna(row['queue_time']) else 0.0,
+            'business_hours': text(row['business_hours'])}}
+        for _, row in restaurants[restaurants['city_name'] == city_name].iterrows()
+    ]
+    return attractions, restaurants
+
+
+def make_days(attractions, restaurants, n, seed=0):
+    """n 个随机的单日条目（与 PlanValidator.build_table 的每日条目结构相同）"""
+    rnd = random.Random(seed)
+    return [{
+        'day': 1,
+        'attraction': rnd.choice(attractions),
+        'restaurants': rnd.sample(restaurants, 3),
+        'mode': 'taxi',
+        'last': False,
+        'out_duration': float(rnd.randint(10, 60)),
+        'back_duration': float(rnd.randint(10, 60))
+    } for _ in range(n)]
+
+
+def main():
+    city_name, n_days = '上海市', 5000
+    attractions, restaurants = load_city(city_name)
+    days = make_days(attractions, restaurants, n_days)
+
+    print("=" * 60)
+    print("日程排程基准测试")
+    print("=" * 60)
+    print(f"{city_name}: {len(attractions)} 个景点, {len(restaurants)} 家餐厅, {n_days} 个随机单日行程")
+
+    # 营业时间解析：每次重新解析 vs 按 POI 缓存
+    start = time.perf_counter()
+    for entry in days:
+        data = entry['attraction']['data']
+        window_range(data['open_time'], data['close_time'])
+        for rest in entry['restaurants']:
+            parse_hours(rest['data']['business_hours'])
+    parse_time = time.perf_counter() - start
+
+    scheduler = DayScheduler()
+    start = time.perf_counter()
+    for entry in days:
+        scheduler.hours(entry['attraction'])
+        for rest in entry['restaurants']:
+            scheduler.hours(rest)
+    cached_time = time.perf_counter() - start
+    print(f"\n营业时间解析: 每次解析 {parse_time / n_days * 1e6:.1f} µs/天, 按 POI 缓存 {cached_time / n_days * 1e6:.1f} µs/天")
+
+    results = {}
+    for label, timeline in (('仅可行性', False), ('含时间线', True)):
+        start = time.perf_counter()
+        results[label] = [scheduler.schedule_day(entry, 'H', timeline=timeline) for entry in days]
+        elapsed = time.perf_counter() - start
+        print(f"单日排程（{label}）: {elapsed / n_days * 1e6:.1f} µs/天")
+
+    schedules = results['含时间线']
+    issues = collections.Counter(issue['type'] for result in schedules for issue in result['issues'])
+    reordered = sum(1 for result in schedules if result['meals'] != [0, 1, 2])
+    infeasible = sum(1 for result in schedules if not result['feasible'])
+    print(f"\n不可行天: {infeasible}/{n_days}，调整餐次分配: {reordered}/{n_days}")
+    for issue_type, count in issues.most_common():
+        print(f"  {issue_type}: {count}")
+
+
+if __name__ == "__main__":
+    main()
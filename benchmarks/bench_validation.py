@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+行程校验基准测试
+对比 FeedbackAgent.check_solution 与 CheckAgent.comprehensive_check 分别校验（各自构建每日表）
+与 agents.validation.PlanValidator 单次遍历（两个 Agent 的规则一起评估）的耗时，并校验两者结果一致。
+长行程一栏同时列出营业时间排程的耗时：排程按天模拟，两种方式都只做一次，天数越多在总耗时中占比越大
+
+需要设置 SILICONFLOW_API_KEY（构造 Agent 时读取配置，不会发起请求）
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import CheckAgent, FeedbackAgent
+
+
+def make_case(travel_days, seed=0, n_attractions=200, n_restaurants=400, n_hotels=20):
+    """构造合成数据：随机 POI、完整的酒店↔景点交通表和一个 travel_days 天的方案"""
+    rnd = random.Random(seed)
+
+    def poi(prefix, i, **extra):
+        data = {'id': f'{prefix}{i}', 'name': f'{prefix}{i}', 'cost': float(rnd.choice([0, 50, 120, 300])),
+                'rating': round(rnd.uniform(3.5, 5.0), 1), **extra}
+        return {'id': data['id'], 'name': data['name'], 'data': data}
+
+    attractions = [poi('A', i, duration=float(rnd.choice([60, 120, 240]))) for i in range(n_attractions)]
+    restaurants = [poi('R', i, duration=float(rnd.choice([30, 60, 90])), queue_time=float(rnd.choice([0, 10, 30])))
+                   for i in range(n_restaurants)]
+    hotels = [poi('H', i) for i in range(n_hotels)]
+
+    intra_city_trans = {}
+    for hotel in hotels:
+        for attraction in attractions:
+            for key in (f"{hotel['id']},{attraction['id']}", f"{attraction['id']},{hotel['id']}"):
+                intra_city_trans[key] = {
+                    'taxi_duration': str(rnd.randint(3, 60)), 'taxi_cost': str(rnd.randint(15, 80)),
+                    'bus_duration': str(rnd.randint(10, 120)), 'bus_cost': str(rnd.randint(2, 6))
+                }
+
+    solution = {
+        'attractions': {day: rnd.choice(attractions) for day in range(1, travel_days + 1)},
+        'restaurants': {day: rnd.sample(restaurants, 3) for day in range(1, travel_days + 1)},
+        'accommodations': [rnd.choice(hotels)],
+        'transport_mode': {day: rnd.choice(['taxi', 'bus']) for day in range(1, travel_days + 1)},
+        'train_departure': {'train_number': 'G1', 'data': {'cost': 550.0, 'duration': 420.0}},
+        'train_back': {'train_number': 'G2', 'data': {'cost': 550.0, 'duration': 420.0}}
+    }
+    return solution, intra_city_trans
+
+
+def separate_check(feedback, check, solution, travel_days, peoples, budget, intra_city_trans):
+    """FeedbackAgent.check_solution 与 CheckAgent.comprehensive_check 各自校验（每日表构建两次）"""
+    feedback_result = feedback.check_solution(solution, travel_days, peoples, budget, intra_city_trans)
+    check_result = check.comprehensive_check(solution, travel_days, peoples, budget, feedback_result, intra_city_trans)
+    return feedback_result['conflicts'], check_result['realistic_check']['issues']
+
+
+def single_pass_check(feedback, check, solution, travel_days, peoples, budget, intra_city_trans):
+    """单次遍历校验（FeedbackAgent 与 CheckAgent 共用一个 PlanValidator，与 PlanRepairer.validate 相同）"""
+    validator = check.get_validator(feedback.get_validator())
+    result = validator.validate(solution, travel_days, peoples, budget, intra_city_trans)
+    return result['conflicts'], result['issues']
+
+
+def schedule_only(feedback, check, solution, travel_days, peoples, budget, intra_city_trans):
+    """单次遍历中的营业时间排程部分（与分别校验共用同一份排程，不随遍历方式变化）"""
+    validator = check.get_validator(feedback.get_validator())
+    table = validator.build_table(solution, travel_days, peoples, intra_city_trans)
+    return validator.get_scheduler().schedule_table(table, timeline=False)['issues']
+
+
+def measure(funcs, cases, repeat=5):
+    """各函数在 cases 上的最快总耗时；每轮依次运行全部函数，减少机器负载波动对比值的影响"""
+    best = [float("inf")] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            for args in cases:
+                func(*args)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return best
+
+
+def main():
+    feedback = FeedbackAgent()
+    check = CheckAgent()
+
+    print("=" * 60)
+    print("行程校验基准测试")
+    print("=" * 60)
+
+    print("\n[长行程] 单个方案，天数递增（每个天数重复到约 3000 天·次，取 5 轮最快）")
+    print(f"{'天数':>6} {'分别校验(ms)':>14} {'单次遍历(ms)':>14} {'其中排程(ms)':>14} {'加速比':>8}")
+    for travel_days in (5, 30, 120, 365):
+        solution, intra_city_trans = make_case(travel_days, seed=travel_days)
+        args = (feedback, check, solution, travel_days, 3, 5000.0, intra_city_trans)
+        assert separate_check(*args) == single_pass_check(*args)
+        cases = [args] * max(20, 3000 // travel_days)
+        old_time, new_time, schedule_time = (
+            total / len(cases) for total in measure((separate_check, single_pass_check, schedule_only), cases)
+        )
+        print(f"{travel_days:>6} {old_time * 1000:>14.3f} {new_time * 1000:>14.3f} {schedule_time * 1000:>14.3f} "
+              f"{old_time / new_time:>7.2f}x")
+
+    print("\n[大批量] 多个 5 天方案（同一城市数据）")
+    print(f"{'方案数':>6} {'分别校验(ms)':>14} {'单次遍历(ms)':>14} {'方案/秒':>10} {'加速比':>8}")
+    template, intra_city_trans = make_case(5, seed=1)
+    for batch in (100, 1000, 5000):
+        rnd = random.Random(batch)
+        cases = []
+        for i in range(batch):
+            solution = dict(template)
+            solution['transport_mode'] = {day: rnd.choice(['taxi', 'bus']) for day in range(1, 6)}
+            cases.append((feedback, check, solution, 5, rnd.randint(1, 6), 5000.0, intra_city_trans))
+        for args in cases[:50]:
+            assert separate_check(*args) == single_pass_check(*args)
+        old_time, new_time = measure((separate_check, single_pass_check), cases, repeat=3)
+        print(f"{batch:>6} {old_time * 1000:>14.1f} {new_time * 1000:>14.1f} {batch / new_time:>10.0f} {old_time / new_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+离线 LLM 替身：本地 OpenAI 兼容的 chat/completions 服务，用于不依赖 SiliconFlow 的可复现压测和性能分析
+- 脚本模式（默认）：按任务（生成/检查/生成结果）给出满足各任务 JSON 提取的固定回复，
+  群聊选择发言者的请求按任务返回对应角色；可用 --script 加载自定义规则（按正则匹配最后一条消息）
+- 回放模式：--replay 读取录制的对话（JSONL），按请求消息的哈希返回录制的回复，未命中时退回脚本回复
+- 录制模式：--record 把请求转发到 --upstream（原样转发 Authorization）并追加写入 JSONL
+- 延迟：每个请求固定 --latency 秒，加 0~--jitter 秒的随机抖动（固定种子），再加 回复 token 数 / --tokens-per-second
+
+用法：
+    python benchmarks/mock_llm.py --port 8399 --latency 0.5
+    SILICONFLOW_API_BASE_URL=http://127.0.0.1:8399/v1 SILICONFLOW_API_KEY=mock python main.py
+
+录制后回放：
+    python benchmarks/mock_llm.py --record transcripts.jsonl --upstream https://api.siliconflow.cn/v1
+    python benchmarks/mock_llm.py --replay transcripts.jsonl
+不支持流式响应（stream=true）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_extract import extract_json_objects
+from utils.judgment_cache import canonical_json
+from utils.prompt_compact import count_tokens
+
+# 任务消息的开头 -> 任务名（与 tasks/ 中各任务的 task_message 对应）
+TASK_MARKERS = (
+    ("生成结果任务:", "gen_result"),
+    ("生成任务:", "generate"),
+    ("检查任务:", "check")
+)
+# 群聊选择发言者时各任务优先的角色
+SPEAKER_PREFERENCE = {
+    "generate": ("planner", "researcher", "coordinator"),
+    "check": ("check", "feedback", "coordinator"),
+    "gen_result": ("writer", "researcher", "coordinator")
+}
+SPEAKER_PATTERN = re.compile(r"select the next role from \[(.*?)\]", re.S)
+
+
+def _content(message):
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def detect_task(messages):
+    """按对话中的任务消息识别任务，无法识别时返回 None"""
+    for message in messages:
+        text = _content(message)
+        for marker, task in TASK_MARKERS:
+            if marker in text:
+                return task
+    return None
+
+
+def transcript_key(body):
+    """请求的回放键：消息（角色、名称、内容、工具调用）和可用工具名的规范化 JSON 的 sha256"""
+    messages = [{
+        "role": message.get("role"),
+        "name": message.get("name"),
+        "content": _content(message),
+        "tool_calls": [call.get("function") for call in message.get("tool_calls") or []]
+    } for message in body.get("messages", [])]
+    tools = sorted(tool.get("function", {}).get("name", "") for tool in body.get("tools") or [])
+    payload = canonical_json({"messages": messages, "tools": tools})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScriptedResponder:
+    """
+    脚本回复：先按自定义规则匹配，再按任务给出固定回复
+
+    规则文件为 JSON 列表，每条 {"match": 正则, "content": 回复文本, "tool_calls": [...]（可选）}，
+    正则在最后一条消息内容上搜索，先匹配先生效
+    """
+
+    def __init__(self, rules=None, default_content="TERMINATE"):
+        self.rules = [(re.compile(rule["match"], re.S), rule) for rule in (rules or [])]
+        self.default_content = default_content
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def respond(self, body):
+        """返回 {"content": ..., "tool_calls": [...]（可选）}"""
+        messages = body.get("messages", [])
+        last = _content(messages[-1]) if messages else ""
+        for pattern, rule in self.rules:
+            if pattern.search(last):
+                return {key: rule[key] for key in ("content", "tool_calls") if key in rule}
+
+        task = detect_task(messages)
+        speaker = SPEAKER_PATTERN.search(last)
+        if speaker:
+            roles = re.findall(r"[\w\-]+", speaker.group(1))
+            for role in SPEAKER_PREFERENCE.get(task, ()):
+                if role in roles:
+                    return {"content": role}
+            return {"content": roles[0] if roles else "coordinator"}
+
+        if task == "generate":
+            question = self._question(messages, "生成任务:")
+            return {"content": json.dumps({"answer": {"question_id": "", "question": question, "plan": []}},
+                                          ensure_ascii=False)}
+        if task == "check":
+            return {"content": json.dumps({"is_valid": True, "errors": [], "warnings": []})}
+        if task == "gen_result":
+            # 按任务消息中的结构模板原样回复
+            for message in messages:
+                candidates = extract_json_objects(_content(message),
+                                                  predicate=lambda obj: "daily_plans" in obj)
+                if candidates:
+                    return {"content": json.dumps(candidates[-1].value, ensure_ascii=False)}
+        return {"content": self.default_content}
+
+    @staticmethod
+    def _question(messages, marker):
+        for message in messages:
+            text = _content(message)
+            if marker in text:
+                return text.split(marker, 1)[1].strip().splitlines()[0].strip()
+        return ""
+
+
+class TranscriptResponder:
+    """按请求哈希回放录制的回复，未命中时交给 fallback（为 None 时返回 None）"""
+
+    def __init__(self, path, fallback=None):
+        self.responses = {}
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record["key"]] = record["response"]
+
+    def respond(self, body):
+        response = self.responses.get(transcript_key(body))
+        if response is not None:
+            self.hits += 1
+            return response
+        self.misses += 1
+        return self.fallback.respond(body) if self.fallback else None
+
+
+class RecordingResponder:
+    """把请求转发到上游 OpenAI 兼容接口，并把 (键, 回复消息) 追加写入 JSONL"""
+
+    def __init__(self, path, upstream, timeout=120):
+        self.path = path
+        self.upstream = upstream.rstrip("/")
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def respond(self, body, headers=None):
+        response = requests.post(f"{self.upstream}/chat/completions", json=body, timeout=self.timeout,
+                                 headers={"Authorization": (headers or {}).get("Authorization", "")})
+        response.raise_for_status()
+        message = response.json()["choices"][0]["message"]
+        recorded = {key: message[key] for key in ("content", "tool_calls") if message.get(key)}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": transcript_key(body), "response": recorded}, ensure_ascii=False) + "\n")
+        return recorded
+
+
+class MockLLMServer:
+    """
+    OpenAI 兼容的本地服务（POST */chat/completions，GET */models），在后台线程中运行
+
+    Args:
+        responder: 提供 respond(body) 的对象
+        latency / jitter: 每个请求的固定延迟和随机抖动上限（秒）
+        tokens_per_second: 模拟生成速度，0 为不按回复长度增加延迟
+        seed: 抖动的随机种子
+    """
+
+    def __init__(self, responder, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 tokens_per_second=0.0, seed=0):
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.by_task = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "by_task": dict(self.by_task),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens
+            }
+
+    def complete(self, body, headers=None):
+        """生成一个 chat.completion 响应（含模拟延迟）"""
+        if isinstance(self.responder, RecordingResponder):
+            reply = self.responder.respond(body, headers)
+        else:
+            reply = self.responder.respond(body)
+        if reply is None:
+            raise LookupError("回放记录中没有该请求")
+        content = reply.get("content") or ""
+        prompt_tokens = sum(count_tokens(_content(message)) for message in body.get("messages", []))
+        completion_tokens = count_tokens(content)
+        with self._lock:
+            self.requests += 1
+            task = detect_task(body.get("messages", [])) or "other"
+            self.by_task[task] = self.by_task.get(task, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+        if self.tokens_per_second > 0:
+            delay += completion_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+
+        message = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        if reply.get("tool_calls"):
+            message["tool_calls"] = reply["tool_calls"]
+            finish_reason = "tool_calls"
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if body.get("stream"):
+                    self._send(400, {"error": {"message": "mock server does not support stream=true"}})
+                    return
+                try:
+                    self._send(200, server.complete(body, dict(self.headers)))
+                except LookupError as e:
+                    self._send(404, {"error": {"message": str(e)}})
+                except requests.exceptions.RequestException as e:
+                    self._send(502, {"error": {"message": f"upstream error: {e}"}})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容的 LLM 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8399)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机抖动上限（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="模拟生成速度（0 为不模拟）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", default=None, help="自定义规则 JSON 文件")
+    parser.add_argument("--replay", default=None, help="回放的对话记录 JSONL")
+    parser.add_argument("--record", default=None, help="录制到的 JSONL（需同时指定 --upstream）")
+    parser.add_argument("--upstream", default=None, help="录制模式转发的上游接口，如 https://api.siliconflow.cn/v1")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scripted = ScriptedResponder.from_file(args.script) if args.script else ScriptedResponder()
+    if args.record:
+        if not args.upstream:
+            print("录制模式需要 --upstream")
+            return 2
+        responder = RecordingResponder(args.record, args.upstream)
+    elif args.replay:
+        responder = TranscriptResponder(args.replay, fallback=scripted)
+    else:
+        responder = scripted
+
+    server = MockLLMServer(responder, args.host, args.port, args.latency, args.jitter,
+                           args.tokens_per_second, args.seed)
+    print(f"LLM 替身服务已启动: {server.base_url}")
+    print(f"  export SILICONFLOW_API_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"\n请求统计: {server.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
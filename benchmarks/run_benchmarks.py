@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+基准测试套件（不调用 LLM、不访问网络），结果写入 JSON，可与保存的基线对比
+- api: 数据 API 各接口按城市的延迟和吞吐（Flask test client，进程内调用，不经过网络）
+- planner: PlannerAgent.build_model / solve_model 耗时随城市规模和行程天数的变化（未安装 SCIP 时跳过求解）
+- validation: FeedbackAgent.check_solution 与 CheckAgent.comprehensive_check 的吞吐
+- writer: WriterAgent.generate_travel_plan_json 的吞吐
+
+planner / validation / writer 使用 api/data 中真实城市的 POI，市内交通按坐标距离合成、火车为固定的合成车次，
+方案按固定随机种子生成，多次运行的输入完全相同
+
+用法：
+    python benchmarks/run_benchmarks.py                              # 全部套件，写入 benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --suites api,writer --repeat 50
+    python benchmarks/run_benchmarks.py --save-baseline               # 同时保存为基线
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.2
+对比基线时按 p50 耗时判断，超过基线 (1 + threshold) 倍记为回归，存在回归时退出码为 1
+
+需要设置 SILICONFLOW_API_KEY（构造 Agent 时读取配置，不会发起请求）；
+读取城市数据需要数据 API 的依赖（pip install -r api/requirements.txt），未安装时对应套件记为跳过。
+benchmarks/results/ 不纳入版本管理
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agents.records import AttractionRecord, HotelRecord, RecordTable, RestaurantRecord, TrainRecord
+from utils.geo import haversine
+from utils.tracing import percentile
+
+SUITES = ('api', 'planner', 'validation', 'writer')
+DEFAULT_CITIES = ('上海市', '杭州市', '苏州市')
+DEFAULT_DAYS = (2, 3, 5)
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'results', 'latest.json')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+COMPARE_METRIC = 'p50_ms'
+
+CSV_FILES = {
+    'attractions': 'poi_attraction.csv',
+    'accommodations': 'poi_accommodation.csv',
+    'restaurants': 'poi_restaurant.csv'
+}
+RECORD_TYPES = {
+    'attractions': AttractionRecord,
+    'accommodations': HotelRecord,
+    'restaurants': RestaurantRecord
+}
+PEOPLES = 2
+BUDGET = 20000.0
+START_DATE = '2025年6月10日'
+
+_frames = {}
+
+
+def summarize(samples, **extra):
+    """耗时样本（秒）的统计，时间单位为毫秒，throughput 为每秒次数"""
+    total = sum(samples)
+    return {
+        'n': len(samples),
+        'mean_ms': total / len(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'min_ms': min(samples) * 1000,
+        'max_ms': max(samples) * 1000,
+        'throughput': len(samples) / total if total > 0 else 0.0,
+        **extra
+    }
+
+
+def measure(func, args_list, warmup=1):
+    """依次以 args_list 中的参数调用 func 并逐次计时（先预热 warmup 次）"""
+    for args in args_list[:warmup]:
+        func(*args)
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def load_city(city_name):
+    """
+    按 API 返回格式加载城市 POI，并按坐标距离合成酒店↔景点的市内交通
+
+    Returns:
+        (poi_data, intra_city_trans, trains_departure, trains_back)
+    """
+    # 数据 API 的依赖（pandas、Flask，见 api/requirements.txt）只在用到真实城市数据的套件中导入
+    import pandas as pd
+    from api.run_api import CSV_DIR, POI_KINDS
+
+    if not _frames:
+        for kind, filename in CSV_FILES.items():
+            _frames[kind] = pd.read_csv(CSV_DIR / filename)
+    poi_data = {}
+    for kind, frame in _frames.items():
+        formatter, _ = POI_KINDS[kind]
+        poi_data[kind] = [formatter(row) for _, row in frame[frame['city_name'] == city_name].iterrows()]
+
+    intra_city_trans = {}
+    for hotel in poi_data['accommodations']:
+        for attraction in poi_data['attractions']:
+            if None in (hotel['latitude'], hotel['longitude'], attraction['latitude'], attraction['longitude']):
+                distance = 10.0
+            else:
+                distance = haversine(hotel['latitude'], hotel['longitude'],
+                                     attraction['latitude'], attraction['longitude'])
+            params = {
+                'taxi_duration': str(int(distance * 2) + 5), 'taxi_cost': str(round(13 + 2.5 * distance, 1)),
+                'bus_duration': str(int(distance * 4) + 10), 'bus_cost': '2'
+            }
+            intra_city_trans[f"{hotel['id']},{attraction['id']}"] = params
+            intra_city_trans[f"{attraction['id']},{hotel['id']}"] = params
+
+    def trains(prefix, origin, destination):
+        return [{
+            'origin_id': origin, 'destination_id': destination, 'train_number': f'{prefix}{i}',
+            'duration': str(240 + 30 * i), 'cost': str(350.0 + 40 * i),
+            'origin_station': origin, 'destination_station': destination
+        } for i in range(6)]
+
+    return poi_data, intra_city_trans, trains('G', 'S0', 'S1'), trains('D', 'S1', 'S0')
+
+
+def make_solution(city_data, travel_days, seed):
+    """以规划器提取解的结构（共享的 POI 记录）随机组成一个方案"""
+    poi_data, _, trains_departure, trains_back = city_data
+    rnd = random.Random(seed)
+    tables = {kind: RecordTable.from_api(RECORD_TYPES[kind], poi_data[kind]) for kind in RECORD_TYPES}
+    attractions = rnd.sample(list(tables['attractions']), travel_days)
+    restaurants = rnd.sample(list(tables['restaurants']), travel_days * 3)
+    return {
+        'attractions': {day: attractions[day - 1] for day in range(1, travel_days + 1)},
+        'restaurants': {day: restaurants[(day - 1) * 3:day * 3] for day in range(1, travel_days + 1)},
+        'accommodations': [rnd.choice(list(tables['accommodations']))],
+        'transport_mode': {day: rnd.choice(['taxi', 'bus']) for day in range(1, travel_days + 1)},
+        'train_departure': TrainRecord.from_api(rnd.choice(trains_departure)),
+        'train_back': TrainRecord.from_api(rnd.choice(trains_back))
+    }
+
+
+def suite_api(cities, days_list, repeat):
+    from api import run_api
+
+    start = time.perf_counter()
+    if not run_api.load_data():
+        return {'api/load_data': {'skipped': 'load_data() 失败（api/data 数据不完整）'}}
+    results = {'api/load_data': summarize([time.perf_counter() - start])}
+    client = run_api.app.test_client()
+
+    for i, city in enumerate(cities):
+        attractions = run_api.poi_records['attractions'].get(city)
+        if not attractions:
+            results[f'api/{city}'] = {'skipped': '数据中没有该城市'}
+            continue
+        other_city = cities[(i + 1) % len(cities)]
+        endpoints = {
+            'attractions': f'/attractions/{city}',
+            'accommodations': f'/accommodations/{city}',
+            'restaurants': f'/restaurants/{city}',
+            'attractions_top10': f'/attractions/{city}?sort=-rating&limit=10',
+            'nearby_restaurants': f'/nearby?poi_id={next(iter(attractions))}&kind=restaurants&k=10',
+            'intra_city_transport': f'/intra-city-transport/{city}',
+            'poi_data': f'/poi-data/{city}',
+            'cross_city_transport': f'/cross-city-transport/?origin_city={city}&destination_city={other_city}'
+        }
+        for name, url in endpoints.items():
+            statuses = []
+
+            def call():
+                response = client.get(url)
+                statuses.append(response.status_code)
+                response.get_data()
+
+            samples = measure(call, [()] * repeat)
+            results[f'api/{city}/{name}'] = summarize(samples, status=max(set(statuses), key=statuses.count))
+    return results
+
+
+def suite_planner(cities, days_list, repeat):
+    import pyomo.environ as pyo
+    from agents import PlannerAgent
+
+    planner = PlannerAgent()
+    scip_available = pyo.SolverFactory('scip').available(exception_flag=False)
+    results = {}
+    if not scip_available:
+        results['planner/solve_model'] = {'skipped': '未安装 SCIP 求解器'}
+
+    for city in cities:
+        poi_data, intra_city_trans, trains_departure, trains_back = load_city(city)
+        sizes = {kind: len(records) for kind, records in poi_data.items()}
+        for travel_days in days_list:
+            models = []
+
+            def build():
+                models.append(planner.build_model(trains_departure, trains_back, poi_data, intra_city_trans,
+                                                  travel_days, PEOPLES, BUDGET))
+
+            samples = measure(build, [()] * max(1, min(repeat, 3)))
+            model = models[-1]
+            results[f'planner/build_model/{city}/{travel_days}d'] = summarize(
+                samples, pois=sizes, variables=model.nvariables(), constraints=model.nconstraints())
+            if scip_available:
+                start = time.perf_counter()
+                _, success = planner.solve_model(model)
+                results[f'planner/solve_model/{city}/{travel_days}d'] = summarize(
+                    [time.perf_counter() - start], success=success)
+    return results
+
+
+def _solution_cases(city, days_list, count):
+    city_data = load_city(city)
+    return city_data, [(make_solution(city_data, travel_days, seed), travel_days)
+                       for travel_days in days_list for seed in range(count)]
+
+
+def suite_validation(cities, days_list, repeat):
+    from agents import CheckAgent, FeedbackAgent
+
+    feedback = FeedbackAgent()
+    check = CheckAgent()
+    results = {}
+    for city in cities:
+        city_data, cases = _solution_cases(city, days_list, repeat)
+        intra_city_trans = city_data[1]
+        results[f'validation/check_solution/{city}'] = summarize(measure(
+            lambda solution, days: feedback.check_solution(solution, days, PEOPLES, BUDGET, intra_city_trans),
+            cases))
+        results[f'validation/comprehensive_check/{city}'] = summarize(measure(
+            lambda solution, days: check.comprehensive_check(solution, days, PEOPLES, BUDGET,
+                                                             intra_city_trans=intra_city_trans),
+            cases))
+    return results
+
+
+def suite_writer(cities, days_list, repeat):
+    from agents import WriterAgent
+
+    writer = WriterAgent()
+    results = {}
+    for city in cities:
+        city_data, cases = _solution_cases(city, days_list, repeat)
+        intra_city_trans = city_data[1]
+        results[f'writer/generate_travel_plan_json/{city}'] = summarize(measure(
+            lambda solution, days: writer.generate_travel_plan_json(
+                solution, days, PEOPLES, START_DATE, question_id='bench', question='bench',
+                intra_city_trans=intra_city_trans, budget=BUDGET),
+            cases))
+    return results
+
+
+SUITE_FUNCS = {
+    'api': suite_api,
+    'planner': suite_planner,
+    'validation': suite_validation,
+    'writer': suite_writer
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def compare(current, baseline, threshold, metric=COMPARE_METRIC):
+    """
+    按 metric 对比当前结果与基线
+
+    Returns:
+        {名称: {baseline, current, ratio, status}}，status 为 regression / improved / ok
+    """
+    comparison = {}
+    for name, result in current.items():
+        base = baseline.get(name, {})
+        if metric not in result or not base.get(metric):
+            continue
+        ratio = result[metric] / base[metric]
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improved'
+        else:
+            status = 'ok'
+        comparison[name] = {'baseline': base[metric], 'current': result[metric], 'ratio': ratio, 'status': status}
+    return comparison
+
+
+def print_results(results):
+    width = max(len(name) for name in results)
+    print(f"\n{'name':<{width}} {'n':>5} {'p50(ms)':>10} {'p95(ms)':>10} {'ops/s':>10}")
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<{width}} skipped: {result['skipped']}")
+            continue
+        print(f"{name:<{width}} {result['n']:>5} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['throughput']:>10.1f}")
+
+
+def print_comparison(comparison):
+    if not comparison:
+        print("\n基线中没有可对比的项")
+        return
+    width = max(len(name) for name in comparison)
+    print(f"\n{'name':<{width}} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for name, row in comparison.items():
+        print(f"{name:<{width}} {row['baseline']:>10.3f} {row['current']:>10.3f} {row['ratio']:>7.2f}  {row['status']}")
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="数据 API、规划器、校验和写作的基准测试（不调用 LLM、不访问网络）")
+    parser.add_argument('--suites', default=','.join(SUITES), help=f"逗号分隔的套件（{', '.join(SUITES)}）")
+    parser.add_argument('--cities', default=','.join(DEFAULT_CITIES), help="逗号分隔的城市")
+    parser.add_argument('--days', default=','.join(map(str, DEFAULT_DAYS)), help="逗号分隔的行程天数")
+    parser.add_argument('--repeat', type=int, default=20,
+                        help="每项的重复次数（validation/writer 为每种天数的方案数，build_model 最多 3 次）")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="结果 JSON 路径")
+    parser.add_argument('--baseline', default=None, help="对比的基线 JSON 路径")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, default=None,
+                        help=f"把本次结果保存为基线（默认 {os.path.relpath(DEFAULT_BASELINE, ROOT)}）")
+    parser.add_argument('--threshold', type=float, default=0.25, help="p50 超过基线 (1 + threshold) 倍记为回归")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    suites = [s.strip() for s in args.suites.split(',') if s.strip()]
+    unknown = [s for s in suites if s not in SUITE_FUNCS]
+    if unknown:
+        print(f"未知套件: {', '.join(unknown)}")
+        return 2
+    cities = [c.strip() for c in args.cities.split(',') if c.strip()]
+    days_list = [int(d) for d in args.days.split(',') if d.strip()]
+
+    results = {}
+    for suite in suites:
+        print(f"运行 {suite} ...")
+        start = time.perf_counter()
+        try:
+            results.update(SUITE_FUNCS[suite](cities, days_list, args.repeat))
+        except ImportError as e:
+            results[suite] = {'skipped': f'缺少依赖 {e.name}（pip install -r api/requirements.txt）'}
+        print(f"  {suite} 完成，用时 {time.perf_counter() - start:.1f} s")
+    print_results(results)
+
+    payload = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'suites': suites,
+            'cities': cities,
+            'days': days_list,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline.get('results', {}), args.threshold)
+        payload['comparison'] = {'baseline': args.baseline, 'metric': COMPARE_METRIC,
+                                 'threshold': args.threshold, 'items': comparison}
+        print_comparison(comparison)
+        regressions = [name for name, row in comparison.items() if row['status'] == 'regression']
+        if regressions:
+            print(f"\n{len(regressions)} 项回归（p50 超过基线 {1 + args.threshold:.2f} 倍）")
+            exit_code = 1
+
+    write_json(args.output, payload)
+    print(f"\n结果已保存到: {args.output}")
+    if args.save_baseline:
+        write_json(args.save_baseline, payload)
+        print(f"基线已保存到: {args.save_baseline}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,6 @@ load_dotenv()
 
 
 SILICONFLOW_API_KEY = os.getenv("SILICONFLOW_API_KEY")
-if not SILICONFLOW_API_KEY:
-    raise ValueError("SILICONFLOW_API_KEY environment variable is required")
 SILICONFLOW_MODEL = os.getenv("SILICONFLOW_MODEL", "inclusionAI/Ling-flash-2.0")
 SILICONFLOW_TEMPERATURE = float(os.getenv("SILICONFLOW_TEMPERATURE", "0.7"))
 SILICONFLOW_API_BASE_URL = os.getenv("SILICONFLOW_API_BASE_URL", "https://api.siliconflow.cn/v1")
@@ -16,6 +14,39 @@ SILICONFLOW_API_BASE_URL = os.getenv("SILICONFLOW_API_BASE_URL", "https://api.si
 TRAVEL_API_BASE_URL = os.getenv("TRAVEL_API_BASE_URL", "http://localhost:12457")
 TRAVEL_API_TIMEOUT = int(os.getenv("TRAVEL_API_TIMEOUT", "10"))
 
+# 单条任务消息的 token 上限（含固定模板、嵌入的行程和检查反馈，超出时先裁剪反馈条目和行程天数）
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+# 带工具的群聊（生成、生成结果）的最大轮数：首条任务消息算第 1 轮，每次工具调用需要“调用 → 执行 → 回答”三轮；
+# 出现包含所需 JSON 的回复时提前结束
+TOOL_CHAT_MAX_ROUND = int(os.getenv("TOOL_CHAT_MAX_ROUND", "12"))
+
+# 每个问题的阶段耗时追踪文件目录（Chrome trace + JSONL），为空时不写文件
+TRACE_DIR = os.getenv("TRACE_DIR", "results/traces")
+
+# 问题数据集路径；解析结果的二进制缓存目录（未配置时不缓存，如 cache/datasets）
+QUESTION_PATH = os.getenv("QUESTION_PATH", "prompts/question.json")
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "")
+
+# 结果输出目录和格式：json（每题一个文件）、ndjson（追加写入单个文件）、ndjson.gz（gzip 压缩）
+RESULT_DIR = os.getenv("RESULT_DIR", "results")
+RESULT_SINK = os.getenv("RESULT_SINK", "json")
+
+# 异步流程（async_pipeline.py）同时处理的问题数
+PIPELINE_MAX_IN_FLIGHT = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "8"))
+
+# 求解进程池（agents/solver_pool.py）：异步流程使用的进程数（0 为不使用进程池）、等待队列上限（0 为进程数的 2 倍）、单个任务时限（秒）
+SOLVER_PROCESSES = int(os.getenv("SOLVER_PROCESSES", "0"))
+SOLVER_MAX_PENDING = int(os.getenv("SOLVER_MAX_PENDING", "0"))
+SOLVER_TIMEOUT = float(os.getenv("SOLVER_TIMEOUT", "360"))
+
+# 数据 API 响应缓存（utils/response_cache.py）：有效期（秒，0 为不缓存）、内存层条目数和容量（MB）上限、
+# 磁盘层 sqlite 文件路径（为空时只使用内存层）
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", "3600"))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "512"))
+RESEARCH_CACHE_MAX_MB = float(os.getenv("RESEARCH_CACHE_MAX_MB", "256"))
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", "")
+
 
 LLM_CONFIG = {
     "config_list": [
@@ -29,8 +60,18 @@ LLM_CONFIG = {
     "timeout": 120,
 }
 
-from autogen import AssistantAgent
+
+def require_api_key():
+    """构建 LLM Agent 前检查 API key（导入配置时不检查，便于只使用评估器、API 等不需要 LLM 的部分）"""
+    if not SILICONFLOW_API_KEY:
+        raise ValueError("SILICONFLOW_API_KEY environment variable is required")
+    return SILICONFLOW_API_KEY
+
+
 def get_agent():
+    from autogen import AssistantAgent
+
+    require_api_key()
     return AssistantAgent(
         name="siliconflow",
         llm_config=LLM_CONFIG
@@ -66,7 +107,8 @@ AGENT_CONFIG = {
         
         You have access to various API endpoints to query the travel planning database.
         Always provide factual, structured information based on the API responses.
-        When querying data, use the appropriate API methods available in the ResearcherAgent class.""",
+        When querying data, call the provided tools (get_attractions, get_accommodations, get_restaurants,
+        get_cross_city_transport, get_nearby) instead of describing the calls. Tool outputs are compact "id|name|..." rows.""",
         "llm_config": LLM_CONFIG,
         "human_input_mode": "NEVER",
     },
@@ -113,7 +155,8 @@ AGENT_CONFIG = {
         4. Use SCIP solver for optimization
         5. Maximize ratings while satisfying all constraints
         
-        You have access to ResearcherAgent to fetch travel data and use optimization models to generate travel plans.""",
+        You have access to ResearcherAgent to fetch travel data and use optimization models to generate travel plans.
+        Call the plan_trip tool to run the optimization; do not describe the call or invent a plan yourself.""",
         "llm_config": LLM_CONFIG,
         "human_input_mode": "NEVER",
     },
@@ -162,4 +205,15 @@ AGENT_CONFIG = {
         "llm_config": LLM_CONFIG,
         "human_input_mode": "NEVER",
     }
-}
\ No newline at end of file
+}
+
+
+def agent_config(name, llm_config=None):
+    """
+    获取 AGENT_CONFIG 中 name 的配置；指定 llm_config 时替换其中的 LLM 配置
+    （如异步流程中各 Agent 使用共享的 HTTP 客户端）
+    """
+    config = AGENT_CONFIG[name]
+    if llm_config is None:
+        return config
+    return {**config, "llm_config": llm_config}
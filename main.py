@@ -1,8 +1,20 @@
-import json
 import os
 import sys
 import time
-from tasks import GenerateTask,GenResultTask,CheckTask
+from config import DATASET_CACHE_DIR, QUESTION_PATH, RESULT_DIR, RESULT_SINK, TRACE_DIR
+from utils import (
+    BackgroundWriter,
+    compact_for_prompt,
+    compact_json,
+    count_tokens,
+    create_sink,
+    fit_items,
+    get_prompt_stats,
+    get_stage_stats,
+    load_dataset,
+    span,
+    start_trace
+)
 
 
 
@@ -16,27 +28,32 @@ def check_api_key():
         return False
     return True
 
-def get_all_queries():
+def get_question_store():
     """
-    获取所有问题（1-120）
-    
-    Returns:
-        list: [(question_id, question_text, item_dict), ...]
+    加载问题数据集（进程内只解析一次，按 question_id 建立索引，批量处理时共用）
+    如果文件不存在或格式错误，将给出友好的提示。
     """
-    json_path = "prompts/question.json"
-    if not os.path.exists(json_path):
+    json_path = QUESTION_PATH
+    try:
+        return load_dataset(json_path, "question_id", cache_dir=DATASET_CACHE_DIR or None)
+    except FileNotFoundError:
         print(f"\n Error: 找不到 {json_path} 文件，请确保该文件存在于程序目录中。")
         sys.exit(1)
-    try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"\n Error: 无法解析 {json_path} 文件，请检查其 JSON 格式是否正确。")
         print(f" 详细错误信息: {e}")
         sys.exit(1)
+
+
+def get_all_queries():
+    """
+    获取所有问题（1-120）
     
+    Returns:
+        list: [(question_id, question_text, item_dict), ...]
+    """
     queries = []
-    for item in data:
+    for item in get_question_store():
         question_id = int(item.get("question_id"))
         if 1 <= question_id <= 120:
             queries.append((question_id, item.get("question"), item))
@@ -55,17 +72,7 @@ def get_query(choice):
     Returns:
         tuple: (question_id, question_text, item_dict) 或 None（如果choice为空）
     """
-    json_path = "prompts/question.json"
-    if not os.path.exists(json_path):
-        print(f"\n Error: 找不到 {json_path} 文件，请确保该文件存在于程序目录中。")
-        sys.exit(1)
-    try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"\n Error: 无法解析 {json_path} 文件，请检查其 JSON 格式是否正确。")
-        print(f" 详细错误信息: {e}")
-        sys.exit(1)
+    store = get_question_store()
 
     # 如果choice为空，返回None（表示处理所有问题）
     if not choice or choice.strip() == "":
@@ -78,22 +85,134 @@ def get_query(choice):
         print("\n Error: 输入的编号无效，请输入数字或直接回车（处理所有问题）。")
         sys.exit(1)
 
-    # 查找匹配问题
-    for item in data:
-        if int(item.get("question_id")) == question_id:
-            return question_id, item.get("question"), item
+    # 按 id 索引查找
+    item = store.get(question_id)
+    if item is not None:
+        return question_id, item.get("question"), item
 
-    print(f"\n Error: 在 {json_path} 中未找到编号为 {question_id} 的问题。")
+    print(f"\n Error: 在 {store.source} 中未找到编号为 {question_id} 的问题。")
     sys.exit(1)
 
-def get_result_task(question):
+def _as_list(value):
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def format_feedback(check_result, max_tokens=None):
+    """
+    将检查结果中的错误和警告格式化为附加在任务消息后的提示
+
+    指定 max_tokens 时按整条丢弃末尾的警告、再丢弃末尾的错误，并注明省略的条数；
+    连提示本身都放不下时返回空字符串
+    """
+    errors = _as_list(check_result.get('errors'))
+    warnings = _as_list(check_result.get('warnings'))
+
+    def render(kept_errors, kept_warnings, omitted):
+        text = (
+            "\n\nNote that be wary of the following errors and warnings: "
+            f"\nErrors: {compact_json(kept_errors)}"
+            f"\nWarnings: {compact_json(kept_warnings)}"
+        )
+        return text + f"\n({omitted} more omitted)" if omitted else text
+
+    if max_tokens is None:
+        return render(errors, warnings, 0)
+    text = fit_items(warnings, max_tokens, lambda kept, omitted: render(errors, kept, omitted))
+    if text is None:
+        text = fit_items(errors, max_tokens, lambda kept, omitted: render(kept, [], omitted + len(warnings)))
+    return text or ""
+
+
+def build_result_prompt(result_task, plan, check_result):
+    """
+    生成结果任务的输入：行程紧凑 JSON + 检查反馈，整条任务消息不超过 PROMPT_TOKEN_BUDGET
+    扣除固定模板后，检查反馈最多占剩余预算的一半，其余留给行程
+    """
+    available = result_task.available_tokens()
+    feedback = format_feedback(check_result, available // 2)
+    plan_tokens = available - count_tokens(feedback)
+    prompt = compact_for_prompt(plan, plan_tokens) + feedback
+    # 分段计数与整条消息的计数可能因拼接处的分词略有出入，超出时按超出量再收紧一次
+    overflow = count_tokens(result_task.task_message(prompt)) - result_task.token_budget
+    if overflow > 0:
+        prompt = compact_for_prompt(plan, plan_tokens - overflow) + feedback
+    return prompt
+
+
+def print_prompt_stats():
+    """打印各类任务消息的 token 统计"""
+    summary = get_prompt_stats().summary()
+    if not summary:
+        return
+    print("\n任务消息 token 统计:")
+    for label, stat in summary.items():
+        print(f"  {label}: {stat['count']} 条, 平均 {stat['avg']:.0f}, 最大 {stat['max']}, 合计 {stat['total']}")
+
+
+def print_stage_stats():
+    """打印各阶段耗时统计（秒，自身合计扣除了子阶段）"""
+    table = get_stage_stats().format_table()
+    if not table:
+        return
+    print("\n阶段耗时统计（秒）:")
+    print(table)
+
+
+def run_traced(question, question_id, tasks=None):
+    """
+    在一次追踪中获取行程计划结果，汇总阶段耗时并写出追踪文件（TRACE_DIR 为空时不写）
+    """
+    with start_trace(question_id) as tracer:
+        with span("question", question_id=question_id):
+            result = get_result_task(question, tasks=tasks)
+    get_stage_stats().add(tracer)
+    if TRACE_DIR:
+        try:
+            paths = tracer.write(TRACE_DIR, f"id_{question_id}")
+            print(f" 追踪文件: {paths[0]}")
+        except OSError as e:
+            print(f" 写入追踪文件失败: {e}")
+    return result
+
+
+_tasks = None
+
+
+def get_tasks():
+    """
+    获取进程内复用的任务实例（GenerateTask, CheckTask, GenResultTask, RepairTask）
+    任务及其 Agent 只构建一次，每次执行前会重置对话状态；
+    autogen、pyomo 等依赖在首次构建时才导入，启动到输入提示不需要加载
+    """
+    global _tasks
+    if _tasks is None:
+        _tasks = build_tasks()
+    return _tasks
+
+
+def build_tasks(pool=None):
+    """
+    构建一组任务实例（GenerateTask, CheckTask, GenResultTask, RepairTask）
+    pool 为空时使用进程级默认 Agent 池；同时处理多个问题时每组任务需使用独立的 Agent 池
+    """
+    from tasks import GenerateTask, GenResultTask, CheckTask, RepairTask
+    return GenerateTask(pool), CheckTask(pool), GenResultTask(pool), RepairTask(pool)
+
+
+def get_result_task(question, repair=True, tasks=None):
     """
     获取可行的行程计划结果
     
+    Args:
+        question: 问题文本
+        repair: 检查未通过时是否优先对上一次的方案做定向修复（失败时再整体重新生成）
+        tasks: 使用的任务实例（build_tasks 的返回值），为空时使用进程内复用的任务实例
+    
     Returns:
         result: 行程计划结果字典，或 None（如果失败）
     """
-    global temp_plan
     print("\n" + "="*60)
     print("TASK 1: Obtain feasible results")
     print("="*60)
@@ -103,19 +222,32 @@ def get_result_task(question):
 
     times = 0
     try:
+        generate_task, check_task, result_task, repair_task = tasks or get_tasks()
+        temp_plan = None
         for times in range(3):
-            generate_task = GenerateTask()
-            temp_plan = generate_task.execute(prompt)
-            check_task = CheckTask()
-            check_result = check_task.execute(temp_plan)
+            if temp_plan is None:
+                with span("task.generate", attempt=times):
+                    temp_plan = generate_task.execute(prompt)
+            # 营业时间排程不可行时直接进入修复，跳过 LLM 检查
+            with span("task.check", attempt=times):
+                check_result = repair_task.check_schedule() or check_task.execute(temp_plan)
             if check_result.get("is_valid", True):
-                result_task = GenResultTask()
-                final_prompt = str(temp_plan) + f"\n\nNote that be wary of the following errors and warnings: \nErrors: {check_result.get('errors', [])}\nWarnings: {check_result.get('warnings', [])}"
-                result = result_task.execute(final_prompt)
+                # 行程以紧凑 JSON 传递（名称和详情见 refs 对照表），整条任务消息限制在 token 预算内
+                final_prompt = build_result_prompt(result_task, temp_plan, check_result)
+                with span("task.gen_result"):
+                    result = result_task.execute(final_prompt)
                 return result
             else:
                 times += 1
-                prompt = question + f"\n\nNote that be wary of the following errors and warnings: \nErrors: {check_result.get('errors', [])}\nWarnings: {check_result.get('warnings', [])}"
+                prompt = question + format_feedback(
+                    check_result, generate_task.available_tokens() - count_tokens(question)
+                )
+                # 修复模式：复用已获取的数据和上一次的方案做定向修复，无法修复时整体重新生成
+                if repair:
+                    with span("task.repair", attempt=times):
+                        temp_plan = repair_task.execute(question)
+                else:
+                    temp_plan = None
         if times == 3:
             print(f"\n No correct plan was produced after 3 attempts")
             return None
@@ -126,7 +258,7 @@ def get_result_task(question):
 
 def save_result(result, question_id):
     """
-    保存生成的行程计划结果到文件
+    保存生成的行程计划结果（按 RESULT_SINK 格式写到 RESULT_DIR）
     
     Args:
         result: 生成的行程计划结果（字典）
@@ -139,19 +271,9 @@ def save_result(result, question_id):
         print(f"\n 无法保存：结果为 None")
         return None
     
-    # 确保results目录存在
-    results_dir = "results"
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
-        print(f"\n 创建目录: {results_dir}")
-    
-    # 构建文件路径
-    output_file = os.path.join(results_dir, f"id_{question_id}.json")
-    
     try:
-        # 保存JSON文件
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
+        with create_sink(RESULT_SINK, RESULT_DIR) as sink:
+            output_file = sink.write(question_id, result)
         print(f"\n✓ 结果已保存到: {output_file}")
         return output_file
     except Exception as e:
@@ -171,32 +293,40 @@ def main():
             all_queries = get_all_queries()
             print(f"\n 将处理所有 {len(all_queries)} 个问题（1-120）")
             
-            # 批量处理
+            # 批量处理：结果由后台线程写入，不阻塞下一个问题
             success_count = 0
             fail_count = 0
+            writer = BackgroundWriter(create_sink(RESULT_SINK, RESULT_DIR))
             
-            for idx, (question_id, question, question_item) in enumerate(all_queries, 1):
-                print(f"\n{'='*60}")
-                print(f"处理问题 {idx}/{len(all_queries)}: Question ID {question_id}")
-                print(f"{'='*60}")
+            try:
+                for idx, (question_id, question, question_item) in enumerate(all_queries, 1):
+                    print(f"\n{'='*60}")
+                    print(f"处理问题 {idx}/{len(all_queries)}: Question ID {question_id}")
+                    print(f"{'='*60}")
                 
-                # 记录开始时间
-                start_time = time.time()
+                    # 记录开始时间
+                    start_time = time.time()
                 
-                # 获取结果
-                result = get_result_task(question)
+                    # 获取结果
+                    result = run_traced(question, question_id)
                 
-                # 计算推理时间
-                inference_time_seconds = time.time() - start_time
+                    # 计算推理时间
+                    inference_time_seconds = time.time() - start_time
                 
-                if result:
-                    # 保存结果
-                    save_result(result, question_id)
-                    success_count += 1
-                    print(f"✓ 问题 {question_id} 处理完成，推理时间: {inference_time_seconds:.2f} 秒")
-                else:
-                    fail_count += 1
-                    print(f"✗ 问题 {question_id} 处理失败")
+                    if result:
+                        # 保存结果
+                        writer.submit(question_id, result)
+                        success_count += 1
+                        print(f"✓ 问题 {question_id} 处理完成，推理时间: {inference_time_seconds:.2f} 秒")
+                    else:
+                        fail_count += 1
+                        print(f"✗ 问题 {question_id} 处理失败")
+            finally:
+                # 中断时也写完已提交的结果
+                writer.close()
+            print(f"\n✓ {writer.written} 个结果已保存到: {writer.sink.location}")
+            for error in writer.errors:
+                print(f"✗ 保存结果时出错: {error}")
             
             # 打印处理摘要
             print("\n" + "="*60)
@@ -205,6 +335,8 @@ def main():
             print(f"\n成功处理: {success_count} 个问题")
             print(f"处理失败: {fail_count} 个问题")
             print(f"总计: {len(all_queries)} 个问题")
+            print_prompt_stats()
+            print_stage_stats()
         
         else:
             # 处理单个问题
@@ -214,7 +346,7 @@ def main():
             start_time = time.time()
             
             # 获取结果
-            result = get_result_task(question)
+            result = run_traced(question, question_id)
             
             # 计算推理时间
             inference_time_seconds = time.time() - start_time
@@ -225,6 +357,8 @@ def main():
                 print(f"\n✓ 处理完成，推理时间: {inference_time_seconds:.2f} 秒")
             else:
                 print("\n✗ 处理失败：未生成有效结果")
+            print_prompt_stats()
+            print_stage_stats()
         
     except KeyboardInterrupt:
         print("\n\n Application terminated by user")
@@ -1,5 +1,62 @@
 import autogen
-from agents import CoordinatorAgent, ResearcherAgent, WriterAgent
+from config import PROMPT_TOKEN_BUDGET, TOOL_CHAT_MAX_ROUND
+from agents import CoordinatorAgent, ResearcherAgent, WriterAgent, get_agent_pool, register_tools
+from utils import compact_json, count_tokens, find_json, get_chat_messages, get_prompt_stats, is_final_message, span
+
+_TRAIN_SCHEMA = {
+    "cost": "0.0",
+    "destination_id": "...",
+    "destination_station": "...",
+    "duration": "0",
+    "origin_id": "...",
+    "origin_station": "...",
+    "train_number": "..."
+}
+
+# 最终输出的结构模板（只序列化一次，以紧凑 JSON 嵌入消息）
+RESULT_SCHEMA = {
+    "budget": 0.0,
+    "peoples": 0,
+    "travel_days": 0,
+    "origin_city": "...",
+    "destination_city": "...",
+    "start_date": "...",
+    "end_date": "...",
+    "daily_plans": [
+        {
+            "date": "YYYY年MM月DD日",
+            "cost": 0.0,
+            "cost_time": 0.0,
+            "hotel": {"cost": 0.0, "feature": "...", "id": "...", "name": "...", "rating": 0.0, "type": "..."},
+            "attractions": {"cost": 0.0, "duration": 0.0, "id": "...", "name": "...", "rating": 0.0, "type": "..."},
+            "restaurants": [
+                {
+                    "type": "breakfast",
+                    "restaurant": {
+                        "cost": 0.0,
+                        "duration": 0.0,
+                        "id": "...",
+                        "name": "...",
+                        "queue_time": 0.0,
+                        "rating": 0.0,
+                        "recommended_food": "...",
+                        "type": "..."
+                    }
+                }
+            ],
+            "transport": {"mode": "public_transport", "cost": 0.0, "duration": 0.0}
+        }
+    ],
+    "departure_trains": _TRAIN_SCHEMA,
+    "back_trains": _TRAIN_SCHEMA,
+    "total_cost": 0.0
+}
+RESULT_SCHEMA_TEXT = compact_json(RESULT_SCHEMA)
+
+
+def is_result_plan(obj):
+    """是否为最终行程计划 JSON（包含 daily_plans 或 budget 等期望字段）"""
+    return "daily_plans" in obj or "budget" in obj
 
 
 class GenResultTask:
@@ -8,126 +65,66 @@ class GenResultTask:
     组成：coordinator, researcher, writer
     描述：整合信息，生成最终的行程计划JSON
     """
-    def __init__(self):
-        self.coordinator = CoordinatorAgent()
-        self.researcher = ResearcherAgent()
-        self.writer = WriterAgent()
-
-    def execute(self, question):
-        print(f"\n Starting Generate Result Task: {question}")
-        print("=" * 50)
+    def __init__(self, pool=None, stats=None, token_budget=PROMPT_TOKEN_BUDGET):
+        self.pool = pool if pool is not None else get_agent_pool()
+        self.stats = stats or get_prompt_stats()
+        self.token_budget = token_budget
+        # 固定模板（含结构模板）的 token 数，只计算一次
+        self._template_tokens = count_tokens(self.task_message(""))
+        self.coordinator = self.pool.get(CoordinatorAgent)
+        self.researcher = self.pool.get(ResearcherAgent)
+        self.writer = self.pool.get(WriterAgent)
 
         # Create user proxy for interaction
-        user_proxy = autogen.UserProxyAgent(
+        self.user_proxy = autogen.UserProxyAgent(
             name="user_proxy",
             human_input_mode="NEVER",
-            max_consecutive_auto_reply=3,
+            max_consecutive_auto_reply=TOOL_CHAT_MAX_ROUND,
             is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
             code_execution_config={"work_dir": "workspace"},
         )
 
         # Create group chat
-        group_chat = autogen.GroupChat(
+        self.group_chat = autogen.GroupChat(
             agents=[
-                user_proxy,
+                self.user_proxy,
                 self.coordinator.get_agent(),
                 self.researcher.get_agent(),
                 self.writer.get_agent(),
             ],
             messages=[],
-            max_round=3,
+            max_round=TOOL_CHAT_MAX_ROUND,
         )
 
-        manager = autogen.GroupChatManager(groupchat=group_chat, llm_config=self.coordinator.agent.llm_config)
+        # 智能体给出行程计划 JSON 后结束（任务消息中的结构模板和工具执行结果由 user_proxy 发出，不算）
+        self.manager = autogen.GroupChatManager(
+            groupchat=self.group_chat,
+            llm_config=self.coordinator.agent.llm_config,
+            is_termination_msg=lambda message: (
+                message.get("name") != self.user_proxy.name
+                and is_final_message(message, predicate=is_result_plan)
+            )
+        )
 
-        # Start the conversation
-        task_message = f"""
+        # 注册数据查询工具：researcher 生成调用，user_proxy 执行
+        register_tools(self.researcher.get_agent(), self.user_proxy, self.researcher.get_tools())
+
+    def available_tokens(self):
+        """任务消息在 token 预算内扣除固定模板后，留给行程和检查反馈的 token 数"""
+        return max(self.token_budget - self._template_tokens, 0)
+
+    @staticmethod
+    def task_message(question):
+        """任务消息（question 为行程文本和检查反馈）"""
+        return f"""
         生成结果任务: {question}
 
         协调者，请管理此任务：
-        1. 基于已有信息，如有必要，请要求研究者收集关于 {question} 的更全面信息
+        1. 基于上述已有信息，如有必要，请要求研究者调用工具补充所需数据
         2. 研究完成后，请要求写作者创建最终的行程计划
-        3. 确保最终输出是符合以下结构的JSON格式行程计划：
-           {{
-             "budget": 0.0,
-             "peoples": 0,
-             "travel_days": 0,
-             "origin_city": "...",
-             "destination_city": "...",
-             "start_date": "...",
-             "end_date": "...",
-             "daily_plans": [
-               {{
-                 "date": "YYYY年MM月DD日",
-                 "cost": 0.0,
-                 "cost_time": 0.0,
-                 "hotel": {{
-                   "cost": 0.0,
-                   "feature": "...",
-                   "id": "...",
-                   "name": "...",
-                   "rating": 0.0,
-                   "type": "..."
-                 }},
-                 "attractions": {{
-                   "cost": 0.0,
-                   "duration": 0.0,
-                   "id": "...",
-                   "name": "...",
-                   "rating": 0.0,
-                   "type": "..."
-                 }},
-                 "restaurants": [
-                   {{
-                     "type": "breakfast",
-                     "restaurant": {{
-                       "cost": 0.0,
-                       "duration": 0.0,
-                       "id": "...",
-                       "name": "...",
-                       "queue_time": 0.0,
-                       "rating": 0.0,
-                       "recommended_food": "...",
-                       "type": "..."
-                     }}
-                   }},
-                   {{
-                     "type": "lunch",
-                     "restaurant": {{ ... }}
-                   }},
-                   {{
-                     "type": "dinner",
-                     "restaurant": {{ ... }}
-                   }}
-                 ],
-                 "transport": {{
-                   "mode": "public_transport",
-                   "cost": 0.0,
-                   "duration": 0.0
-                 }}
-               }}
-             ],
-             "departure_trains": {{
-               "cost": "0.0",
-               "destination_id": "...",
-               "destination_station": "...",
-               "duration": "0",
-               "origin_id": "...",
-               "origin_station": "...",
-               "train_number": "..."
-             }},
-             "back_trains": {{
-               "cost": "0.0",
-               "destination_id": "...",
-               "destination_station": "...",
-               "duration": "0",
-               "origin_id": "...",
-               "origin_station": "...",
-               "train_number": "..."
-             }},
-             "total_cost": 0.0
-           }}
-           
+        3. 确保最终输出是符合以下结构的JSON格式行程计划（restaurants 依次为 breakfast、lunch、dinner）：
+           {RESULT_SCHEMA_TEXT}
+
         重要提示：
         - 输出应该是直接的JSON对象（不要包装在"answer"字段中）
         - "daily_plans"中的每一天都应包含酒店（最后一天应为字符串"null"）、景点、餐厅（早餐、午餐、晚餐）和交通信息
@@ -141,50 +138,34 @@ class GenResultTask:
         现在开始任务协调。
         """
 
-        chat_result = user_proxy.initiate_chat(manager, message=task_message)
-        
-        # 尝试从聊天结果中提取生成的行程计划
-        import json
-        import re
-        
-        # 获取所有消息
-        messages = group_chat.messages if hasattr(group_chat, 'messages') else []
-        if chat_result and hasattr(chat_result, 'chat_history'):
-            messages = chat_result.chat_history
+    def _reset(self):
+        """清空上一次执行遗留的对话状态"""
+        self.group_chat.reset()
+        self.pool.reset(self.user_proxy, self.manager, self.coordinator, self.researcher, self.writer)
+
+    def execute(self, question):
+        print(f"\n Starting Generate Result Task")
+        print("=" * 50)
+
+        self._reset()
+        user_proxy = self.user_proxy
+        group_chat = self.group_chat
+        manager = self.manager
+
+        # Start the conversation
+        task_message = self.task_message(question)
+        tokens = self.stats.record("gen_result", task_message)
+        print(f" Task message tokens: {tokens}")
+
+        with span("result.chat"):
+            chat_result = user_proxy.initiate_chat(manager, message=task_message)
         
-        # 从后往前查找包含JSON的消息
-        for message in reversed(messages):
-            content = message.get("content", "") if isinstance(message, dict) else str(message)
-            
-            # 方法1: 尝试提取markdown代码块中的JSON（优先级高，通常格式更标准）
-            if "```json" in content or "```" in content:
-                json_start = content.find("```json") if "```json" in content else content.find("```")
-                if json_start != -1:
-                    json_start = content.find("\n", json_start) + 1
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        try:
-                            json_str = content[json_start:json_end].strip()
-                            result = json.loads(json_str)
-                            # 检查是否包含期望的字段（budget, peoples, travel_days, daily_plans等）
-                            if isinstance(result, dict) and ("daily_plans" in result or "budget" in result):
-                                return result
-                        except json.JSONDecodeError:
-                            continue
-            
-            # 方法2: 尝试从文本中提取包含 "daily_plans" 或 "budget" 字段的JSON
-            json_pattern = r'\{[\s\S]*"(?:daily_plans|budget)"[\s\S]*\}'
-            json_match = re.search(json_pattern, content)
-            
-            if json_match:
-                try:
-                    json_str = json_match.group(0)
-                    result = json.loads(json_str)
-                    # 检查是否包含期望的字段
-                    if isinstance(result, dict) and ("daily_plans" in result or "budget" in result):
-                        return result
-                except json.JSONDecodeError:
-                    continue
+        # 从聊天结果中提取生成的行程计划（需包含 daily_plans 或 budget 等期望字段）
+        with span("result.extract_json"):
+            messages = get_chat_messages(chat_result, group_chat)
+            result = find_json(messages, predicate=is_result_plan)
+        if result is not None:
+            return result
         
         # 如果无法提取有效的JSON，返回一个基本的错误结构
         return {
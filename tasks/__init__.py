@@ -1,7 +1,38 @@
-from .Gen_result_task import GenResultTask
+"""
+任务包：任务类在首次访问时才导入（PEP 562），导入 tasks 时不会加载 autogen 和各智能体
+"""
 
-from .generate_task import  GenerateTask
-from .check_task import CheckTask
-from .evaluate_task import EvaluateTask
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["GenResultTask","GenerateTask","CheckTask","EvaluateTask"]
\ No newline at end of file
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    "GenResultTask": "Gen_result_task",
+    "GenerateTask": "generate_task",
+    "CheckTask": "check_task",
+    "EvaluateTask": "evaluate_task",
+    "RepairTask": "repair_task"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .Gen_result_task import GenResultTask
+    from .generate_task import GenerateTask
+    from .check_task import CheckTask
+    from .evaluate_task import EvaluateTask
+    from .repair_task import RepairTask
@@ -1,20 +1,29 @@
 import autogen
-from agents import CoordinatorAgent, ResearcherAgent, CheckAgent, WriterAgent, FeedbackAgent
+from agents import CoordinatorAgent, ResearcherAgent, CheckAgent, WriterAgent, FeedbackAgent, get_agent_pool
+from config import PROMPT_TOKEN_BUDGET
+from utils import (
+    compact_for_prompt,
+    count_tokens,
+    extract_json_objects,
+    get_chat_messages,
+    get_message_content,
+    get_prompt_stats,
+    span
+)
 
 
 class CheckTask:
-    def __init__(self):
-        self.coordinator = CoordinatorAgent()
-        self.check = CheckAgent()
-        self.feedback = FeedbackAgent()
-
-
-    def execute(self, Itinerary):
-        print(f"\n Starting Check Task")
-        print("=" * 50)
+    def __init__(self, pool=None, stats=None, token_budget=PROMPT_TOKEN_BUDGET):
+        self.pool = pool if pool is not None else get_agent_pool()
+        self.stats = stats or get_prompt_stats()
+        self.token_budget = token_budget
+        self._template_tokens = count_tokens(self.task_message(""))
+        self.coordinator = self.pool.get(CoordinatorAgent)
+        self.check = self.pool.get(CheckAgent)
+        self.feedback = self.pool.get(FeedbackAgent)
 
         # Create user proxy for interaction
-        user_proxy = autogen.UserProxyAgent(
+        self.user_proxy = autogen.UserProxyAgent(
             name="user_proxy",
             human_input_mode="NEVER",
             max_consecutive_auto_reply=3,
@@ -23,9 +32,9 @@ class CheckTask:
         )
 
         # Create group chat
-        group_chat = autogen.GroupChat(
+        self.group_chat = autogen.GroupChat(
             agents=[
-                user_proxy,
+                self.user_proxy,
                 self.coordinator.get_agent(),
                 self.check.get_agent(),
                 self.feedback.get_agent(),
@@ -34,14 +43,20 @@ class CheckTask:
             max_round=3,
         )
 
-        manager = autogen.GroupChatManager(groupchat=group_chat, llm_config=self.coordinator.agent.llm_config)
+        self.manager = autogen.GroupChatManager(groupchat=self.group_chat, llm_config=self.coordinator.agent.llm_config)
 
-        # Start the conversation
-        task_message = f"""
+    def available_tokens(self):
+        """任务消息在 token 预算内扣除固定模板后，留给行程的 token 数"""
+        return max(self.token_budget - self._template_tokens, 0)
+
+    @staticmethod
+    def task_message(itinerary_text):
+        """任务消息（itinerary_text 为紧凑 JSON 行程）"""
+        return f"""
         检查任务: 
 
         协调者，请管理此检查任务：
-        1. 要求检查者和反馈者检查以下行程的合理性：{Itinerary}
+        1. 要求检查者和反馈者检查以下行程的合理性（refs 为 id 到名称/详情的对照表）：{itinerary_text}
         2. 如果检查者或反馈者认为此行程不合理，请记录他们认为不合理的部分
         3. 在输出结果之前，确保获得检查者和反馈者的共同认可
         4. 如果最终结果合理，返回true；否则返回false
@@ -50,62 +65,58 @@ class CheckTask:
         现在开始任务协调。
         """
 
-        chat_result = user_proxy.initiate_chat(manager, message=task_message)
+    def _reset(self):
+        """清空上一次执行遗留的对话状态"""
+        self.group_chat.reset()
+        self.pool.reset(self.user_proxy, self.manager, self.coordinator, self.check, self.feedback)
+
+
+    def execute(self, Itinerary):
+        print(f"\n Starting Check Task")
+        print("=" * 50)
+
+        self._reset()
+        user_proxy = self.user_proxy
+        group_chat = self.group_chat
+        manager = self.manager
+
+        # 行程以紧凑 JSON 嵌入（名称和详情见 refs 对照表，行程中只保留 id），整条消息限制在 token 预算内
+        itinerary_text = compact_for_prompt(Itinerary, self.available_tokens())
+
+        # Start the conversation
+        task_message = self.task_message(itinerary_text)
+        tokens = self.stats.record("check", task_message)
+        print(f" Task message tokens: {tokens}")
+
+        with span("check.chat"):
+            chat_result = user_proxy.initiate_chat(manager, message=task_message)
         
         # 尝试从聊天结果中提取检查结果
-        import json
         import re
         
         result = None
         is_valid = False
         
         # 获取所有消息
-        messages = group_chat.messages if hasattr(group_chat, 'messages') else []
-        if chat_result and hasattr(chat_result, 'chat_history'):
-            messages = chat_result.chat_history
+        messages = get_chat_messages(chat_result, group_chat)
         
         # 从后往前查找包含检查结果的消息
         for message in reversed(messages):
-            content = message.get("content", "") if isinstance(message, dict) else str(message)
-            
-            # 尝试提取JSON格式的检查结果（包含 is_valid 字段）
-            json_pattern = r'\{[\s\S]*"is_valid"[\s\S]*\}'
-            json_match = re.search(json_pattern, content, re.IGNORECASE)
-            
-            if json_match:
-                try:
-                    json_str = json_match.group(0)
-                    result = json.loads(json_str)
-                    if "is_valid" in result:
-                        is_valid = bool(result.get("is_valid", False))
-                        # 返回完整的检查结果字典
-                        return {
-                            "is_valid": is_valid,
-                            "errors": result.get("errors", []),
-                            "warnings": result.get("warnings", [])
-                        }
-                except json.JSONDecodeError:
-                    continue
+            content = get_message_content(message)
             
-            # 尝试提取markdown代码块中的JSON
-            if "```json" in content or "```" in content:
-                json_start = content.find("```json") if "```json" in content else content.find("```")
-                if json_start != -1:
-                    json_start = content.find("\n", json_start) + 1
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        try:
-                            json_str = content[json_start:json_end].strip()
-                            result = json.loads(json_str)
-                            if "is_valid" in result:
-                                is_valid = bool(result.get("is_valid", False))
-                                return {
-                                    "is_valid": is_valid,
-                                    "errors": result.get("errors", []),
-                                    "warnings": result.get("warnings", [])
-                                }
-                        except json.JSONDecodeError:
-                            continue
+            # 提取JSON格式的检查结果（包含 is_valid 字段），同一消息内取最后一个
+            candidates = extract_json_objects(content, required_keys=("is_valid",))
+            if candidates:
+                result = candidates[-1].value
+            for candidate in reversed(candidates):
+                if candidate.valid:
+                    is_valid = bool(candidate.value.get("is_valid", False))
+                    # 返回完整的检查结果字典
+                    return {
+                        "is_valid": is_valid,
+                        "errors": candidate.value.get("errors", []),
+                        "warnings": candidate.value.get("warnings", [])
+                    }
             
             # 尝试从文本中提取布尔值和错误信息
             # 如果找到 true，但还没有提取到完整结果，继续查找
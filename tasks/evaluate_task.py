@@ -1,17 +1,20 @@
 import autogen
-from agents import CoordinatorAgent, ResearcherAgent
+from agents import CoordinatorAgent, ResearcherAgent, get_agent_pool
 
 
 class EvaluateTask:
-    def __init__(self):
-        self.coordinator = CoordinatorAgent()
-        self.researcher = ResearcherAgent()
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else get_agent_pool()
+        self.coordinator = self.pool.get(CoordinatorAgent)
+        self.researcher = self.pool.get(ResearcherAgent)
 
 
     def execute(self, topic):
         print(f"\n Starting Research Task: {topic}")
         print("=" * 50)
 
+        self.pool.reset(self.coordinator, self.researcher)
+
         # Create user proxy for interaction
         user_proxy = autogen.UserProxyAgent(
             name="user_proxy",
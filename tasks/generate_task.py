@@ -1,5 +1,7 @@
 import autogen
-from agents import CoordinatorAgent, ResearcherAgent, PlannerAgent
+from config import PROMPT_TOKEN_BUDGET, TOOL_CHAT_MAX_ROUND
+from agents import CoordinatorAgent, ResearcherAgent, PlannerAgent, get_agent_pool, register_tools
+from utils import count_tokens, find_json, get_chat_messages, get_prompt_stats, is_final_message, span
 
 
 class GenerateTask:
@@ -8,40 +10,57 @@ class GenerateTask:
     组成：coordinator,researcher,planner
     描述：调用API搜索信息，然后规划出一份行程
     """
-    def __init__(self):
-        self.coordinator = CoordinatorAgent()
-        self.researcher = ResearcherAgent()
-        self.planner = PlannerAgent()
-
-    def execute(self, question):
-        print(f"\n Starting Generate Task: {question}")
-        print("=" * 50)
+    def __init__(self, pool=None, stats=None, token_budget=PROMPT_TOKEN_BUDGET):
+        self.pool = pool if pool is not None else get_agent_pool()
+        self.stats = stats or get_prompt_stats()
+        self.token_budget = token_budget
+        self._template_tokens = count_tokens(self.task_message(""))
+        self.coordinator = self.pool.get(CoordinatorAgent)
+        self.researcher = self.pool.get(ResearcherAgent)
+        self.planner = self.pool.get(PlannerAgent)
 
         # Create user proxy for interaction
-        user_proxy = autogen.UserProxyAgent(
+        self.user_proxy = autogen.UserProxyAgent(
             name="user_proxy",
             human_input_mode="NEVER",
-            max_consecutive_auto_reply=3,
+            max_consecutive_auto_reply=TOOL_CHAT_MAX_ROUND,
             is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
             code_execution_config={"work_dir": "workspace"},
         )
 
         # Create group chat
-        group_chat = autogen.GroupChat(
+        self.group_chat = autogen.GroupChat(
             agents=[
-                user_proxy,
+                self.user_proxy,
                 self.coordinator.get_agent(),
                 self.researcher.get_agent(),
                 self.planner.get_agent()
             ],
             messages=[],
-            max_round=3,
+            max_round=TOOL_CHAT_MAX_ROUND,
+        )
+
+        # 智能体给出包含 "answer" 的 JSON 后结束（任务消息和工具执行结果由 user_proxy 发出，不算）
+        self.manager = autogen.GroupChatManager(
+            groupchat=self.group_chat,
+            llm_config=self.coordinator.agent.llm_config,
+            is_termination_msg=lambda message: (
+                message.get("name") != self.user_proxy.name and is_final_message(message, required_keys=("answer",))
+            )
         )
 
-        manager = autogen.GroupChatManager(groupchat=group_chat, llm_config=self.coordinator.agent.llm_config)
+        # 注册工具：researcher/planner 生成调用，user_proxy 执行
+        register_tools(self.researcher.get_agent(), self.user_proxy, self.researcher.get_tools())
+        register_tools(self.planner.get_agent(), self.user_proxy, self.planner.get_tools(self.researcher))
 
-        # Start the conversation
-        task_message = f"""
+    def available_tokens(self):
+        """任务消息在 token 预算内扣除固定模板后，问题文本（含检查反馈）可用的 token 数（问题在消息中出现两次）"""
+        return max(self.token_budget - self._template_tokens, 0) // 2
+
+    @staticmethod
+    def task_message(question):
+        """任务消息"""
+        return f"""
         生成任务: {question}
 
         协调者，请管理此生成任务：
@@ -60,61 +79,43 @@ class GenerateTask:
         现在开始任务协调。
         """
 
-        chat_result = user_proxy.initiate_chat(manager, message=task_message)
-        
-        # 尝试从聊天结果中提取生成的行程计划
-        # 方法1: 从最后的消息中提取JSON
-        import json
-        import re
-        
-        result = None
-        
-        # 获取所有消息
-        messages = group_chat.messages if hasattr(group_chat, 'messages') else []
-        if chat_result and hasattr(chat_result, 'chat_history'):
-            messages = chat_result.chat_history
+    def _reset(self):
+        """清空上一次执行遗留的对话状态"""
+        self.group_chat.reset()
+        self.pool.reset(self.user_proxy, self.manager, self.coordinator, self.researcher, self.planner)
+        self.planner.clear_state()
+
+    def execute(self, question):
+        print(f"\n Starting Generate Task: {question}")
+        print("=" * 50)
+
+        self._reset()
+        user_proxy = self.user_proxy
+        group_chat = self.group_chat
+        manager = self.manager
+
+        # Start the conversation
+        task_message = self.task_message(question)
+        tokens = self.stats.record("generate", task_message)
+        print(f" Task message tokens: {tokens}")
+
+        # 对话阶段的自身耗时即 LLM 轮次与智能体交互的耗时（工具调用记录为子阶段）
+        with span("generate.chat"):
+            chat_result = user_proxy.initiate_chat(manager, message=task_message)
         
-        # 从后往前查找包含JSON的消息
-        for message in reversed(messages):
-            content = message.get("content", "") if isinstance(message, dict) else str(message)
-            
-            # 尝试提取JSON部分（可能在代码块中）
-            json_pattern = r'\{[\s\S]*"answer"[\s\S]*\}'
-            json_match = re.search(json_pattern, content)
-            
-            if json_match:
-                try:
-                    json_str = json_match.group(0)
-                    result = json.loads(json_str)
-                    if "answer" in result:
-                        return result
-                except json.JSONDecodeError:
-                    continue
-            
-            # 尝试提取markdown代码块中的JSON
-            if "```json" in content or "```" in content:
-                json_start = content.find("```json") if "```json" in content else content.find("```")
-                if json_start != -1:
-                    json_start = content.find("\n", json_start) + 1
-                    json_end = content.find("```", json_start)
-                    if json_end != -1:
-                        try:
-                            json_str = content[json_start:json_end].strip()
-                            result = json.loads(json_str)
-                            if "answer" in result:
-                                return result
-                        except json.JSONDecodeError:
-                            continue
+        # 从聊天结果中提取生成的行程计划（从后往前查找包含 "answer" 字段的JSON）
+        with span("generate.extract_json"):
+            messages = get_chat_messages(chat_result, group_chat)
+            result = find_json(messages, required_keys=("answer",))
+        if result is not None:
+            return result
         
         # 如果无法提取JSON，返回一个基本的错误结构
-        if result is None:
-            return {
-                "answer": {
-                    "question_id": "",
-                    "question": question,
-                    "plan": [],
-                    "error": "无法从agent对话中提取有效的行程计划JSON"
-                }
+        return {
+            "answer": {
+                "question_id": "",
+                "question": question,
+                "plan": [],
+                "error": "无法从agent对话中提取有效的行程计划JSON"
             }
-        
-        return result
\ No newline at end of file
+        }
\ No newline at end of file
@@ -0,0 +1,91 @@
+from agents import PlannerAgent, FeedbackAgent, CheckAgent, WriterAgent, PlanRepairer, get_agent_pool
+from utils import span
+
+
+class RepairTask:
+    """
+    Repair Task
+    组成：planner, feedback, check, writer
+    描述：检查未通过时，基于上一次规划的数据和方案做定向修复，而不是整体重新生成
+    """
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else get_agent_pool()
+        self.planner = self.pool.get(PlannerAgent)
+        self.feedback = self.pool.get(FeedbackAgent)
+        self.check = self.pool.get(CheckAgent)
+        self.writer = self.pool.get(WriterAgent)
+        self.repairer = PlanRepairer(self.planner, self.feedback, self.check)
+
+    def can_repair(self):
+        """是否有可供修复的规划状态（本轮生成中 planner 实际求解过）"""
+        return bool(self.planner.last_result and self.planner.last_result.get('success'))
+
+    def check_schedule(self):
+        """
+        按营业时间为上一次的规划结果排程，在 LLM 检查前快速发现不可行的天
+
+        Returns:
+            存在不可行的天时返回检查结果 {"is_valid": False, "errors": [...], "warnings": [...]}，
+            否则（或没有规划状态时）返回 None
+        """
+        if not self.can_repair():
+            return None
+        result = self.planner.last_result
+        intra_city_trans = (self.planner.last_data or {}).get('intra_city_trans', {})
+        scheduler = self.check.get_validator().get_scheduler()
+        with span("check.schedule") as current:
+            schedule = scheduler.schedule(
+                result['solution'], result['travel_days'], intra_city_trans,
+                result.get('start_date', ''), result.get('peoples', 1)
+            )
+            current.set(feasible=schedule['feasible'])
+        if schedule['feasible']:
+            return None
+        return {
+            "is_valid": False,
+            "errors": [issue['issue'] for issue in schedule['issues'] if issue.get('severity') == 'error'],
+            "warnings": [issue['issue'] for issue in schedule['issues'] if issue.get('severity') == 'warning']
+        }
+
+    def execute(self, question, question_id=""):
+        """
+        修复上一次的规划结果
+
+        Returns:
+            修复后的行程计划（与 GenerateTask 输出结构相同），无法修复或方案没有改动时返回 None
+        """
+        if not self.can_repair():
+            return None
+
+        print(f"\n Starting Repair Task")
+        print("=" * 50)
+
+        with span("repair.repair"):
+            repaired = self.repairer.repair(self.planner.last_result)
+        for action in repaired.get('repair_log', []):
+            print(f"  - 修复动作: {action}")
+        if not repaired.get('success'):
+            print(f"  修复失败: {repaired.get('error', '')}")
+            return None
+
+        # 本地校验未发现问题（如只有 LLM 检查不通过）时修复器不做任何改动，
+        # 返回 None 让调用方带着检查反馈整体重新生成，而不是把同一方案再检查一遍
+        if not repaired.get('repair_log') or repaired['solution'] == self.planner.last_result['solution']:
+            print("  本地校验未发现可修复的问题，方案未改动")
+            return None
+
+        # 修复后的方案作为下一次修复的起点
+        self.planner.last_result = repaired
+
+        intra_city_trans = (self.planner.last_data or {}).get('intra_city_trans', {})
+        with span("writer.generate"):
+            return self.writer.generate_travel_plan_json(
+                solution=repaired['solution'],
+                travel_days=repaired['travel_days'],
+                peoples=repaired.get('peoples', 1),
+                start_date=repaired.get('start_date', ''),
+                question_id=question_id,
+                question=question,
+                intra_city_trans=intra_city_trans,
+                budget=repaired.get('budget')
+            )
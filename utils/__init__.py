@@ -0,0 +1,109 @@
+"""
+工具包：导出的函数和类在首次访问时才导入所在子模块（PEP 562），
+只用到其中一部分（如 JSON 提取、提示词压缩）时不会加载 numpy、requests 等依赖
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    "GridIndex": "geo",
+    "get_coordinates": "geo",
+    "haversine": "geo",
+    "haversine_many": "geo",
+    "poi_distance": "geo",
+    "JsonCandidate": "json_extract",
+    "extract_json_objects": "json_extract",
+    "find_json": "json_extract",
+    "get_chat_messages": "json_extract",
+    "get_message_content": "json_extract",
+    "is_final_message": "json_extract",
+    "earliest_start": "time_windows",
+    "format_clock": "time_windows",
+    "parse_clock": "time_windows",
+    "parse_hours": "time_windows",
+    "window_range": "time_windows",
+    "windows_on": "time_windows",
+    "PromptStats": "prompt_compact",
+    "compact_for_prompt": "prompt_compact",
+    "compact_json": "prompt_compact",
+    "compact_plan": "prompt_compact",
+    "count_tokens": "prompt_compact",
+    "fit_items": "prompt_compact",
+    "get_prompt_stats": "prompt_compact",
+    "truncate_to_tokens": "prompt_compact",
+    "RateLimiter": "http_client",
+    "create_session": "http_client",
+    "request_with_retry": "http_client",
+    "JudgmentCache": "judgment_cache",
+    "canonical_json": "judgment_cache",
+    "judgment_key": "judgment_cache",
+    "StageStats": "tracing",
+    "Tracer": "tracing",
+    "get_stage_stats": "tracing",
+    "get_tracer": "tracing",
+    "span": "tracing",
+    "start_trace": "tracing",
+    "traced": "tracing",
+    "LazyModule": "lazy",
+    "lazy_module": "lazy",
+    "DatasetStore": "dataset_store",
+    "clear_dataset_cache": "dataset_store",
+    "load_dataset": "dataset_store",
+    "normalize_id": "dataset_store",
+    "BackgroundWriter": "result_sink",
+    "JsonFileSink": "result_sink",
+    "NdjsonSink": "result_sink",
+    "ResultSink": "result_sink",
+    "create_sink": "result_sink",
+    "AsyncHttpBridge": "async_bridge",
+    "ResponseCache": "response_cache",
+    "cache_key": "response_cache"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .geo import GridIndex, get_coordinates, haversine, haversine_many, poi_distance
+    from .json_extract import (
+        JsonCandidate,
+        extract_json_objects,
+        find_json,
+        get_chat_messages,
+        get_message_content,
+        is_final_message
+    )
+    from .time_windows import earliest_start, format_clock, parse_clock, parse_hours, window_range, windows_on
+    from .prompt_compact import (
+        PromptStats,
+        compact_for_prompt,
+        compact_json,
+        compact_plan,
+        count_tokens,
+        fit_items,
+        get_prompt_stats,
+        truncate_to_tokens
+    )
+    from .http_client import RateLimiter, create_session, request_with_retry
+    from .judgment_cache import JudgmentCache, canonical_json, judgment_key
+    from .tracing import StageStats, Tracer, get_stage_stats, get_tracer, span, start_trace, traced
+    from .lazy import LazyModule, lazy_module
+    from .dataset_store import DatasetStore, clear_dataset_cache, load_dataset, normalize_id
+    from .result_sink import BackgroundWriter, JsonFileSink, NdjsonSink, ResultSink, create_sink
+    from .async_bridge import AsyncHttpBridge
+    from .response_cache import ResponseCache, cache_key
@@ -0,0 +1,123 @@
+"""
+异步 HTTP 桥接：工作线程中的同步代码（autogen 对话、requests 调用）发出的 HTTP 请求，
+交给事件循环上的 httpx 异步连接池执行，所有线程共用一个连接池（连接数由 max_connections 限制）
+- requests_session(): 挂载了桥接适配器的 requests.Session，用于数据 API（ResearcherAgent.session）
+- httpx_client(): 使用桥接传输的 httpx.Client，可作为 LLM 配置中的 http_client（OpenAI 客户端）
+- 同步接口只能在工作线程中调用，在事件循环线程中调用会死锁，因此直接抛出 RuntimeError
+"""
+
+import asyncio
+import threading
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class AsyncHttpBridge:
+    """在事件循环上执行 HTTP 请求的桥接器（需在事件循环线程中构建）"""
+
+    def __init__(self, max_connections: int = 100, timeout: float = 120.0,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.transport = httpx.AsyncHTTPTransport(limits=limits)
+        self.client = httpx.AsyncClient(transport=self.transport, timeout=timeout)
+        self.requests = 0
+
+    def run(self, coro):
+        """在工作线程中执行协程并等待结果"""
+        if threading.get_ident() == self._loop_thread:
+            coro.close()
+            raise RuntimeError("不能在事件循环线程中同步等待桥接请求")
+        self.requests += 1
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def forward(self, request: httpx.Request) -> httpx.Response:
+        """原样转发请求，返回未解码的响应体（由调用方的客户端按 Content-Encoding 解码）"""
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        extensions = {key: value for key, value in response.extensions.items()
+                      if key in ("http_version", "reason_phrase")}
+        return httpx.Response(response.status_code, headers=response.headers.raw,
+                              stream=httpx.ByteStream(body), extensions=extensions)
+
+    def requests_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _RequestsAdapter(self)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def httpx_client(self, **kwargs) -> httpx.Client:
+        return _SharedClient(transport=_BridgeTransport(self), **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class _BridgeTransport(httpx.BaseTransport):
+    """httpx 同步传输：读取请求体后交给桥接器转发"""
+
+    def __init__(self, bridge: AsyncHttpBridge):
+        self.bridge = bridge
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        forwarded = httpx.Request(request.method, request.url, headers=request.headers.raw, content=body,
+                                  extensions=request.extensions)
+        return self.bridge.run(self.bridge.forward(forwarded))
+
+
+class _SharedClient(httpx.Client):
+    """autogen 构建 Agent 时会深拷贝 llm_config，共享的客户端不复制"""
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _RequestsAdapter(BaseAdapter):
+    """requests 传输适配器：请求由桥接器的 httpx.AsyncClient 发送，异常转换为 requests 的异常类型"""
+
+    def __init__(self, bridge: AsyncHttpBridge):
+        super().__init__()
+        self.bridge = bridge
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        elif timeout is None:
+            timeout = self.bridge.client.timeout
+        try:
+            response = self.bridge.run(self.bridge.client.request(
+                request.method, request.url, headers=dict(request.headers), content=request.body,
+                timeout=timeout
+            ))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers.items())
+        result.headers.pop("Content-Encoding", None)  # 响应体已解码
+        result._content = response.content
+        result._content_consumed = True
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.reason = response.reason_phrase
+        result.url = request.url
+        result.request = request
+        result.elapsed = response.elapsed
+        return result
+
+    def close(self):
+        pass
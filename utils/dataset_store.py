@@ -0,0 +1,142 @@
+"""
+数据集加载：JSON 数组或 JSONL 文件只解析一次，按 id 字段建立索引，进程内共享
+- load_dataset(path, id_field) 按 (路径, id 字段) 缓存，源文件修改（mtime/大小变化）后自动重新加载；线程安全，批量处理的各线程共用同一份
+- 指定 cache_dir 时把解析结果以 pickle 二进制缓存到该目录，源文件未变时后续进程直接读取缓存，不再解析 JSON
+- id 统一规范为字符串，数字 id 去掉前导零和空白（"007"、7、" 7" 都对应 "7"）
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_CACHE_VERSION = 1
+
+
+def normalize_id(value: Any) -> str:
+    """规范化 id：整数形式的 id 转为不带前导零的十进制字符串，其余转为去掉首尾空白的字符串"""
+    text = str(value).strip()
+    try:
+        return str(int(text))
+    except ValueError:
+        return text
+
+
+class DatasetStore:
+    """只读数据集：按文件顺序保存记录，并按 id 字段建立索引"""
+
+    def __init__(self, records: List[Dict], id_field: str, source: str = ""):
+        self.records = records
+        self.id_field = id_field
+        self.source = source
+        self.index: Dict[str, Dict] = {}
+        for record in records:
+            if id_field in record:
+                # 重复 id 以第一条为准，与原来的线性查找一致
+                self.index.setdefault(normalize_id(record[id_field]), record)
+
+    def get(self, record_id: Any, default: Optional[Dict] = None) -> Optional[Dict]:
+        return self.index.get(normalize_id(record_id), default)
+
+    def __getitem__(self, record_id: Any) -> Dict:
+        return self.index[normalize_id(record_id)]
+
+    def __contains__(self, record_id: Any) -> bool:
+        return normalize_id(record_id) in self.index
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.records)
+
+    def ids(self) -> List[str]:
+        return list(self.index)
+
+
+def _read_records(path: str) -> List[Dict]:
+    """读取 JSON 数组（或 {"data": [...]}）或 JSONL；格式错误时抛出 ValueError（含 json.JSONDecodeError）"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        data = data["data"]
+    if not isinstance(data, list):
+        raise ValueError(f"{path} 应为 JSON 数组或 JSONL")
+    return data
+
+
+def _cache_path(cache_dir: str, path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{digest}.pickle")
+
+
+def _load_cached(cache_file: str, signature: Tuple) -> Optional[List[Dict]]:
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("signature") != signature:
+        return None
+    return cached.get("records")
+
+
+def _store_cached(cache_file: str, signature: Tuple, records: List[Dict]) -> None:
+    """原子写入缓存（先写临时文件再替换），写入失败时忽略"""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump({"signature": signature, "records": records}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError:
+        pass
+
+
+_stores: Dict[Tuple[str, str], Tuple[Tuple, DatasetStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def load_dataset(path: str, id_field: str, cache_dir: Optional[str] = None) -> DatasetStore:
+    """
+    加载数据集（进程内缓存，源文件未变时直接返回同一个 DatasetStore）
+
+    Args:
+        path: JSON 数组或 JSONL 文件路径
+        id_field: 建立索引的 id 字段
+        cache_dir: 二进制缓存目录（可选，为空时不使用）
+
+    Raises:
+        FileNotFoundError: 文件不存在
+        ValueError: 文件格式错误（json.JSONDecodeError 是其子类）
+    """
+    stat = os.stat(path)
+    signature = (_CACHE_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    key = (os.path.abspath(path), id_field)
+    with _stores_lock:
+        cached = _stores.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        records = None
+        cache_file = _cache_path(cache_dir, path) if cache_dir else None
+        if cache_file:
+            records = _load_cached(cache_file, signature)
+        if records is None:
+            records = _read_records(path)
+            if cache_file:
+                _store_cached(cache_file, signature, records)
+
+        store = DatasetStore(records, id_field, source=path)
+        _stores[key] = (signature, store)
+        return store
+
+
+def clear_dataset_cache() -> None:
+    """清空进程内的数据集缓存（不删除二进制缓存文件）"""
+    with _stores_lock:
+        _stores.clear()
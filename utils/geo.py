@@ -0,0 +1,201 @@
+"""
+地理距离工具：POI 坐标解析、球面距离和按城市构建的网格空间索引
+- haversine 计算一对经纬度之间的大圆距离（km）
+- haversine_many 用 NumPy 向量化计算一个点到一组点的距离
+- GridIndex 将一个城市的 POI 按经纬度网格分桶，半径查询只扫描覆盖查询圆的网格
+"""
+
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# 每纬度对应的距离（km）
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def get_coordinates(poi: Optional[Dict]) -> Optional[Tuple[float, float]]:
+    """
+    读取 POI 的 (纬度, 经度)
+
+    支持 API 返回的数据和方案中的 {'id', 'name', 'data'} 条目；坐标缺失或非法时返回 None
+    """
+    if not poi:
+        return None
+    data = poi.get('data', poi)
+    try:
+        lat = float(data.get('latitude'))
+        lon = float(data.get('longitude'))
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lon) or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """两点间的大圆距离（km）"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_many(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """一个点到一组点的大圆距离（km），lats/lons 为等长数组"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    a = (np.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def poi_distance(a: Optional[Dict], b: Optional[Dict]) -> Optional[float]:
+    """两个 POI 间的直线距离（km），任一方缺少坐标时返回 None"""
+    pos_a = get_coordinates(a)
+    pos_b = get_coordinates(b)
+    if pos_a is None or pos_b is None:
+        return None
+    return haversine(pos_a[0], pos_a[1], pos_b[0], pos_b[1])
+
+
+class GridIndex:
+    """
+    单个城市的 POI 网格空间索引
+
+    按 cell_km 边长的经纬度网格分桶，半径查询只计算覆盖查询圆的网格内的 POI；
+    按距离逐个取最近 POI（iter_nearest）时从小半径开始逐步扩大，只在需要覆盖整个城市时才全量排序。
+    没有坐标的 POI 不进入索引
+    """
+
+    def __init__(self, pois: Iterable[Dict], cell_km: float = 1.0):
+        """
+        Args:
+            pois: POI 列表（需包含 id、latitude、longitude）
+            cell_km: 网格边长（km）
+        """
+        ids = []
+        coords = []
+        for poi in pois:
+            position = get_coordinates(poi)
+            if position is not None:
+                ids.append(poi.get('id'))
+                coords.append(position)
+
+        self.cell_km = cell_km
+        self.ids = ids
+        self.positions = {poi_id: i for i, poi_id in enumerate(ids)}
+        self.lats = np.array([c[0] for c in coords], dtype=float)
+        self.lons = np.array([c[1] for c in coords], dtype=float)
+
+        self.lat_step = cell_km / KM_PER_DEGREE
+        mean_lat = float(self.lats.mean()) if ids else 0.0
+        self.lon_step = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(mean_lat)), 0.01))
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, (lat, lon) in enumerate(coords):
+            cells.setdefault(self._cell(lat, lon), []).append(i)
+        self.cells = {key: np.array(members, dtype=np.intp) for key, members in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, poi_id) -> bool:
+        return poi_id in self.positions
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.lat_step)), int(math.floor(lon / self.lon_step))
+
+    def position(self, poi_id) -> Optional[Tuple[float, float]]:
+        """POI 的 (纬度, 经度)，不在索引中时返回 None"""
+        i = self.positions.get(poi_id)
+        if i is None:
+            return None
+        return float(self.lats[i]), float(self.lons[i])
+
+    def distance(self, origin_id, destination_id) -> Optional[float]:
+        """索引中两个 POI 间的直线距离（km）"""
+        origin = self.position(origin_id)
+        destination = self.position(destination_id)
+        if origin is None or destination is None:
+            return None
+        return haversine(origin[0], origin[1], destination[0], destination[1])
+
+    def _reach(self, lat: float, radius_km: float) -> Tuple[int, int]:
+        """半径 radius_km 的查询圆在纬度、经度方向上需要覆盖的网格数"""
+        rows = int(math.ceil(radius_km / KM_PER_DEGREE / self.lat_step))
+        lon_km = KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        cols = int(math.ceil(radius_km / lon_km / self.lon_step))
+        return rows, cols
+
+    def _covers_all(self, rows: int, cols: int) -> bool:
+        """需要检查的网格数不少于非空网格数时，直接计算全部 POI 更快"""
+        return (2 * rows + 1) * (2 * cols + 1) >= len(self.cells)
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        查询半径 radius_km 内的 POI
+
+        Returns:
+            [(poi_id, 距离km)]，按距离升序
+        """
+        if not self.ids:
+            return []
+        row, col = self._cell(lat, lon)
+        rows, cols = self._reach(lat, radius_km)
+
+        if self._covers_all(rows, cols):
+            candidates = np.arange(len(self.ids))
+        else:
+            buckets = [
+                self.cells[key]
+                for key in ((r, c) for r in range(row - rows, row + rows + 1) for c in range(col - cols, col + cols + 1))
+                if key in self.cells
+            ]
+            if not buckets:
+                return []
+            candidates = np.concatenate(buckets)
+
+        distances = haversine_many(lat, lon, self.lats[candidates], self.lons[candidates])
+        mask = distances <= radius_km
+        candidates = candidates[mask]
+        distances = distances[mask]
+        order = np.argsort(distances, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return [(self.ids[candidates[i]], float(distances[i])) for i in order]
+
+    def iter_nearest(self, lat: float, lon: float) -> Iterator[Tuple[str, float]]:
+        """
+        按距离升序逐个给出 POI，(poi_id, 距离km)
+
+        先在一个网格边长的半径内查询，取完后半径加倍（已给出的不再重复）；
+        半径需要覆盖全部网格时对剩余 POI 全量排序。调用方取够结果后停止迭代即可，
+        带筛选条件的 k 近邻通常只需查询最近的几圈网格
+        """
+        if not self.ids:
+            return
+        radius = self.cell_km
+        covered = -1.0
+        while not self._covers_all(*self._reach(lat, radius)):
+            for poi_id, distance in self.within(lat, lon, radius):
+                # within 返回距离不超过半径的全部 POI，上一轮已给出距离不超过 covered 的部分
+                if distance > covered:
+                    yield poi_id, distance
+            covered = radius
+            radius *= 2
+        for poi_id, distance in self.nearest(lat, lon, len(self.ids)):
+            if distance > covered:
+                yield poi_id, distance
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+        """距离最近的 k 个 POI，[(poi_id, 距离km)] 按距离升序"""
+        if not self.ids or k <= 0:
+            return []
+        distances = haversine_many(lat, lon, self.lats, self.lons)
+        k = min(k, len(self.ids))
+        top = np.argpartition(distances, k - 1)[:k] if k < len(self.ids) else np.arange(len(self.ids))
+        top = top[np.argsort(distances[top], kind='stable')]
+        return [(self.ids[i], float(distances[i])) for i in top]
@@ -0,0 +1,119 @@
+"""
+HTTP 调用工具：连接池复用的 requests.Session、线程安全的令牌桶限流器、带指数退避的重试
+- create_session(pool_size) 的连接池大小应不小于并发线程数，避免连接被反复丢弃重建
+- RateLimiter(rate, burst) 按每秒 rate 个请求限流，允许 burst 个突发请求
+- request_with_retry 对连接错误、超时和 429/5xx 响应重试，优先使用响应的 Retry-After
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 可重试的 HTTP 状态码
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """创建连接池大小为 pool_size 的 Session（http 和 https 共用配置）"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RateLimiter:
+    """
+    令牌桶限流器（线程安全）
+
+    每秒补充 rate 个令牌，最多积累 burst 个；acquire() 取走一个令牌，不足时阻塞等待。
+    rate 为 0 或 None 时不限流
+    """
+
+    def __init__(self,
+                 rate: Optional[float],
+                 burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate or 0
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: Optional[float], burst: int = 1) -> 'RateLimiter':
+        return cls((requests_per_minute or 0) / 60.0, burst)
+
+    def acquire(self) -> float:
+        """取一个令牌，返回等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+
+def retry_delay(attempt: int, backoff: float, response: Optional[requests.Response] = None,
+                max_delay: float = 60.0) -> float:
+    """第 attempt 次（从 0 开始）失败后的等待秒数：Retry-After 优先，否则指数退避加随机抖动"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max_delay, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+    delay = backoff * (2 ** attempt)
+    return min(max_delay, delay + random.uniform(0, delay / 2))
+
+
+def request_with_retry(session: requests.Session,
+                       method: str,
+                       url: str,
+                       max_retries: int = 3,
+                       backoff: float = 1.0,
+                       rate_limiter: Optional[RateLimiter] = None,
+                       sleep: Callable[[float], None] = time.sleep,
+                       **kwargs) -> requests.Response:
+    """
+    发送请求，对连接错误、超时和可重试状态码最多重试 max_retries 次
+
+    每次尝试（包括重试）前都从 rate_limiter 取令牌。不可重试的错误状态码和重试耗尽后的失败
+    照常抛出 requests.exceptions.RequestException（含 raise_for_status 的 HTTPError）
+
+    Returns:
+        状态码为 2xx/3xx 的响应
+    """
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= max_retries:
+                raise
+            sleep(retry_delay(attempt, backoff))
+            continue
+        if response.status_code in RETRY_STATUS and attempt < max_retries:
+            delay = retry_delay(attempt, backoff, response)
+            response.close()
+            sleep(delay)
+            continue
+        response.raise_for_status()
+        return response
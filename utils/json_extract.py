@@ -0,0 +1,177 @@
+"""
+JSON 提取工具：从 agent 对话消息中提取 JSON 对象
+单次扫描定位所有括号平衡的 {...} 片段（跳过字符串内的括号），
+再用 json.JSONDecoder.raw_decode 解析，避免贪婪正则在长消息上的回溯
+"""
+
+import json
+import re
+from collections import namedtuple
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+# value: 解析出的对象；start/end: 在原文中的位置；valid: 是否通过结构校验
+JsonCandidate = namedtuple("JsonCandidate", ["value", "start", "end", "valid"])
+
+_DECODER = json.JSONDecoder()
+_TOKEN_PATTERN = re.compile(r'[{}"\\\n]')
+
+
+def find_object_spans(text: str) -> List[tuple]:
+    """
+    单次扫描找出所有括号平衡的 {...} 片段
+
+    片段中的字符串没有正常结束（遇到原始换行或直到文本末尾，如 {他说"好} 中落单的引号）时，
+    放弃它所在的最外层 {，从其后重新扫描，避免引号状态错位影响后面的对象
+
+    Returns:
+        [(start, end), ...]，按 start 升序排列；嵌套片段也包含在内
+    """
+    spans = []
+    begin = 0
+    while True:
+        found, abandoned = _scan_spans(text, begin)
+        if abandoned is None:
+            spans.extend(found)
+            break
+        # 被放弃的 { 之前已闭合的片段不受影响，其余片段由重新扫描得到
+        spans.extend(span for span in found if span[0] < abandoned)
+        begin = abandoned + 1
+    spans.sort()
+    return spans
+
+
+def _scan_spans(text: str, begin: int):
+    """
+    从 begin 开始扫描括号平衡的片段
+
+    Returns:
+        (片段列表, 需要放弃的最外层 { 的位置)；字符串都正常结束时位置为 None
+    """
+    spans = []
+    stack = []
+    in_string = False
+    escape_pos = -2
+    for match in _TOKEN_PATTERN.finditer(text, begin):
+        pos = match.start()
+        char = text[pos]
+        if in_string:
+            if pos == escape_pos + 1:
+                # 被转义的字符
+                continue
+            if char == "\\":
+                escape_pos = pos
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                # 合法的 JSON 字符串不含原始换行
+                return spans, stack[0]
+            continue
+        if char == "{":
+            stack.append(pos)
+        elif char == "}":
+            if stack:
+                spans.append((stack.pop(), pos + 1))
+        elif char == '"' and stack:
+            # 只在 {...} 内部跟踪字符串，正文中的引号不影响括号匹配
+            in_string = True
+    if in_string:
+        return spans, stack[0]
+    return spans, None
+
+
+def _check_schema(value: Any, required_keys: Sequence[str], predicate: Optional[Callable[[Any], bool]]) -> bool:
+    if not isinstance(value, dict):
+        return False
+    if any(key not in value for key in required_keys):
+        return False
+    if predicate is not None and not predicate(value):
+        return False
+    return True
+
+
+def extract_json_objects(
+    text: str,
+    required_keys: Sequence[str] = (),
+    predicate: Optional[Callable[[Any], bool]] = None
+) -> List[JsonCandidate]:
+    """
+    提取文本中所有可解析的最外层 JSON 对象
+
+    外层片段解析失败时，继续尝试其内部的片段；解析成功的片段内部不再重复提取
+
+    Args:
+        text: 消息文本
+        required_keys: 结构校验要求包含的字段
+        predicate: 额外的结构校验函数
+
+    Returns:
+        按出现顺序排列的候选对象列表
+    """
+    if not text or "{" not in text:
+        return []
+
+    candidates = []
+    skip_until = -1
+    for start, end in find_object_spans(text):
+        if start < skip_until:
+            continue
+        try:
+            value, stop = _DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        if stop != end:
+            continue
+        candidates.append(JsonCandidate(value, start, end, _check_schema(value, required_keys, predicate)))
+        skip_until = end
+    return candidates
+
+
+def get_message_content(message: Any) -> str:
+    """获取消息文本内容"""
+    if isinstance(message, dict):
+        return message.get("content") or ""
+    return str(message)
+
+
+def get_chat_messages(chat_result: Any, group_chat: Any = None) -> list:
+    """获取对话中的所有消息（优先使用 chat_result.chat_history）"""
+    messages = group_chat.messages if hasattr(group_chat, 'messages') else []
+    if chat_result and hasattr(chat_result, 'chat_history'):
+        messages = chat_result.chat_history
+    return messages
+
+
+def find_json(
+    messages: Iterable[Any],
+    required_keys: Sequence[str] = (),
+    predicate: Optional[Callable[[Any], bool]] = None
+) -> Optional[Any]:
+    """
+    从后往前查找第一个通过结构校验的 JSON 对象（同一消息内取最后一个）
+
+    Returns:
+        解析出的对象，找不到时返回 None
+    """
+    for message in reversed(list(messages)):
+        candidates = extract_json_objects(get_message_content(message), required_keys, predicate)
+        for candidate in reversed(candidates):
+            if candidate.valid:
+                return candidate.value
+    return None
+
+
+def is_final_message(
+    message: Any,
+    required_keys: Sequence[str] = (),
+    predicate: Optional[Callable[[Any], bool]] = None
+) -> bool:
+    """
+    群聊终止条件：消息以 TERMINATE 结尾，或包含通过结构校验的 JSON 对象
+    发起工具调用的消息不算（需等工具执行并回答后才结束）
+    """
+    if not isinstance(message, dict) or message.get("tool_calls") or message.get("function_call"):
+        return False
+    content = get_message_content(message).rstrip()
+    if content.endswith("TERMINATE"):
+        return True
+    return any(candidate.valid for candidate in extract_json_objects(content, required_keys, predicate))
@@ -0,0 +1,97 @@
+"""
+LLM 评判结果缓存：把 (问题, 规范化的行程 JSON, 模型, 提示词版本) 的评分持久化到 sqlite
+- 键为上述四项规范化 JSON（键排序、无多余空白）的 sha256，行程内容不变时跨运行命中
+- 提示词模板修改后应提升提示词版本，旧版本的评分自然失效
+- 线程安全：多个评估线程共用一个连接，写入串行化
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+def canonical_json(value: Any) -> str:
+    """规范化 JSON：键排序、无多余空白、保留中文"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def judgment_key(question: str, plan: Any, model: str, prompt_version: str) -> str:
+    """评判缓存键"""
+    payload = canonical_json({
+        "question": question,
+        "plan": plan,
+        "model": model,
+        "prompt_version": prompt_version
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JudgmentCache:
+    """sqlite 持久化的评判缓存，值为 (评分, 说明)"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: sqlite 文件路径（目录不存在时自动创建），':memory:' 为进程内缓存
+        """
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS judgments ("
+                "key TEXT PRIMARY KEY, score REAL NOT NULL, explanation TEXT NOT NULL, "
+                "model TEXT, prompt_version TEXT, created_at REAL)"
+            )
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT score, explanation FROM judgments WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return float(row[0]), row[1]
+
+    def put(self, key: str, score: float, explanation: str, model: str = "", prompt_version: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO judgments VALUES (?, ?, ?, ?, ?, ?)",
+                (key, float(score), explanation, model, prompt_version, time.time())
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM judgments")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
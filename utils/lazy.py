@@ -0,0 +1,47 @@
+"""
+延迟导入：把 pyomo 等重依赖的导入推迟到第一次使用时，缩短 CLI 启动和只用部分功能时的导入耗时
+- pyo = lazy_module("pyomo.environ") 得到模块代理，首次访问属性时才真正导入
+- 代理对象用在类型注解中会在定义时触发导入，注解应写成字符串（如 'pyomo.environ.ConcreteModel'）
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule:
+    """模块代理，首次访问属性时导入（线程安全）"""
+
+    __slots__ = ("_name", "_module", "_lock")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """返回 name 模块的延迟导入代理"""
+    return LazyModule(name)
@@ -0,0 +1,277 @@
+"""
+Prompt 压缩工具：将行程等结构化数据序列化为紧凑 JSON，并按 token 预算裁剪
+- 名称和 POI 详情只在 refs 对照表中出现一次，行程中只保留 id
+- 去掉空值和可由其他字段推导出的冗余字段
+- 仍超出预算时按整天丢弃行程、按整条丢弃列表项，不截断 JSON 文本
+- 使用 tiktoken 计数（编码不可用时按字符数估算），并记录每类消息的 token 数
+"""
+
+import json
+import re
+import threading
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# 可由其他字段推导的字段，压缩时直接去掉
+REDUNDANT_KEYS = {"budget_remaining", "budget_utilization"}
+
+# 带 *_id 但本身不是名称的字段（如 question / question_id）
+TEXT_KEYS = {"question"}
+
+# 超出预算时按顺序逐级去掉的描述性字段
+DESCRIPTIVE_KEYS = (
+    {"latitude", "longitude", "open_time", "close_time", "business_hours"},
+    {"schedule"},
+    {"feature", "recommended_food"},
+    {"type", "rating"}
+)
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """加载 tiktoken 编码；加载失败（如离线无法下载编码文件）时返回 None，且不再重试"""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(DEFAULT_ENCODING)
+                except Exception:
+                    _encoder = False
+    return _encoder or None
+
+
+def count_tokens(text: str) -> int:
+    """
+    计算文本的 token 数
+
+    tiktoken 编码不可用时按字符估算：中日韩字符每个约 1 个 token，其余约 4 个字符 1 个 token
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """将文本截断到 max_tokens 以内"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text)[:max_tokens])
+    # 估算模式下二分查找可保留的最大前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def compact_json(obj: Any) -> str:
+    """最小化 JSON 序列化（无多余空白，保留中文）"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+def _json_default(value: Any) -> Any:
+    # 方案中的 POI 记录（agents.records）是只读映射而不是 dict
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _compact_value(value: Any, refs: Dict[str, Any], drop_keys: set) -> Any:
+    if isinstance(value, list):
+        return [_compact_value(item, refs, drop_keys) for item in value]
+    if not isinstance(value, Mapping):
+        return value
+
+    # 嵌套的 POI 记录 {"id": ..., "name": ..., ...}：整条记录移入对照表，原位置只保留 id
+    if value.get("id") and value.get("name"):
+        record = {
+            key: _compact_value(item, refs, drop_keys)
+            for key, item in value.items()
+            if key != "id" and key not in drop_keys and not _is_empty(item)
+        }
+        refs[str(value["id"])] = record["name"] if len(record) == 1 else record
+        return value["id"]
+
+    result = {}
+    for key, item in value.items():
+        if key in drop_keys or _is_empty(item):
+            continue
+        # 扁平结构：{"breakfast_id": ..., "breakfast": ...}
+        if isinstance(item, str) and key not in TEXT_KEYS and value.get(f"{key}_id"):
+            refs[str(value[f"{key}_id"])] = item
+            continue
+        result[key] = _compact_value(item, refs, drop_keys)
+    return result
+
+
+def compact_plan(plan: Any, level: int = 0) -> Dict:
+    """
+    压缩行程结构：名称和 POI 详情移入 refs 对照表（每个 id 只出现一次），行程中只保留 id；
+    去掉空值和冗余字段
+
+    Args:
+        plan: 行程字典（GenerateTask / RepairTask / GenResultTask 的输出均可）
+        level: 压缩级别，0 为无损压缩，1..len(DESCRIPTIVE_KEYS) 逐级去掉描述性字段，
+               再高一级时连 refs 表也去掉
+
+    Returns:
+        {"refs": {id: 名称或详情}, "plan": 压缩后的行程}
+    """
+    drop_keys = set(REDUNDANT_KEYS)
+    for keys in DESCRIPTIVE_KEYS[:level]:
+        drop_keys |= keys
+    refs = {}
+    compacted = {"plan": _compact_value(plan, refs, drop_keys)}
+    if refs and level <= len(DESCRIPTIVE_KEYS):
+        compacted = {"refs": refs, **compacted}
+    return compacted
+
+
+def fit_items(items: List[Any], max_tokens: int, render: Callable[[List[Any], int], str]) -> Optional[str]:
+    """
+    按整项丢弃列表末尾的元素，使 render(保留的元素, 丢弃的数量) 不超过 max_tokens
+
+    Returns:
+        保留元素最多的文本；一项都不保留仍超出预算时返回 None
+    """
+    text = render(items, 0)
+    if count_tokens(text) <= max_tokens:
+        return text
+    best = None
+    low, high = 0, len(items) - 1
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = render(items[:mid], len(items) - mid)
+        if count_tokens(candidate) <= max_tokens:
+            best, low = candidate, mid + 1
+        else:
+            high = mid - 1
+    return best
+
+
+def _longest_list_path(value: Any, path: Tuple = ()) -> Optional[Tuple]:
+    """最长的非空列表（行程的每日安排）在嵌套字典中的键路径"""
+    best = None
+    best_size = 0
+    stack = [(value, path)]
+    while stack:
+        item, item_path = stack.pop()
+        if isinstance(item, list):
+            if item_path and len(item) > best_size:
+                best, best_size = item_path, len(item)
+        elif isinstance(item, Mapping):
+            stack.extend((child, item_path + (key,)) for key, child in item.items())
+    return best
+
+
+def _get_path(value: Any, path: Tuple) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _replace_days(value: Dict, path: Tuple, days: List[Any], omitted: int) -> Dict:
+    """复制 path 上的各层字典并替换每日安排，丢弃的天数记在同一层的 omitted_days 中"""
+    result = dict(value)
+    if len(path) == 1:
+        result[path[0]] = days
+        if omitted:
+            result["omitted_days"] = omitted
+        return result
+    result[path[0]] = _replace_days(value[path[0]], path[1:], days, omitted)
+    return result
+
+
+def compact_for_prompt(plan: Any, max_tokens: int) -> str:
+    """
+    生成放入消息的行程文本，保证不超过 token 预算且仍是完整的 JSON
+
+    依次尝试更高的压缩级别（最后一级去掉 refs 表），仍超出预算时从行程末尾按整天丢弃，
+    并在每日安排所在的一层记录 omitted_days；不是 JSON 的文本按 token 截断
+    """
+    if isinstance(plan, str):
+        try:
+            parsed = json.loads(plan)
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, (dict, list)):
+            return truncate_to_tokens(plan, max_tokens)
+        plan = parsed
+
+    compacted = {}
+    for level in range(len(DESCRIPTIVE_KEYS) + 2):
+        compacted = compact_plan(plan, level)
+        text = compact_json(compacted)
+        if count_tokens(text) <= max_tokens:
+            return text
+
+    path = _longest_list_path(compacted)
+    if path is not None:
+        text = fit_items(
+            _get_path(compacted, path), max_tokens,
+            lambda days, omitted: compact_json(_replace_days(compacted, path, days, omitted))
+        )
+        if text is not None:
+            return text
+    return "{}" if count_tokens("{}") <= max_tokens else ""
+
+
+class PromptStats:
+    """按消息类别记录 prompt 的 token 数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, label: str, text: str) -> int:
+        """记录一条消息，返回其 token 数"""
+        tokens = count_tokens(text)
+        with self._lock:
+            stat = self._stats.setdefault(label, {"count": 0, "total": 0, "max": 0, "last": 0})
+            stat["count"] += 1
+            stat["total"] += tokens
+            stat["max"] = max(stat["max"], tokens)
+            stat["last"] = tokens
+        return tokens
+
+    def summary(self) -> Dict[str, Dict]:
+        """返回 {类别: {count, total, max, last, avg}}"""
+        with self._lock:
+            return {
+                label: {**stat, "avg": stat["total"] / stat["count"]}
+                for label, stat in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+_default_stats: Optional[PromptStats] = None
+
+
+def get_prompt_stats() -> PromptStats:
+    """获取进程内默认的 token 统计"""
+    global _default_stats
+    if _default_stats is None:
+        _default_stats = PromptStats()
+    return _default_stats
@@ -0,0 +1,185 @@
+"""
+HTTP 响应缓存：进程内 LRU + 可选的 sqlite 磁盘层，按 (方法, URL, 参数) 缓存成功响应的响应体
+- 条目在 ttl 秒内直接命中；过期后若有 ETag，带 If-None-Match 重新验证，304 时续期并复用缓存的响应体
+- 内存层按条目数和总字节数淘汰最久未使用的条目；磁盘层跨进程、跨运行共享，命中后提升到内存层
+- 只缓存 200 响应，请求失败（异常或错误状态码）时照常返回或抛出
+- 线程安全；stats() 返回内存/磁盘命中、未命中、重新验证和淘汰次数
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.judgment_cache import canonical_json
+
+
+def cache_key(method: str, url: str, params: Optional[Dict] = None) -> str:
+    """缓存键：参数按键排序（列表参数保持顺序）"""
+    return f"{method.upper()} {url}?{canonical_json(params or {})}"
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "content_type", "stored_at")
+
+    def __init__(self, body: bytes, etag: Optional[str], content_type: Optional[str], stored_at: float):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+        self.stored_at = stored_at
+
+    def to_response(self, url: str = "") -> requests.Response:
+        """构造与原响应等价的 requests.Response（状态码 200）"""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = url
+        response.headers = CaseInsensitiveDict({"X-Cache": "HIT"})
+        if self.content_type:
+            response.headers["Content-Type"] = self.content_type
+        if self.etag:
+            response.headers["ETag"] = self.etag
+        response._content = self.body
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        return response
+
+
+class ResponseCache:
+    """
+    Args:
+        ttl: 条目有效期（秒）
+        max_entries: 内存层条目数上限
+        max_bytes: 内存层响应体总字节数上限
+        path: 磁盘层 sqlite 文件路径，为空时不使用磁盘层
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 512, max_bytes: int = 256 << 20,
+                 path: str = "", clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+        self._conn = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, content_type TEXT, stored_at REAL)"
+                )
+                self._conn.commit()
+
+    def fetch(self, key: str, send: Callable[[Dict[str, str]], requests.Response]) -> requests.Response:
+        """
+        从缓存获取响应，未命中或已过期时调用 send(额外请求头) 发送请求
+
+        Args:
+            key: cache_key 生成的键
+            send: 发送请求的函数，参数为需要附加的请求头（重新验证时为 If-None-Match）
+        """
+        entry, source = self._lookup(key)
+        now = self._clock()
+        if entry is not None and now - entry.stored_at < self.ttl:
+            with self._lock:
+                self._stats[f"{source}_hits"] += 1
+            return entry.to_response()
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        response = send(headers)
+        if response.status_code == 304 and entry is not None:
+            entry = CacheEntry(entry.body, response.headers.get("ETag") or entry.etag, entry.content_type, now)
+            with self._lock:
+                self._stats["revalidated"] += 1
+            self._store(key, entry)
+            return entry.to_response(response.url)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        if response.status_code == 200:
+            self._store(key, CacheEntry(response.content, response.headers.get("ETag"),
+                                        response.headers.get("Content-Type"), now))
+        return response
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, "memory"
+            if self._conn is None:
+                return None, None
+            row = self._conn.execute(
+                "SELECT body, etag, content_type, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        entry = CacheEntry(bytes(row[0]), row[1], row[2], row[3])
+        self._remember(key, entry)
+        return entry, "disk"
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        """放入内存层并按条目数和字节数淘汰（单个超过字节上限的响应体不进入内存层）"""
+        size = len(entry.body)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self._stats["evictions"] += 1
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        self._remember(key, entry)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, sqlite3.Binary(entry.body), entry.etag, entry.content_type, entry.stored_at)
+                )
+                self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计（hit_rate 计入内存和磁盘命中，重新验证不计为命中）"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"] + stats["revalidated"]
+        stats["hit_rate"] = hits / total if total else 0.0
+        return stats
@@ -0,0 +1,188 @@
+"""
+结果输出：把每个问题的行程计划结果写到文件，批量处理时由后台线程写入，不阻塞下一个问题的处理
+- JsonFileSink: 每个问题一个 id_<问题ID>.json（原格式），先写临时文件再原子替换，中断时不会留下半个文件
+- NdjsonSink: 追加写入单个 NDJSON 文件（每行 {"question_id": ..., "result": ...}），缓冲写入并定期 fsync；
+  路径以 .gz 结尾时写 gzip 压缩归档（每次打开追加一个 gzip 成员，gzip/zcat 可直接读取）
+- BackgroundWriter: 有界队列 + 写入线程，队列满时 submit 阻塞（反压），close 时写完剩余结果
+"""
+
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+
+class ResultSink:
+    """结果输出的基类：write 返回结果的存放位置（文件路径）"""
+
+    location = ""
+
+    def write(self, question_id: Any, result: Dict) -> str:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class JsonFileSink(ResultSink):
+    """每个问题一个格式化的 JSON 文件，原子写入"""
+
+    def __init__(self, directory: str = "results", indent: Optional[int] = 4):
+        self.directory = directory
+        self.location = directory
+        self.indent = indent
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, question_id: Any, result: Dict) -> str:
+        path = os.path.join(self.directory, f"id_{question_id}.json")
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=self.indent)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+
+class NdjsonSink(ResultSink):
+    """
+    追加写入的 NDJSON（.gz 结尾时 gzip 压缩）
+    每写入 fsync_every 条或距上次同步超过 fsync_interval 秒时 flush + fsync（为 0 时只在 close 时同步）
+    """
+
+    def __init__(self, path: str, fsync_every: int = 20, fsync_interval: float = 5.0,
+                 buffer_size: int = 1 << 16):
+        self.path = path
+        self.location = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._raw = open(path, "ab", buffering=buffer_size)
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab") if path.endswith(".gz") else self._raw
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, question_id: Any, result: Dict) -> str:
+        line = json.dumps({"question_id": question_id, "result": result}, ensure_ascii=False,
+                          separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line.encode("utf-8"))
+            self._pending += 1
+            if (self.fsync_every and self._pending >= self.fsync_every) or \
+                    (self.fsync_interval and time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+        return self.path
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self._file is not self._raw:
+            self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._raw.closed:
+                self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._raw.closed:
+                return
+            if self._file is not self._raw:
+                self._file.close()  # 写入 gzip 尾部，不关闭底层文件
+            self._raw.flush()
+            os.fsync(self._raw.fileno())
+            self._raw.close()
+            self._pending = 0
+
+
+def create_sink(kind: str = "json", directory: str = "results") -> ResultSink:
+    """
+    按类型创建结果输出
+    - json: directory/id_<问题ID>.json
+    - ndjson: directory/results.ndjson
+    - ndjson.gz: directory/results.ndjson.gz
+    """
+    kind = (kind or "json").lower()
+    if kind == "json":
+        return JsonFileSink(directory)
+    if kind in ("ndjson", "ndjson.gz"):
+        return NdjsonSink(os.path.join(directory, f"results.{kind}"))
+    raise ValueError(f"未知的结果输出类型: {kind}（可选 json、ndjson、ndjson.gz）")
+
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """
+    在后台线程中把结果写入 sink
+    submit 立即返回 Future（结果为存放位置）；队列满时阻塞，避免写入跟不上时结果在内存中无限堆积
+    """
+
+    def __init__(self, sink: ResultSink, max_pending: int = 64):
+        self.sink = sink
+        self.written = 0
+        self.errors: List[str] = []
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, question_id: Any, result: Dict) -> Future:
+        if self._closed:
+            raise RuntimeError("BackgroundWriter 已关闭")
+        future: Future = Future()
+        self._queue.put((question_id, result, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            question_id, result, future = item
+            try:
+                future.set_result(self.sink.write(question_id, result))
+                self.written += 1
+            except Exception as e:
+                self.errors.append(f"问题 {question_id}: {e}")
+                future.set_exception(e)
+
+    def close(self) -> None:
+        """写完队列中剩余的结果并关闭 sink"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
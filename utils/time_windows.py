@@ -0,0 +1,147 @@
+"""
+营业时间工具：把景点开放时间和餐厅营业时间解析为当天的分钟区间
+- parse_clock('09:30') -> 570，'23:59' / '24:00' 视为一天结束（1440）
+- parse_hours('11:00-14:00 17:00-01:00') -> {None: ((0, 60), (660, 840), (1020, 1440))}，
+  跨午夜的区间截断到当天结束，并把越过午夜的部分计入当天凌晨
+- 支持 '24小时营业' 和按星期区分的营业时间（'周一至周三 10:00-22:00；周五至周日 09:00-23:00'）
+  不区分星期的区间与按星期区分的区间同时出现时（'10:00-22:00；周六至周日 09:00-23:00'），单独列出的星期优先
+- 时间缺失或无法解析时返回 None，表示营业时间未知（按全天开放处理）
+"""
+
+import re
+from typing import Dict, Optional, Sequence, Tuple
+
+DAY_MINUTES = 1440
+# 全天开放
+ALL_DAY = ((0, DAY_MINUTES),)
+
+WEEKDAY_NAMES = {'一': 0, '二': 1, '三': 2, '四': 3, '五': 4, '六': 5, '日': 6, '天': 6}
+
+_CLOCK_PATTERN = re.compile(r'^\s*(\d{1,2})\s*[:：]\s*(\d{2})\s*$')
+_RANGE_PATTERN = re.compile(r'(\d{1,2})\s*[:：]\s*(\d{2})\s*[-~至]\s*(\d{1,2})\s*[:：]\s*(\d{2})')
+_WEEKDAY_PATTERN = re.compile(r'周([一二三四五六日天])(?:\s*[至到-]\s*周([一二三四五六日天]))?')
+
+Windows = Tuple[Tuple[int, int], ...]
+
+
+def parse_clock(text) -> Optional[int]:
+    """'HH:MM' 转为当天的分钟数，无法解析时返回 None"""
+    if not isinstance(text, str):
+        return None
+    match = _CLOCK_PATTERN.match(text)
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 24 or minute > 59:
+        return None
+    return _clock_minutes(hour, minute)
+
+
+def _clock_minutes(hour: int, minute: int) -> int:
+    minutes = hour * 60 + minute
+    # 23:59 按一天结束处理，避免全天开放的景点少一分钟
+    return DAY_MINUTES if minutes >= DAY_MINUTES - 1 else minutes
+
+
+def format_clock(minutes: float) -> str:
+    """分钟数转为 'HH:MM'（超过 24 小时时小时数继续累加）"""
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_windows(ranges: Sequence[Tuple[int, int]]) -> Windows:
+    """
+    把 (开始, 结束) 列表整理为当天内有序、不重叠的区间
+    结束早于开始的区间视为跨午夜：当天开到 24:00，并把午夜后的部分计入当天凌晨
+    """
+    pieces = []
+    for start, end in ranges:
+        if end == start:
+            pieces.append((0, DAY_MINUTES))
+        elif end > start:
+            pieces.append((start, end))
+        else:
+            pieces.append((start, DAY_MINUTES))
+            if end > 0:
+                pieces.append((0, end))
+    pieces.sort()
+    merged = []
+    for start, end in pieces:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def window_range(open_time, close_time) -> Optional[Dict[Optional[int], Windows]]:
+    """景点的开放/关闭时间转为营业时间表，任一缺失时返回 None"""
+    start = parse_clock(open_time)
+    end = parse_clock(close_time)
+    if start is None or end is None:
+        return None
+    return {None: normalize_windows([(start, end)])}
+
+
+def _parse_ranges(text: str) -> list:
+    return [
+        (_clock_minutes(int(h1), int(m1)), _clock_minutes(int(h2), int(m2)))
+        for h1, m1, h2, m2 in _RANGE_PATTERN.findall(text)
+    ]
+
+
+def parse_hours(text) -> Optional[Dict[Optional[int], Windows]]:
+    """
+    解析餐厅营业时间
+
+    Returns:
+        {星期(0=周一): 区间} 或 {None: 区间}（不区分星期）；无法解析时返回 None
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    text = text.strip()
+    if '24小时' in text:
+        return {None: ALL_DAY}
+
+    hours: Dict[Optional[int], Windows] = {}
+    for segment in re.split(r'[；;]', text):
+        ranges = _parse_ranges(segment)
+        if not ranges:
+            continue
+        weekdays = []
+        for first, last in _WEEKDAY_PATTERN.findall(segment):
+            begin = WEEKDAY_NAMES[first]
+            end = WEEKDAY_NAMES[last] if last else begin
+            weekdays.extend(range(begin, end + 1) if begin <= end else list(range(begin, 7)) + list(range(0, end + 1)))
+        windows = normalize_windows(ranges)
+        if not weekdays:
+            hours[None] = normalize_windows(list(hours.get(None, ())) + list(windows))
+        for weekday in weekdays:
+            hours[weekday] = normalize_windows(list(hours.get(weekday, ())) + list(windows))
+    return hours or None
+
+
+def windows_on(hours: Optional[Dict[Optional[int], Windows]], weekday: Optional[int] = None) -> Windows:
+    """
+    取某天的营业区间
+
+    hours 为 None（营业时间未知）时全天开放；当天有单独列出的营业时间时优先使用，
+    否则使用不区分星期的营业时间，两者都没有（当天不营业）时返回空区间；
+    weekday 为 None（日期未知）时取所有营业区间的并集
+    """
+    if hours is None:
+        return ALL_DAY
+    if weekday is None:
+        return normalize_windows([w for windows in hours.values() for w in windows])
+    if weekday in hours:
+        return hours[weekday]
+    return hours.get(None, ())
+
+
+def earliest_start(windows: Windows, ready: float, duration: float) -> Optional[float]:
+    """在营业区间内能完整安排 duration 分钟活动的最早开始时间（不早于 ready），无法安排时返回 None"""
+    for start, end in windows:
+        begin = max(ready, start)
+        if begin + duration <= end:
+            return begin
+    return None
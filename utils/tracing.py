@@ -0,0 +1,287 @@
+"""
+轻量级耗时追踪：用上下文管理器记录嵌套的阶段（span），按问题输出追踪文件，并汇总批量运行的各阶段耗时
+- with start_trace("q12") as tracer: ... 开启一次追踪；其中的 with span("planner.solve"): ... 记录阶段，
+  父子关系由调用栈自动确定（contextvars，同一线程内嵌套）
+- 没有开启追踪时 span() 返回空操作对象，埋点几乎没有开销
+- tracer.write_chrome(path) 输出 Chrome trace（chrome://tracing 或 Perfetto 打开），
+  tracer.write_jsonl(path) 每行一个 span
+- StageStats 汇总多次追踪中每个阶段的次数、p50/p95/最大耗时和自身耗时（扣除子阶段）
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Span:
+    """一个阶段的记录（时间为 time.perf_counter 秒）"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "thread_id", "attrs", "error")
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs) -> None:
+        """补充属性（如响应状态码、结果大小）"""
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class _NullSpan:
+    """未开启追踪时的空操作 span"""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_current_tracer: ContextVar[Optional['Tracer']] = ContextVar("current_tracer", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """一次追踪（通常对应一个问题）中记录的所有 span"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = str(trace_id)
+        self.spans: List[Span] = []
+        self.origin = time.perf_counter()
+        self.wall_start = time.time()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        parent = _current_span.get()
+        current = Span(name, next(self._ids), parent.span_id if parent is not None else None, attrs)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.end = time.perf_counter()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(current)
+
+    def finished(self) -> List[Span]:
+        """已结束的 span，按开始时间排序"""
+        with self._lock:
+            return sorted(self.spans, key=lambda s: (s.start, s.span_id))
+
+    def self_times(self) -> Dict[int, float]:
+        """每个 span 的自身耗时（扣除直接子 span 的耗时）"""
+        spans = self.finished()
+        own = {s.span_id: s.duration for s in spans}
+        for s in spans:
+            if s.parent_id in own:
+                own[s.parent_id] -= s.duration
+        return {span_id: max(0.0, value) for span_id, value in own.items()}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """span 转为字典（时间为相对追踪开始的毫秒数）"""
+        return [{
+            "trace_id": self.trace_id,
+            "span_id": s.span_id,
+            "parent_id": s.parent_id,
+            "name": s.name,
+            "start_ms": (s.start - self.origin) * 1000,
+            "duration_ms": s.duration * 1000,
+            "thread_id": s.thread_id,
+            "attrs": s.attrs,
+            "error": s.error
+        } for s in self.finished()]
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace 格式（完整事件 ph=X，时间单位为微秒）"""
+        events = []
+        for s in self.finished():
+            args = {"span_id": s.span_id, "parent_id": s.parent_id, **s.attrs}
+            if s.error:
+                args["error"] = s.error
+            events.append({
+                "name": s.name,
+                "cat": s.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (s.start - self.origin) * 1e6,
+                "dur": s.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": s.thread_id,
+                "args": args
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "start_time": self.wall_start}
+        }
+
+    def write_chrome(self, path: str) -> str:
+        _ensure_dir(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False, default=str)
+        return path
+
+    def write_jsonl(self, path: str) -> str:
+        _ensure_dir(path)
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.to_records():
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def write(self, directory: str, prefix: str) -> List[str]:
+        """在 directory 下写出 {prefix}.trace.json 和 {prefix}.trace.jsonl"""
+        return [
+            self.write_chrome(os.path.join(directory, f"{prefix}.trace.json")),
+            self.write_jsonl(os.path.join(directory, f"{prefix}.trace.jsonl"))
+        ]
+
+
+def _ensure_dir(path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+
+@contextmanager
+def start_trace(trace_id: str) -> Iterator[Tracer]:
+    """开启一次追踪，期间当前上下文中的 span() 都记录到返回的 Tracer"""
+    tracer = Tracer(trace_id)
+    tracer_token = _current_tracer.set(tracer)
+    span_token = _current_span.set(None)
+    try:
+        yield tracer
+    finally:
+        _current_span.reset(span_token)
+        _current_tracer.reset(tracer_token)
+
+
+def get_tracer() -> Optional[Tracer]:
+    """当前上下文中的 Tracer，未开启追踪时为 None"""
+    return _current_tracer.get()
+
+
+def span(name: str, **attrs):
+    """
+    记录一个阶段（上下文管理器），未开启追踪时为空操作
+
+    Args:
+        name: 阶段名，按 "模块.阶段" 命名（如 "planner.solve"），StageStats 按名称汇总
+        **attrs: 附加属性，写入追踪文件
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **attrs)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """函数装饰器：把每次调用记录为一个阶段（默认以函数限定名命名）"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值的分位数（q 取 0-100），空列表返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class StageStats:
+    """汇总多次追踪中各阶段的耗时（线程安全）"""
+
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = {}
+        self._self_times: Dict[str, List[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, tracer: Tracer) -> None:
+        self_times = tracer.self_times()
+        with self._lock:
+            for s in tracer.finished():
+                self._durations.setdefault(s.name, []).append(s.duration)
+                self._self_times.setdefault(s.name, []).append(self_times[s.span_id])
+                if s.error:
+                    self._errors[s.name] = self._errors.get(s.name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """{阶段: {count, p50, p95, max, total, self_total, errors}}（秒），按总耗时降序"""
+        with self._lock:
+            rows = {
+                name: {
+                    "count": len(durations),
+                    "p50": percentile(durations, 50),
+                    "p95": percentile(durations, 95),
+                    "max": max(durations),
+                    "total": sum(durations),
+                    "self_total": sum(self._self_times[name]),
+                    "errors": self._errors.get(name, 0)
+                }
+                for name, durations in self._durations.items()
+            }
+        return dict(sorted(rows.items(), key=lambda item: -item[1]["total"]))
+
+    def format_table(self) -> str:
+        """汇总表（耗时单位为秒，self 为扣除子阶段后的自身耗时合计）"""
+        summary = self.summary()
+        if not summary:
+            return ""
+        width = max(len("stage"), max(len(name) for name in summary))
+        lines = [f"{'stage':<{width}} {'count':>6} {'p50':>9} {'p95':>9} {'max':>9} {'total':>10} {'self':>10} {'errors':>6}"]
+        for name, row in summary.items():
+            lines.append(
+                f"{name:<{width}} {row['count']:>6} {row['p50']:>9.3f} {row['p95']:>9.3f} {row['max']:>9.3f} "
+                f"{row['total']:>10.3f} {row['self_total']:>10.3f} {row['errors']:>6}"
+            )
+        return "\n".join(lines)
+
+
+_default_stats = None
+_default_stats_lock = threading.Lock()
+
+
+def get_stage_stats() -> StageStats:
+    """获取进程级默认的阶段耗时统计"""
+    global _default_stats
+    if _default_stats is None:
+        with _default_stats_lock:
+            if _default_stats is None:
+                _default_stats = StageStats()
+    return _default_stats